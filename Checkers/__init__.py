@@ -1,4 +1,8 @@
 from .check_reduced_strategies import same_reduced_strategies
 from .check_all_payoffs import check_payoffs
-from .check_total_ordering import check_total_order_matching
-from .check_one_payoff_constraint import check_efg_json
\ No newline at end of file
+from .check_total_ordering import check_total_order_matching, find_total_order_violation
+from .check_one_payoff_constraint import check_efg_json
+from .check_context import CheckContext, LoadedGame, load_game
+from .check_all_constraints import ConstraintSet, check_efg_constraints
+from .check_terminal_table import TerminalTable, same_terminal_payoffs
+from .check_result_cache import CheckResultCache
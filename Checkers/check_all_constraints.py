@@ -0,0 +1,211 @@
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from .check_context import load_game
+from .check_one_payoff_constraint import (
+    get_action_name,
+    get_outcome_payoff,
+    get_player_name,
+    is_chance_node,
+    same_payoff,
+)
+
+
+EXPLICIT_PAYOFF_CONSTRAINT_TYPE = "Explicit Payoff(s) for a Certain Outcome"
+
+
+@dataclass
+class ConstraintFile:
+    json_path: str
+    cst_type: Optional[str]
+    data: Dict[str, Any]
+
+
+@dataclass
+class PathStep:
+    constraint: int  # index into ConstraintSet.constraints
+    step_id: str
+    expected_type: Optional[str]
+    expected_player: Optional[str]
+    expected_action: Any
+
+
+@dataclass
+class ConstraintTrieNode:
+    """
+    Node of the trie over the action labels of constraint paths. `steps` are
+    the checks to run at the matching game node for constraints whose path
+    continues through it; `ends` are the constraints whose path ends here.
+    """
+    children: Dict[str, "ConstraintTrieNode"] = field(default_factory=dict)
+    steps: List[PathStep] = field(default_factory=list)
+    ends: List[int] = field(default_factory=list)
+
+
+class ConstraintSet:
+    """
+    All constraint JSON files of one game, each read once, with the paths of
+    the explicit payoff constraints compiled into one trie.
+
+    `evaluate` checks every explicit payoff constraint against a game in a
+    single traversal that only follows the trie's edges, with the same
+    verdicts and messages as running check_efg_json once per file.
+    """
+    def __init__(self, json_files: List[str]):
+        self.constraints: List[ConstraintFile] = []
+        self.root = ConstraintTrieNode()
+
+        for json_path in json_files:
+            with open(json_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+
+            self.constraints.append(ConstraintFile(json_path, data.get("Cst Type"), data))
+
+            if data.get("Cst Type") == EXPLICIT_PAYOFF_CONSTRAINT_TYPE:
+                self.add_path(len(self.constraints) - 1, data)
+
+    def add_path(self, index: int, data: Dict[str, Any]):
+        node = self.root
+
+        for step_id in sorted(data["Path"], key=lambda x: int(x)):
+            step = data["Path"][step_id]
+            expected_action = step["action"]
+
+            node.steps.append(PathStep(index, step_id, step.get("type"), step.get("player"), expected_action))
+
+            key = str(expected_action).strip()
+            node = node.children.setdefault(key, ConstraintTrieNode())
+
+        node.ends.append(index)
+
+    def explicit_payoff_paths(self) -> List[str]:
+        return [
+            constraint.json_path
+            for constraint in self.constraints
+            if constraint.cst_type == EXPLICIT_PAYOFF_CONSTRAINT_TYPE
+        ]
+
+    def evaluate(self, efg) -> Dict[str, bool]:
+        """
+        Check every explicit payoff constraint against `efg` (an EFG path, a
+        pygambit game or a LoadedGame). Returns {json_path: passed}.
+        """
+        game = load_game(efg).game
+        results: Dict[int, bool] = {}
+
+        stack = [(self.root, game.root)]
+
+        while stack:
+            trie_node, node = stack.pop()
+
+            # Constraints that already failed higher up may share this trie
+            # node with others that got here; they are skipped.
+            for index in trie_node.ends:
+                if index not in results:
+                    results[index] = self.check_outcome(index, node)
+
+            if not trie_node.steps:
+                continue
+
+            # Check each constraint's step at this node; the survivors move on
+            # along their action.
+            moving: Dict[str, List[PathStep]] = {}
+            for step in trie_node.steps:
+                if step.constraint in results:
+                    continue
+
+                if self.check_step(step, node):
+                    moving.setdefault(str(step.expected_action).strip(), []).append(step)
+                else:
+                    results[step.constraint] = False
+
+            if not moving:
+                continue
+
+            children_by_action: Dict[str, Any] = {}
+            for child in node.children:
+                children_by_action.setdefault(get_action_name(child.prior_action).strip(), child)
+
+            for action_name, steps in moving.items():
+                child = children_by_action.get(action_name)
+
+                if child is not None:
+                    stack.append((trie_node.children[action_name], child))
+                    continue
+
+                available = [get_action_name(child.prior_action) for child in node.children]
+                for step in steps:
+                    print(f"Action {action_name!r} not found.")
+                    print(f"Available actions are: {available}")
+                    print(
+                        f"Action mismatch at step {step.step_id}: "
+                        f"action {step.expected_action} not found"
+                    )
+                    results[step.constraint] = False
+
+        return {self.constraints[index].json_path: passed for index, passed in sorted(results.items())}
+
+    def check_step(self, step: PathStep, node) -> bool:
+        if node.is_terminal:
+            print("Path error: reached terminal node too early")
+            return False
+
+        # Check node type first
+        if step.expected_type == "Chance":
+            if not is_chance_node(node):
+                print(f"Type mismatch at step {step.step_id}: expected Chance, got Decision")
+                return False
+
+            # For chance nodes, ignore player name.
+            # So Chance, Chance1, Chance2 are all accepted.
+        else:
+            if is_chance_node(node):
+                print(f"Type mismatch at step {step.step_id}: expected Decision, got Chance")
+                return False
+
+            actual_player = get_player_name(node)
+
+            if actual_player != step.expected_player:
+                print(
+                    f"Player mismatch at step {step.step_id}: "
+                    f"expected {step.expected_player}, got {actual_player}"
+                )
+                return False
+
+        return True
+
+    def check_outcome(self, index: int, node) -> bool:
+        if not node.is_terminal:
+            print("Path error: path does not end at a terminal node")
+            return False
+
+        outcome = node.outcome
+        if outcome is None:
+            print("Payoff error: terminal node has no outcome")
+            return False
+
+        for player_name, expected_payoff in self.constraints[index].data["Payoffs"].items():
+
+            try:
+                actual_payoff = get_outcome_payoff(outcome, player_name)
+            except KeyError as e:
+                print(e)
+                return False
+
+            if not same_payoff(actual_payoff, expected_payoff):
+                print(
+                    f"Payoff mismatch for {player_name}: "
+                    f"expected {expected_payoff}, got {actual_payoff}"
+                )
+                return False
+
+        return True
+
+
+def check_efg_constraints(efg, json_files: List[str]) -> Dict[str, bool]:
+    """
+    Batch form of check_efg_json: {json_path: passed} for every explicit
+    payoff constraint among `json_files`.
+    """
+    return ConstraintSet(json_files).evaluate(efg)
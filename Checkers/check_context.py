@@ -0,0 +1,105 @@
+import os
+from functools import cached_property
+from typing import Dict, List, Optional, Tuple
+
+import pygambit as gbt
+
+from Tree import EFGParser
+
+
+class LoadedGame:
+    """
+    A pygambit game read once, with the tables the checkers derive from it
+    computed on first use and then kept.
+
+    `path` is the file the game was read from, or None when an already
+    loaded game was wrapped.
+    """
+    def __init__(self, game, path: Optional[str] = None):
+        self.game = game
+        self.path = path
+
+    @classmethod
+    def read(cls, path) -> "LoadedGame":
+        return cls(gbt.read_efg(path), os.fspath(path))
+
+    @cached_property
+    def terminal_table(self):
+        """TerminalTable of the game, see check_terminal_table."""
+        from .check_terminal_table import TerminalTable
+
+        return TerminalTable.from_gambit(self.game)
+
+    @cached_property
+    def tree(self):
+        """
+        The file parsed into a Tree.GameTree, or None for a wrapped game or a
+        file EFGParser rejects.
+        """
+        if self.path is None:
+            return None
+
+        try:
+            return EFGParser(allow_references=True).parse_file(self.path)
+        except ValueError:
+            return None
+
+    @cached_property
+    def reduced_strategy_structures(self):
+        """See check_reduced_strategies.reduced_strategy_structures; None without a tree."""
+        from .check_reduced_strategies import reduced_strategy_structures
+
+        if self.tree is None:
+            return None
+        return reduced_strategy_structures(self.tree)
+
+    @cached_property
+    def reduced_strategies(self) -> List[Tuple[bool, List[str]]]:
+        """(is_chance, sorted strategy labels) for every player, in order."""
+        return [
+            (True, []) if player.is_chance else (False, sorted(s.label for s in player.strategies))
+            for player in self.game.players
+        ]
+
+
+def load_game(source) -> LoadedGame:
+    """
+    Accept an EFG path, a pygambit game or a LoadedGame and return a
+    LoadedGame. Paths are read with pygambit; the other two are not copied.
+    """
+    if isinstance(source, LoadedGame):
+        return source
+    if isinstance(source, (str, os.PathLike)):
+        return LoadedGame.read(source)
+    return LoadedGame(source)
+
+
+class CheckContext:
+    """
+    The candidate and reference games of one sample, loaded once and shared by
+    all checkers.
+
+    Reference games are the same for every sample of a game, so callers can
+    pass one `reference_games` dict (path -> LoadedGame) to every context to
+    read and derive each reference only once.
+    """
+    def __init__(self, candidate, reference):
+        self.candidate = load_game(candidate)
+        self.reference = load_game(reference)
+
+    @classmethod
+    def from_paths(
+        cls,
+        candidate_path,
+        ref_path,
+        reference_games: Optional[Dict[str, LoadedGame]] = None,
+    ) -> "CheckContext":
+        if reference_games is None:
+            return cls(candidate_path, ref_path)
+
+        key = os.path.abspath(ref_path)
+        reference = reference_games.get(key)
+        if reference is None:
+            reference = reference_games[key] = LoadedGame.read(ref_path)
+
+        return cls(candidate_path, reference)
@@ -1,6 +1,7 @@
 import json
 import math
-import pygambit as gbt
+
+from .check_context import load_game
 
 
 def same_payoff(a, b, tol=1e-9):
@@ -65,7 +66,11 @@ def get_outcome_payoff(outcome, player_name):
 
 
 def check_efg_json(efg_file, json_file):
-    game = gbt.read_efg(efg_file)
+    """
+    `efg_file` is an EFG path, a pygambit game or a LoadedGame (see
+    CheckContext).
+    """
+    game = load_game(efg_file).game
 
     with open(json_file, "r") as f:
         cst = json.load(f)
@@ -1,18 +1,140 @@
-import pygambit as gbt
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
 
+from Tree import GameTree, NodeType
 
-def same_reduced_strategies(candidate_path, ref_path):
-    candidate_efg = gbt.read_efg(candidate_path)
-    ref_efg = gbt.read_efg(ref_path)
+from .check_context import load_game
 
-    for cand_player, ref_player in zip(candidate_efg.players, ref_efg.players):
-        if cand_player.is_chance:
-            continue
 
-        cand_strategies = sorted(s.label for s in cand_player.strategies)
-        ref_strategies = sorted(s.label for s in ref_player.strategies)
+# An own-sequence of a player: (infoset position, action index) of the last
+# own move, or None at the start of the game.
+Sequence = Optional[Tuple[int, int]]
+
+
+@dataclass(frozen=True)
+class ReducedStrategies:
+    """
+    Reduced strategies of one player, described without enumerating them.
+
+    `signature` has one (number of actions, parent sequence) entry per
+    infoset, in order of first appearance in a depth-first traversal (the
+    order Gambit numbers them in). Parent sequences through single-action
+    infosets are collapsed, since such a move does not change which infosets
+    are reached. For a player with perfect recall the signature fixes the set
+    of Gambit's reduced strategy labels (an action number, or '*' for an
+    unreached infoset, per infoset).
+    """
+    count: int
+    signature: Tuple[Tuple[int, Sequence], ...]
+
+
+def reduced_strategy_structures(game: GameTree) -> Optional[List[ReducedStrategies]]:
+    """
+    ReducedStrategies for every player of `game`, from one pass over the
+    tree and a dynamic program over each player's sequence forest:
+
+        count(sequence) = product over infosets I enabled by sequence of
+                          sum over actions a of I of count((I, a))
+
+    Returns None if some player lacks perfect recall (members of an infoset
+    reached by different own sequences or with different action counts),
+    where reduced strategies have no sequence-form description.
+    """
+    n_players = len(game.players)
+    positions: List[Dict[int, int]] = [{} for _ in range(n_players)]
+    infosets: List[List[Tuple[int, Sequence]]] = [[] for _ in range(n_players)]
+
+    if game.root is not None:
+        stack = [(game.root, (None,) * n_players)]
+
+        while stack:
+            node, sequences = stack.pop()
+
+            if node.node_type != NodeType.PLAYER:
+                stack.extend((child, sequences) for child in reversed(node.children.values()))
+                continue
+
+            player = node.player - 1
+            if not 0 <= player < n_players:
+                return None
+
+            entry = (len(node.actions), sequences[player])
+            position = positions[player].get(node.information_set)
+            if position is None:
+                position = positions[player][node.information_set] = len(infosets[player])
+                infosets[player].append(entry)
+            elif infosets[player][position] != entry:
+                return None
+
+            for index in reversed(range(len(node.actions))):
+                child = node.children.get(node.actions[index])
+                if child is not None:
+                    child_sequences = sequences[:player] + ((position, index),) + sequences[player + 1:]
+                    stack.append((child, child_sequences))
+
+    structures = []
+
+    for entries in infosets:
+        # Parents come first in traversal order, so one forward pass collapses
+        # single-action parents and one backward pass runs the product/sum DP.
+        collapsed: List[Sequence] = []
+        for n_actions, parent in entries:
+            if parent is not None and entries[parent[0]][0] == 1:
+                parent = collapsed[parent[0]]
+            collapsed.append(parent)
 
-        if cand_strategies != ref_strategies:
+        products: Dict[Sequence, int] = {}
+        for position in reversed(range(len(entries))):
+            n_actions, parent = entries[position]
+            total = sum(products.get((position, index), 1) for index in range(n_actions))
+            products[parent] = products.get(parent, 1) * total
+
+        signature = tuple((n_actions, parent) for (n_actions, _), parent in zip(entries, collapsed))
+        structures.append(ReducedStrategies(products.get(None, 1), signature))
+
+    return structures
+
+
+def same_reduced_strategy_labels(candidate_path, ref_path):
+    """
+    Compare the reduced strategy labels pygambit enumerates for every player.
+    Exponential in the number of infosets; used when a game lacks perfect
+    recall or cannot be read by EFGParser.
+    """
+    candidate_strategies = load_game(candidate_path).reduced_strategies
+    ref_strategies = load_game(ref_path).reduced_strategies
+
+    for (cand_is_chance, cand_labels), (_, ref_labels) in zip(candidate_strategies, ref_strategies):
+        if cand_is_chance:
+            continue
+
+        if cand_labels != ref_labels:
             return False
 
-    return True
\ No newline at end of file
+    return True
+
+
+def same_reduced_strategies(candidate_path, ref_path):
+    """
+    Each argument is an EFG path, a pygambit game or a LoadedGame (see
+    CheckContext); loaded games reuse their cached results.
+
+    Games read from a file are compared through their ReducedStrategies,
+    counts first, without enumerating strategies. Other games fall back to
+    same_reduced_strategy_labels.
+    """
+    candidate = load_game(candidate_path)
+    ref = load_game(ref_path)
+
+    candidate_structures = candidate.reduced_strategy_structures
+    ref_structures = ref.reduced_strategy_structures
+
+    if candidate_structures is None or ref_structures is None:
+        return same_reduced_strategy_labels(candidate, ref)
+
+    pairs = list(zip(candidate_structures, ref_structures))
+
+    if any(cand.count != reference.count for cand, reference in pairs):
+        return False
+
+    return all(cand.signature == reference.signature for cand, reference in pairs)
@@ -0,0 +1,95 @@
+import hashlib
+import os
+import pickle
+import sqlite3
+from typing import Any, Dict, List, Optional, Tuple
+
+from Tree import file_digest
+
+
+# Bump whenever a checker can give a different verdict or result layout for
+# the same files, so results computed by older checkers are not reused.
+CHECKER_VERSION = 1
+
+CACHE_FILENAME = "check_results.sqlite"
+
+
+class CheckResultCache:
+    """
+    On-disk cache of check_one_matched_efg results.
+
+    A result is stored under the SHA-256 of the matched EFG, a digest of the
+    reference bundle (the reference game.efg, metadata.yml and the constraint
+    JSONs, together with their paths) and CHECKER_VERSION. A sample whose
+    files are all unchanged is then answered from the cache without loading
+    either game. Results are pickled, so they come back exactly as the
+    checkers returned them.
+
+    Entries live in one SQLite file under `cache_dir`; a missing file in the
+    bundle is hashed as absent, so adding metadata.yml or a constraint later
+    changes the key as well.
+    """
+    def __init__(self, cache_dir: str):
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self.path = os.path.join(cache_dir, CACHE_FILENAME)
+        # Parallel workers share the file; a writer waits for the others.
+        self.connection = sqlite3.connect(self.path, timeout=60)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, result BLOB NOT NULL)"
+        )
+        self.connection.commit()
+
+        self.digests: Dict[str, Tuple[int, int, str]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def digest(self, path: str) -> Optional[str]:
+        if not os.path.exists(path):
+            return None
+        return file_digest(path, self.digests)
+
+    def bundle_digest(self, bundle_files: List[str]) -> str:
+        sha = hashlib.sha256()
+        for path in bundle_files:
+            sha.update(repr((path, self.digest(path))).encode())
+        return sha.hexdigest()
+
+    def key(self, matched_path: str, bundle_files: List[str]) -> str:
+        parts = (self.digest(matched_path), self.bundle_digest(bundle_files), CHECKER_VERSION)
+        return hashlib.sha256(repr(parts).encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        row = self.connection.execute("SELECT result FROM results WHERE key = ?", (key,)).fetchone()
+
+        if row is not None:
+            try:
+                result = pickle.loads(row[0])
+            except (EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+                # An unreadable entry is treated as a miss and overwritten.
+                result = None
+
+            if result is not None:
+                self.hits += 1
+                return result
+
+        self.misses += 1
+        return None
+
+    def put(self, key: str, result: Dict[str, Any]):
+        self.connection.execute(
+            "INSERT OR REPLACE INTO results (key, result) VALUES (?, ?)",
+            (key, pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)),
+        )
+        self.connection.commit()
+
+    def stats(self) -> Dict[str, int]:
+        entries = self.connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": entries,
+        }
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,162 @@
+from dataclasses import dataclass
+from fractions import Fraction
+from math import lcm
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from Tree import GameTree, NodeType
+from Tree.tree import parse_prob
+
+from .check_one_payoff_constraint import is_chance_node
+
+
+# Scaled payoffs stay int64 while products of two of them cannot overflow.
+INT64_SAFE = 1 << 31
+
+
+def exact(value) -> Fraction:
+    """int, float, Decimal or Fraction (pygambit's Rational) as an exact Fraction."""
+    return value if isinstance(value, Fraction) else Fraction(value)
+
+
+@dataclass
+class TerminalTable:
+    """
+    Terminal payoffs of a game in array form.
+
+    Terminals are identified by their path of action labels from the root;
+    `paths` is sorted, so a terminal's path id (its row) is the same in every
+    table with the same paths. Payoffs are exact: row `i` pays player `j`
+    `payoffs[i, j] / scale`. Rows of terminals without an outcome are 0 with
+    `has_outcome` False. `reach` is the exact probability chance assigns to
+    each path.
+
+    When a game has several terminals with the same path (possible with
+    repeated action labels in pygambit), the last one in prefix order is
+    kept, as a dict keyed by path would.
+    """
+    players: List[str]
+    paths: List[Tuple[str, ...]]
+    payoffs: np.ndarray
+    scale: int
+    has_outcome: np.ndarray
+    reach: np.ndarray
+
+    @classmethod
+    def from_rows(cls, players: List[str], rows: Dict[Tuple[str, ...], Tuple[Optional[List[Fraction]], Fraction]]) -> "TerminalTable":
+        paths = sorted(rows)
+        n_players = len(players)
+
+        scale = lcm(1, *(value.denominator for values, _ in rows.values() if values is not None for value in values))
+
+        numerators = []
+        for path in paths:
+            values = rows[path][0]
+            numerators.append([0] * n_players if values is None else [int(value * scale) for value in values])
+
+        largest = max((abs(value) for row in numerators for value in row), default=0)
+        dtype = np.int64 if largest < INT64_SAFE and scale < INT64_SAFE else object
+
+        return cls(
+            players=list(players),
+            paths=paths,
+            payoffs=np.array(numerators, dtype=dtype).reshape(len(paths), n_players),
+            scale=scale,
+            has_outcome=np.array([rows[path][0] is not None for path in paths], dtype=bool),
+            reach=np.array([rows[path][1] for path in paths], dtype=object),
+        )
+
+    @classmethod
+    def from_gambit(cls, game) -> "TerminalTable":
+        """Build the table from a pygambit game in one depth-first pass."""
+        players = list(game.players)
+        rows = {}
+        stack = [(game.root, (), Fraction(1))]
+
+        while stack:
+            node, path, reach = stack.pop()
+
+            if node.is_terminal:
+                values = None if node.outcome is None else [exact(node.outcome[player]) for player in players]
+                rows[path] = (values, reach)
+                continue
+
+            chance = is_chance_node(node)
+            for child in reversed(list(node.children)):
+                child_reach = reach * exact(child.prior_action.prob) if chance else reach
+                stack.append((child, path + (str(child.prior_action.label),), child_reach))
+
+        return cls.from_rows([str(player.label) for player in players], rows)
+
+    @classmethod
+    def from_game_tree(cls, game: GameTree) -> "TerminalTable":
+        """
+        Build the table from a Tree.GameTree in one depth-first pass.
+        Terminals with an empty payoff list count as having no outcome. The
+        parser stores payoffs as int or float, so rational payoffs such as 1/3
+        are only as exact as their float.
+        """
+        n_players = len(game.players)
+        rows = {}
+        stack = [(game.root, (), Fraction(1))] if game.root is not None else []
+
+        while stack:
+            node, path, reach = stack.pop()
+
+            if node.node_type == NodeType.TERMINAL:
+                values = None
+                if node.payoffs:
+                    if len(node.payoffs) != n_players:
+                        raise ValueError(
+                            f"Terminal at {path} has {len(node.payoffs)} payoffs for {n_players} players"
+                        )
+                    values = [exact(value) for value in node.payoffs]
+                rows[path] = (values, reach)
+                continue
+
+            for action, child in reversed(node.children.items()):
+                child_reach = reach * parse_prob(node.probs[action]) if node.node_type == NodeType.CHANCE else reach
+                stack.append((child, path + (action,), child_reach))
+
+        return cls.from_rows(list(game.players), rows)
+
+    @classmethod
+    def from_game(cls, game) -> "TerminalTable":
+        if isinstance(game, GameTree):
+            return cls.from_game_tree(game)
+        return cls.from_gambit(game)
+
+    def path_ids(self) -> Dict[Tuple[str, ...], int]:
+        return {path: index for index, path in enumerate(self.paths)}
+
+    def payoff(self, path_id: int, player: int) -> Fraction:
+        return Fraction(int(self.payoffs[path_id, player]), self.scale)
+
+
+def scaled_equal(first: np.ndarray, first_scale: int, second: np.ndarray, second_scale: int) -> np.ndarray:
+    """Elementwise first / first_scale == second / second_scale, without rounding."""
+    if first.dtype == object or second.dtype == object:
+        first, second = first.astype(object), second.astype(object)
+    return first * second_scale == second * first_scale
+
+
+def same_terminal_payoffs(reference: TerminalTable, candidate: TerminalTable) -> bool:
+    """
+    True if both tables have the same terminal paths, the same terminals
+    without an outcome and equal payoffs everywhere else.
+    """
+    if reference.paths != candidate.paths:
+        return False
+
+    if not np.array_equal(reference.has_outcome, candidate.has_outcome):
+        return False
+
+    mask = reference.has_outcome
+    if not mask.any():
+        return True
+
+    if reference.payoffs.shape[1] != candidate.payoffs.shape[1]:
+        return False
+
+    return bool(np.all(scaled_equal(reference.payoffs[mask], reference.scale, candidate.payoffs[mask], candidate.scale)))
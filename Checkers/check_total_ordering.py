@@ -1,5 +1,11 @@
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
 import pygambit as gbt
 
+from .check_context import load_game
+from .check_terminal_table import TerminalTable
+
 
 def read_game(path):
     return gbt.read_efg(path)
@@ -41,10 +47,124 @@ def sign_relation(a, b):
     return "="
 
 
-def check_total_order_matching(reference_efg, candidate_efg):
-    ref = terminal_payoffs(read_game(reference_efg))
-    cand = terminal_payoffs(read_game(candidate_efg))
+def payoff_matrix(payoffs: Dict[Tuple[str, ...], tuple], paths: Sequence[Tuple[str, ...]]) -> np.ndarray:
+    """
+    Payoffs of `paths` as a (terminals, players) array. Values are kept as
+    float64 when that is exact, and as Python objects (e.g. Fraction,
+    Decimal) otherwise, so ties and strict orders are never changed by
+    rounding.
+    """
+    exact = np.array([payoffs[path] for path in paths], dtype=object)
+    if exact.size == 0:
+        return exact.astype(float)
+
+    try:
+        floats = exact.astype(float)
+    except (TypeError, ValueError):
+        return exact
+
+    if np.all(floats == exact):
+        return floats
+    return exact
+
+
+def dense_ranks(values: np.ndarray) -> np.ndarray:
+    """Dense rank of every value (ties share a rank), starting at 0."""
+    return np.unique(values, return_inverse=True)[1].reshape(-1)
+
+
+def paths_differ(ref_paths, cand_paths) -> Dict[str, Any]:
+    return {
+        "reason": "Terminal paths differ",
+        "only_in_reference": sorted(set(ref_paths) - set(cand_paths))[:5],
+        "only_in_candidate": sorted(set(cand_paths) - set(ref_paths))[:5],
+    }
+
+
+def rank_order_violation(
+    paths: Sequence[Tuple[str, ...]],
+    ref_matrix: np.ndarray,
+    cand_matrix: np.ndarray,
+) -> Optional[Dict[str, Any]]:
+    """
+    Compare the per-player orderings (with ties) of two aligned
+    (terminals, players) payoff arrays. Returns None when they agree,
+    otherwise a diagnostic for the first violating pair found.
+
+    Two orderings agree on every pair exactly when the dense rank vectors of
+    the aligned payoffs are equal, so each player costs one sort per game
+    instead of a comparison per pair of terminals.
+    """
+    for player in range(ref_matrix.shape[1]):
+        ref_ranks = dense_ranks(ref_matrix[:, player])
+        cand_ranks = dense_ranks(cand_matrix[:, player])
+
+        if np.array_equal(ref_ranks, cand_ranks):
+            continue
 
+        # Walk the terminals in reference order (candidate rank breaking
+        # ties): if every neighbouring pair keeps its relation, all pairs do
+        # by transitivity, so the first broken neighbour pair is a witness.
+        order = np.lexsort((cand_ranks, ref_ranks))
+        ref_sorted = ref_ranks[order]
+        cand_sorted = cand_ranks[order]
+
+        same_ref = ref_sorted[1:] == ref_sorted[:-1]
+        broken = np.where(same_ref, cand_sorted[1:] != cand_sorted[:-1], cand_sorted[1:] <= cand_sorted[:-1])
+        position = int(np.argmax(broken))
+        x, y = order[position], order[position + 1]
+
+        return {
+            "reason": "Payoff order differs",
+            "player": player,
+            "paths": (paths[x], paths[y]),
+            "reference_relation": sign_relation(ref_matrix[x, player], ref_matrix[y, player]),
+            "candidate_relation": sign_relation(cand_matrix[x, player], cand_matrix[y, player]),
+        }
+
+    return None
+
+
+def total_order_violation(
+    ref: Dict[Tuple[str, ...], tuple],
+    cand: Dict[Tuple[str, ...], tuple],
+) -> Optional[Dict[str, Any]]:
+    """
+    rank_order_violation for two terminal payoff dicts keyed by path.
+    """
+    if set(ref) != set(cand):
+        return paths_differ(ref, cand)
+
+    if not ref:
+        return None
+
+    paths = list(ref.keys())
+    return rank_order_violation(paths, payoff_matrix(ref, paths), payoff_matrix(cand, paths))
+
+
+def table_order_violation(reference: TerminalTable, candidate: TerminalTable) -> Optional[Dict[str, Any]]:
+    """
+    rank_order_violation for two TerminalTables. Their payoffs are scaled
+    integers, which order exactly like the payoffs themselves; terminals
+    without an outcome count as paying 0.
+    """
+    if reference.paths != candidate.paths:
+        return paths_differ(reference.paths, candidate.paths)
+
+    if not reference.paths:
+        return None
+
+    return rank_order_violation(reference.paths, reference.payoffs, candidate.payoffs)
+
+
+def pairwise_total_order_matching(
+    ref: Dict[Tuple[str, ...], tuple],
+    cand: Dict[Tuple[str, ...], tuple],
+) -> bool:
+    """
+    Compare every pair of terminals for every player, O(P * T^2). Kept as
+    the reference implementation for benchmark_total_ordering.py.
+    """
     if set(ref) != set(cand):
         return False
 
@@ -63,4 +183,24 @@ def check_total_order_matching(reference_efg, candidate_efg):
                 if ref_rel != cand_rel:
                     return False
 
-    return True
\ No newline at end of file
+    return True
+
+
+def find_total_order_violation(reference_efg, candidate_efg) -> Optional[Dict[str, Any]]:
+    """
+    Diagnostic form of check_total_order_matching: None when the orders
+    match, otherwise a description of the first violating pair (see
+    rank_order_violation).
+    """
+    return table_order_violation(
+        load_game(reference_efg).terminal_table,
+        load_game(candidate_efg).terminal_table,
+    )
+
+
+def check_total_order_matching(reference_efg, candidate_efg):
+    """
+    Each argument is an EFG path, a pygambit game or a LoadedGame (see
+    CheckContext).
+    """
+    return find_total_order_violation(reference_efg, candidate_efg) is None
@@ -1,3 +1,5 @@
 from .order_match import switch_order
 from .player_match import reorder_players, match_palyer_name_llm, match_player
-from .action_match import build_global_action_mappings
\ No newline at end of file
+from .action_match import build_global_action_mappings, set_combined_action_prompt
+from .llm_cache import LLMResponseCache, set_response_cache, get_response_cache
+from .llm_client import ClientSettings, configure_client, get_client
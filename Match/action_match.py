@@ -1,12 +1,128 @@
-from typing import Dict, Union, List, Tuple
+from typing import Any, Dict, Iterable, Union, List, Optional, Tuple
+from difflib import SequenceMatcher
+import json
 from .chatbot import infer_response
 from .utils import safe_extract_player_list
 
-from Tree import NodeType
+from Tree import NodeType, add_count
 import re
 
 Key = Union[int, str]  # player number or "chance"
 
+# A label pair matched on string similarity alone must score at least this
+# (difflib ratio of the normalized labels) and beat every other candidate of
+# either label by the margin.
+SIMILARITY_THRESHOLD = 0.8
+SIMILARITY_MARGIN = 0.1
+
+
+# When True, match_all_actions_llm asks for the verdict and the mapping in one
+# request (see match_actions_in_one_call) instead of two.
+COMBINED_ACTION_PROMPT = False
+
+
+def set_combined_action_prompt(enabled: bool):
+    global COMBINED_ACTION_PROMPT
+    COMBINED_ACTION_PROMPT = enabled
+
+
+def normalize_action_label(label: str) -> str:
+    """Case-folded label without whitespace or punctuation: 'Bet (High)' -> 'bethigh'."""
+    return re.sub(r"[\W_]+", "", str(label).casefold())
+
+
+def label_numbers(label: str) -> List[str]:
+    """
+    Numbers in a label, with their signs and decimals, which normalization
+    and similarity must not blur: '(1,-10)' -> ['1', '-10'], 'Bet 0.5' -> ['0.5'].
+    """
+    return re.findall(r"-?\d+(?:\.\d+)?", str(label))
+
+
+def match_actions_locally(
+    original_actions: List[str],
+    ref_actions: List[str],
+) -> Tuple[Dict[str, str], List[str], List[str]]:
+    """
+    Match generated to reference action labels without the LLM, in three
+    passes over the labels still unmatched:
+    1. identical labels;
+    2. labels equal after normalize_action_label, when exactly one label on
+       each side has that form;
+    3. pairs that are each other's clearly best match on string similarity
+       (see SIMILARITY_THRESHOLD and SIMILARITY_MARGIN).
+    Passes 2 and 3 only pair labels containing the same numbers, so 'Take 3'
+    never becomes 'Take 4', '(1,10)' never becomes '(11,0)' and 'Raise -2'
+    never becomes 'Raise 2'.
+
+    Returns (mapping, unmatched generated, unmatched reference), the unmatched
+    labels in their original order. Lists of different lengths or with
+    repeated labels are left entirely unmatched.
+    """
+    if (
+        len(original_actions) != len(ref_actions)
+        or len(set(original_actions)) != len(original_actions)
+        or len(set(ref_actions)) != len(ref_actions)
+    ):
+        return {}, list(original_actions), list(ref_actions)
+
+    ref_set = set(ref_actions)
+    mapping = {action: action for action in original_actions if action in ref_set}
+
+    gen_left = [action for action in original_actions if action not in mapping]
+    ref_left = [action for action in ref_actions if action not in mapping]
+
+    if gen_left:
+        gen_by_form: Dict[str, List[str]] = {}
+        ref_by_form: Dict[str, List[str]] = {}
+        for action in gen_left:
+            gen_by_form.setdefault(normalize_action_label(action), []).append(action)
+        for action in ref_left:
+            ref_by_form.setdefault(normalize_action_label(action), []).append(action)
+
+        for form, gen_actions in gen_by_form.items():
+            ref_candidates = ref_by_form.get(form, [])
+            if (
+                form
+                and len(gen_actions) == 1
+                and len(ref_candidates) == 1
+                and label_numbers(gen_actions[0]) == label_numbers(ref_candidates[0])
+            ):
+                mapping[gen_actions[0]] = ref_candidates[0]
+
+        gen_left = [action for action in gen_left if action not in mapping]
+        matched_refs = set(mapping.values())
+        ref_left = [action for action in ref_left if action not in matched_refs]
+
+    if gen_left and ref_left:
+        scores = {
+            (gen, ref): (
+                SequenceMatcher(None, normalize_action_label(gen), normalize_action_label(ref)).ratio()
+                if label_numbers(gen) == label_numbers(ref)
+                else 0.0
+            )
+            for gen in gen_left
+            for ref in ref_left
+        }
+
+        def clearly_best(score: float, others: List[float]) -> bool:
+            return score >= SIMILARITY_THRESHOLD and all(score - other >= SIMILARITY_MARGIN for other in others)
+
+        for gen in gen_left:
+            ref = max(ref_left, key=lambda candidate: scores[gen, candidate])
+            score = scores[gen, ref]
+
+            if clearly_best(score, [scores[gen, other] for other in ref_left if other != ref]) and clearly_best(
+                score, [scores[other, ref] for other in gen_left if other != gen]
+            ):
+                mapping[gen] = ref
+
+        gen_left = [action for action in gen_left if action not in mapping]
+        matched_refs = set(mapping.values())
+        ref_left = [action for action in ref_left if action not in matched_refs]
+
+    return mapping, gen_left, ref_left
+
 def parse_reason_answer_block(response: str) -> Tuple[str, str]:
     """
     Parse:
@@ -73,22 +189,50 @@ def check_name_consistent(
     return answer, reason
 
 
-def match_all_actions_llm(
+def load_json_response(response: str) -> Any:
+    """The JSON value of an LLM reply, which may be wrapped in a Markdown code block."""
+    text = response.strip()
+    code_block = re.search(r"```(?:json)?\s*(.*?)```", text, re.DOTALL)
+    if code_block:
+        text = code_block.group(1).strip()
+
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid combined response format: {e}\nResponse was: {response}")
+
+
+def parse_combined_response(response: str) -> Tuple[bool, str, List[str]]:
+    """
+    Parse the JSON reply of match_actions_in_one_call:
+      {"reason": "...", "match": true|false, "mapping": ["...", ...]}
+    A reply wrapped in a Markdown code block is accepted too.
+    """
+    return parse_combined_result(load_json_response(response), response)
+
+
+def parse_combined_result(data: Any, response: str) -> Tuple[bool, str, List[str]]:
+    """One {"reason", "match", "mapping"} object of a combined reply."""
+    if not isinstance(data, dict) or not isinstance(data.get("match"), bool):
+        raise ValueError(f"Invalid combined response format: {response}")
+
+    mapping = data.get("mapping") or []
+    if not isinstance(mapping, list) or not all(isinstance(action, str) for action in mapping):
+        raise ValueError(f"Combined response mapping is not a list of strings: {response}")
+
+    return data["match"], str(data.get("reason", "")).strip(), mapping
+
+
+def match_actions_in_two_calls(
     original_actions: List[str],
     ref_actions: List[str],
     model: str,
     game_description: str,
-) -> Dict[str, str]:
+) -> List[str]:
     """
-    Returns a mapping {generated_action_name -> reference_action_name}.
-    The LLM must return the mapped list in the SAME ORDER as original_actions.
+    Ask check_name_consistent whether the lists name the same actions, then
+    ask for the mapped list in a second request.
     """
-    if not original_actions:
-        raise ValueError("Empty original_actions provided.")
-
-    print("Original actions:", original_actions)
-    print("Reference actions:", ref_actions)
-
     check_result, reason = check_name_consistent(
         original_actions=original_actions,
         ref_actions=ref_actions,
@@ -119,8 +263,75 @@ def match_all_actions_llm(
     response = infer_response(prompt, model)
     print("Raw mapping response:", response)
 
-    modified_actions = safe_extract_player_list(response)
+    return safe_extract_player_list(response)
+
+
+# The match and mapping instructions of the JSON prompts (one pair or many).
+COMBINED_MATCH_INSTRUCTIONS = (
+    "Step 1: decide whether the two lists refer to the same set of underlying game actions.\n"
+    "Focus on the underlying game choice, not surface wording.\n"
+    "Treat different naming conventions as equivalent when they refer to the same action.\n"
+    "Use the game description to resolve coordinates, positions, shorthand, aliases, or paraphrases.\n"
+    "Focus only on whether the labels match. Do not consider whether it is a chance node action or a player action.\n"
+    "For example, ['Left', 'Right'] and ['L', 'R'] are the same, and ['Fire'] and ['Loaded'] are the same "
+    "when both denote the same underlying outcome in the game.\n"
+    "When a label specifies a mark such as X or O but the game description makes clear whose turn it is, treat labels like "
+    "'Place X at ...', 'Place O at ...', and neutral labels like 'Place at ...' as equivalent if they refer to placing the "
+    "current player's mark at the same coordinates.\n\n"
+    "Step 2: if they match, replace each generated action with the best-matching reference action.\n"
+    "Keep the exact same order as the generated actions list.\n"
+    "Do not add, remove, or reorder items.\n"
+    "Each output item must be chosen from the reference actions list.\n\n"
+)
+
+COMBINED_RESULT_KEYS = (
+    '- "reason": 2 to 4 sentences on how the generated actions correspond to the reference actions.\n'
+    '- "match": true or false, the decision of step 1.\n'
+    '- "mapping": the mapped list of step 2, or [] if "match" is false.'
+)
+
+
+def match_actions_in_one_call(
+    original_actions: List[str],
+    ref_actions: List[str],
+    model: str,
+    game_description: str,
+) -> List[str]:
+    """
+    One JSON request in place of check_name_consistent plus the mapping
+    prompt: the model decides whether the lists name the same actions and,
+    if so, maps each generated action, in order. Raises ValueError when it
+    finds they do not match, as the two-request path does.
+    """
+    prompt = (
+        f"You are given a game description and two lists of action labels.\n\n"
+        f"Game description:\n{game_description}\n\n"
+        f"Generated Actions: {original_actions}\n"
+        f"Reference Actions: {ref_actions}\n\n"
+        f"{COMBINED_MATCH_INSTRUCTIONS}"
+        f"Output a JSON object only, with these keys:\n"
+        f"{COMBINED_RESULT_KEYS}"
+    )
 
+    response = infer_response(prompt, model, response_format={"type": "json_object"})
+    print("Raw combined response:", response)
+
+    matched, reason, modified_actions = parse_combined_response(response)
+
+    print("Check reason:", reason)
+    print("Check final answer:", matched)
+
+    if not matched:
+        raise ValueError(
+            "The actions in the generated game do not match the actions in the reference game. "
+            f"Reason: {reason}"
+        )
+
+    return modified_actions
+
+
+def validate_mapped_actions(modified_actions: List[str], original_actions: List[str], ref_actions: List[str]):
+    """Raise ValueError unless `modified_actions` maps `original_actions` one-to-one onto `ref_actions`."""
     if len(modified_actions) != len(original_actions):
         raise ValueError(
             f"LLM output length mismatch. original={len(original_actions)} modified={len(modified_actions)}"
@@ -134,11 +345,216 @@ def match_all_actions_llm(
             f"Reference: {ref_actions}"
         )
 
+
+def match_all_actions_llm(
+    original_actions: List[str],
+    ref_actions: List[str],
+    model: str,
+    game_description: str,
+    combined: Optional[bool] = None,
+) -> Dict[str, str]:
+    """
+    Returns a mapping {generated_action_name -> reference_action_name}.
+
+    Labels match_actions_locally can pair are mapped without the LLM; the
+    LLM is only asked about the labels left over, and not at all when none
+    are. It must return the mapped list in the SAME ORDER as the leftover
+    generated actions.
+
+    With `combined` (default COMBINED_ACTION_PROMPT) the verdict and the
+    mapping come from one request instead of two; either way the mapping is
+    validated the same.
+    """
+    if not original_actions:
+        raise ValueError("Empty original_actions provided.")
+
+    print("Original actions:", original_actions)
+    print("Reference actions:", ref_actions)
+
+    local_mapping, gen_left, ref_left = match_actions_locally(original_actions, ref_actions)
+    add_count("action labels matched locally", len(local_mapping))
+
+    if not gen_left and not ref_left:
+        add_count("action mappings resolved locally")
+        print("Modified actions (matched locally):", [local_mapping[a] for a in original_actions])
+        return {action: local_mapping[action] for action in original_actions}
+
+    add_count("action labels sent to llm", len(gen_left))
+    add_count("action mappings sent to llm")
+
+    if local_mapping:
+        print("Matched locally:", local_mapping)
+        print("Left for the LLM:", gen_left, "->", ref_left)
+
+    if combined is None:
+        combined = COMBINED_ACTION_PROMPT
+
+    if combined:
+        modified_actions = match_actions_in_one_call(gen_left, ref_left, model, game_description)
+    else:
+        modified_actions = match_actions_in_two_calls(gen_left, ref_left, model, game_description)
+
+    validate_mapped_actions(modified_actions, gen_left, ref_left)
+
     print("Modified actions:", modified_actions)
 
-    return dict(zip(original_actions, modified_actions))
+    mapping = dict(local_mapping)
+    mapping.update(zip(gen_left, modified_actions))
+    return {action: mapping[action] for action in original_actions}
+
+ActionPair = Tuple[Tuple[str, ...], Tuple[str, ...]]  # (generated actions, reference actions)
+
+# The most action-list pairs asked about in one batched request.
+ACTION_BATCH_SIZE = 16
+
+
+def match_action_pairs_in_one_call(
+    pairs: List[ActionPair],
+    model: str,
+    game_description: str,
+) -> Dict[ActionPair, Union[List[str], str]]:
+    """
+    Ask about several (generated, reference) action-list pairs in one JSON
+    request. Returns, per pair, the mapped list in generated order, or the
+    reason it was rejected: the model found the lists differ, or its mapping
+    fails validate_mapped_actions. A reply that cannot be read at all raises
+    ValueError.
+    """
+    numbered = "\n".join(
+        f"Pair {index}:\n  Generated Actions: {list(gen)}\n  Reference Actions: {list(ref)}"
+        for index, (gen, ref) in enumerate(pairs)
+    )
+    prompt = (
+        f"You are given a game description and {len(pairs)} numbered pairs of action label lists.\n\n"
+        f"Game description:\n{game_description}\n\n"
+        f"{numbered}\n\n"
+        f"Answer each pair on its own.\n"
+        f"{COMBINED_MATCH_INSTRUCTIONS}"
+        f'Output a JSON object only, with the key "results": a list holding one object per pair, in pair order. '
+        f'Each object has the key "pair" (the pair number) and these keys:\n'
+        f"{COMBINED_RESULT_KEYS}"
+    )
+
+    response = infer_response(prompt, model, response_format={"type": "json_object"})
+    print("Raw batched response:", response)
+
+    data = load_json_response(response)
+    results = data.get("results") if isinstance(data, dict) else None
+    if not isinstance(results, list):
+        raise ValueError(f"Invalid batched response format: {response}")
+
+    by_index = {item.get("pair"): item for item in results if isinstance(item, dict)}
+
+    answers: Dict[ActionPair, Union[List[str], str]] = {}
+    for index, (gen, ref) in enumerate(pairs):
+        if index not in by_index:
+            answers[(gen, ref)] = f"No answer for pair {index} in the batched response."
+            continue
+
+        try:
+            matched, reason, modified_actions = parse_combined_result(by_index[index], response)
+            if not matched:
+                raise ValueError(
+                    "The actions in the generated game do not match the actions in the reference game. "
+                    f"Reason: {reason}"
+                )
+            validate_mapped_actions(modified_actions, list(gen), list(ref))
+        except ValueError as e:
+            answers[(gen, ref)] = str(e)
+        else:
+            answers[(gen, ref)] = modified_actions
 
-def update_current_nodes(node, modified_actions, ref_actions):
+    return answers
+
+
+class ChanceActionMatcher:
+    """
+    Chance-node action mappings of one sample, memoized per (generated
+    actions, reference actions) pair, so chance nodes with the same labels
+    cost one match between them.
+
+    prefetch() answers a set of pairs up front: pairs match_actions_locally
+    resolves need no request, and the rest go to the LLM together, in
+    requests of up to ACTION_BATCH_SIZE pairs. mapping_for() reads the memo
+    without asking anything. match() then answers from the
+    memo and falls back to match_all_actions_llm for a pair it has not seen
+    (or whose batch could not be read). A rejected pair raises its
+    ValueError only when a node needs it.
+    """
+    def __init__(self, model: str, game_description: str):
+        self.model = model
+        self.game_description = game_description
+        self.mappings: Dict[ActionPair, Dict[str, str]] = {}
+        self.rejections: Dict[ActionPair, str] = {}
+
+    def prefetch(self, pairs: Iterable[ActionPair]):
+        pending = []
+
+        for gen, ref in dict.fromkeys(pairs):
+            if (gen, ref) in self.mappings or (gen, ref) in self.rejections:
+                continue
+
+            local_mapping, gen_left, ref_left = match_actions_locally(list(gen), list(ref))
+            if not gen_left and not ref_left:
+                add_count("action labels matched locally", len(local_mapping))
+                add_count("action mappings resolved locally")
+                self.mappings[(gen, ref)] = local_mapping
+            else:
+                pending.append(((gen, ref), local_mapping, (tuple(gen_left), tuple(ref_left))))
+
+        for start in range(0, len(pending), ACTION_BATCH_SIZE):
+            batch = pending[start:start + ACTION_BATCH_SIZE]
+            lefts = list(dict.fromkeys(left for _, _, left in batch))
+            add_count("batched action requests")
+            add_count("action mappings sent to llm", len(lefts))
+
+            try:
+                answers = match_action_pairs_in_one_call(lefts, self.model, self.game_description)
+            except ValueError as e:
+                # Leave these pairs to match(), which asks about them one at a time.
+                print("Batched action matching failed:", e)
+                continue
+
+            for pair, local_mapping, (gen_left, ref_left) in batch:
+                answer = answers[(gen_left, ref_left)]
+                if isinstance(answer, str):
+                    self.rejections[pair] = answer
+                    continue
+
+                mapping = dict(local_mapping)
+                mapping.update(zip(gen_left, answer))
+                self.mappings[pair] = mapping
+
+    def mapping_for(self, original_actions: List[str], ref_actions: List[str]) -> Optional[Dict[str, str]]:
+        """The memoized mapping for a pair, or None if it is not (or not validly) matched yet."""
+        return self.mappings.get((tuple(original_actions), tuple(ref_actions)))
+
+    def match(self, original_actions: List[str], ref_actions: List[str]) -> Dict[str, str]:
+        """The mapping {generated_action_name -> reference_action_name} for one chance node."""
+        pair = (tuple(original_actions), tuple(ref_actions))
+
+        if pair in self.rejections:
+            raise ValueError(self.rejections[pair])
+
+        add_count("chance mapping lookups")
+
+        if pair not in self.mappings:
+            add_count("chance mappings matched singly")
+            self.mappings[pair] = match_all_actions_llm(
+                original_actions, ref_actions, self.model, self.game_description
+            )
+
+        return self.mappings[pair]
+
+
+def update_current_nodes(node, modified_actions, ref_actions, game=None):
+    """
+    Rename `node`'s actions to `ref_actions` and reorder its children (and
+    chance probabilities) to match. `modified_actions` are the node's current
+    actions already renamed into the reference vocabulary, in their original
+    order. When `game` is given, its indexes are updated too.
+    """
+    old_state = (node.player, node.information_set, node.actions, dict(node.children))
 
     if node.node_type == NodeType.PLAYER:
         node.actions = ref_actions
@@ -173,6 +589,9 @@ def update_current_nodes(node, modified_actions, ref_actions):
         node.children = new_children
         node.probs = new_probs
 
+    if game is not None:
+        game.refresh_node(node, *old_state)
+
 
 def build_global_action_mappings(
     ref_total: Dict[Key, List[str]],
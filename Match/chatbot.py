@@ -1,20 +1,49 @@
-from openai import OpenAI
 import os
 
+from Tree import add_count, timed_stage
+
+from .llm_cache import get_response_cache
+from .llm_client import create_chat_completion
+
+
+def infer_response(prompt, model, response_format=None):
+    """
+    Send `prompt` to `model` and return the text of the reply.
+    `response_format` is passed on to the API, e.g. {"type": "json_object"}
+    to ask for a JSON reply.
+    """
+    temperature = 1.0 if model in ["gpt-5", "gpt-5-mini"] else 0.0
+
+    # With a response cache set (see llm_cache.set_response_cache), a prompt
+    # seen before is answered from it; in replay mode a miss is an error.
+    cache = get_response_cache()
+    if cache is not None:
+        cached = cache.get(model, temperature, prompt, response_format)
+        if cached is not None:
+            add_count("llm cache hits")
+            return cached
+
+        add_count("llm cache misses")
+        if cache.read_only:
+            raise ValueError("No cached LLM response for this prompt, and the response cache is in replay mode.")
 
-def infer_response(prompt, model):
     api_key = os.getenv("OPENAI_API_KEY")
 
     if not api_key:
         raise ValueError("OPENAI_API_KEY is not set.")
 
-    client = OpenAI(api_key=api_key)
-
     def get_response(text):
-        completion = client.chat.completions.create(
+        request = {}
+        if response_format is not None:
+            request["response_format"] = response_format
+
+        # The client is shared by every call of this process (see llm_client).
+        completion = create_chat_completion(
+            api_key,
             model=model,
             messages=text,
-            temperature=1.0 if model in ["gpt-5", "gpt-5-mini"] else 0.0,
+            temperature=temperature,
+            **request,
         )
 
         return completion.choices[0].message.content
@@ -27,5 +56,14 @@ def infer_response(prompt, model):
     user_message = {"role": "user", "content": prompt}
     message_pool.append(user_message)
     
-    response = get_response(message_pool)
+    with timed_stage("llm call"):
+        response = get_response(message_pool)
+
+    add_count("llm calls")
+    add_count("llm prompt chars", len(prompt))
+    add_count("llm response chars", len(response or ""))
+
+    if cache is not None and response is not None:
+        cache.put(model, temperature, prompt, response, response_format)
+
     return response
@@ -0,0 +1,171 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Prompt text with line endings unified and trailing whitespace removed."""
+    lines = prompt.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).strip()
+
+
+class LLMResponseCache:
+    """
+    SQLite cache of LLM responses keyed by the SHA-256 of (model, temperature,
+    normalized prompt) and, when one was requested, the response format, so
+    a JSON-mode reply is never served for a free-text request.
+
+    `max_entries` keeps only the most recently used responses and
+    `max_age_days` drops responses older than that; both are optional. With
+    `read_only` the file is opened read-only and a miss is an error, so a
+    re-evaluation replays exactly the responses of an earlier run.
+
+    One cache may be used from several threads; a lock serializes access to
+    the connection. Processes open their own cache on the same file.
+    """
+    def __init__(
+        self,
+        path: str,
+        max_entries: Optional[int] = None,
+        max_age_days: Optional[float] = None,
+        read_only: bool = False,
+    ):
+        if max_entries is not None and max_entries <= 0:
+            raise ValueError("max_entries must be greater than 0")
+
+        if max_age_days is not None and max_age_days <= 0:
+            raise ValueError("max_age_days must be greater than 0")
+
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self.read_only = read_only
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+        if read_only:
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"LLM response cache not found: {path}")
+            uri = "file:" + os.path.abspath(path) + "?mode=ro"
+            self.connection = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            return
+
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+
+        self.connection = sqlite3.connect(path, timeout=60, check_same_thread=False)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, model TEXT NOT NULL, response TEXT NOT NULL, "
+            "created REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.connection.commit()
+        self.evict()
+
+    @staticmethod
+    def key(model: str, temperature: float, prompt: str, response_format: Optional[Dict[str, Any]] = None) -> str:
+        parts = (model, temperature, normalize_prompt(prompt))
+        if response_format is not None:
+            parts += (json.dumps(response_format, sort_keys=True, separators=(",", ":")),)
+        return hashlib.sha256(repr(parts).encode()).hexdigest()
+
+    def get(
+        self,
+        model: str,
+        temperature: float,
+        prompt: str,
+        response_format: Optional[Dict[str, Any]] = None,
+    ) -> Optional[str]:
+        key = self.key(model, temperature, prompt, response_format)
+
+        with self.lock:
+            row = self.connection.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            if not self.read_only:
+                self.connection.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+                self.connection.commit()
+
+        return row[0]
+
+    def put(
+        self,
+        model: str,
+        temperature: float,
+        prompt: str,
+        response: str,
+        response_format: Optional[Dict[str, Any]] = None,
+    ):
+        if self.read_only:
+            raise ValueError("Cannot store responses in a read-only LLM response cache.")
+
+        now = time.time()
+
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, created, last_used) VALUES (?, ?, ?, ?, ?)",
+                (self.key(model, temperature, prompt, response_format), model, response, now, now),
+            )
+            self.connection.commit()
+            self.stores += 1
+
+        if self.max_entries is not None:
+            self.evict()
+
+    def evict(self):
+        """Drop responses older than max_age_days, then the least recently used beyond max_entries."""
+        with self.lock:
+            if self.max_age_days is not None:
+                cutoff = time.time() - self.max_age_days * 86400
+                self.connection.execute("DELETE FROM responses WHERE created < ?", (cutoff,))
+
+            if self.max_entries is not None:
+                count = self.connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+                if count > self.max_entries:
+                    self.connection.execute(
+                        "DELETE FROM responses WHERE key IN "
+                        "(SELECT key FROM responses ORDER BY last_used ASC LIMIT ?)",
+                        (count - self.max_entries,),
+                    )
+
+            self.connection.commit()
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            entries = self.connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "entries": entries,
+        }
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+# The cache infer_response consults in this process; None disables caching.
+ACTIVE_RESPONSE_CACHE: Optional[LLMResponseCache] = None
+
+
+def set_response_cache(cache: Optional[LLMResponseCache]):
+    global ACTIVE_RESPONSE_CACHE
+    ACTIVE_RESPONSE_CACHE = cache
+
+
+def get_response_cache() -> Optional[LLMResponseCache]:
+    return ACTIVE_RESPONSE_CACHE
@@ -0,0 +1,151 @@
+import email.utils
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass, replace
+from typing import Any, Dict, Optional, Tuple
+
+import openai
+from openai import OpenAI
+
+from Tree import add_count
+
+
+@dataclass(frozen=True)
+class ClientSettings:
+    """
+    How Match talks to the LLM API. `base_url` None means the SDK default
+    (or OPENAI_BASE_URL); point it at a local OpenAI-compatible server to run
+    matching offline. `timeout` is per request, in seconds. A failed request
+    is retried up to `max_retries` times, waiting as the server's Retry-After
+    asks or else a jittered exponential backoff of `backoff_base * 2**attempt`
+    seconds capped at `backoff_max`.
+    """
+    base_url: Optional[str] = None
+    timeout: float = 120.0
+    max_retries: int = 5
+    backoff_base: float = 1.0
+    backoff_max: float = 60.0
+
+
+CLIENT_SETTINGS = ClientSettings()
+
+# One client per (process, api key, settings). A client keeps its HTTP
+# connection pool, so requests of all samples and threads reuse connections;
+# a forked worker gets its own clients instead of sharing its parent's sockets.
+CLIENTS: Dict[Tuple[int, str, ClientSettings], OpenAI] = {}
+CLIENTS_LOCK = threading.Lock()
+
+RETRYABLE_ERRORS = (
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+
+def configure_client(**changes: Any) -> ClientSettings:
+    """
+    Change fields of the process-wide ClientSettings, e.g.
+    configure_client(base_url="http://localhost:8000/v1", timeout=30).
+    Clients created with the old settings are no longer handed out.
+    """
+    global CLIENT_SETTINGS
+
+    settings = replace(CLIENT_SETTINGS, **changes)
+
+    if settings.timeout <= 0:
+        raise ValueError("timeout must be greater than 0")
+
+    if settings.max_retries < 0:
+        raise ValueError("max_retries must not be negative")
+
+    if settings.backoff_base < 0 or settings.backoff_max < 0:
+        raise ValueError("backoff_base and backoff_max must not be negative")
+
+    with CLIENTS_LOCK:
+        CLIENT_SETTINGS = settings
+        CLIENTS.clear()
+
+    return settings
+
+
+def get_client(api_key: str) -> OpenAI:
+    settings = CLIENT_SETTINGS
+    key = (os.getpid(), api_key, settings)
+
+    with CLIENTS_LOCK:
+        client = CLIENTS.get(key)
+        if client is None:
+            # Retries are done by create_chat_completion, not by the SDK.
+            client = CLIENTS[key] = OpenAI(
+                api_key=api_key,
+                base_url=settings.base_url,
+                timeout=settings.timeout,
+                max_retries=0,
+            )
+
+    return client
+
+
+def retry_after_seconds(exc: Exception) -> Optional[float]:
+    """The wait a response's Retry-After (or retry-after-ms) header asks for, if any."""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms is not None:
+        try:
+            return max(0.0, float(retry_after_ms) / 1000)
+        except ValueError:
+            pass
+
+    retry_after = headers.get("retry-after")
+    if retry_after is None:
+        return None
+
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        pass
+
+    try:
+        retry_at = email.utils.parsedate_to_datetime(retry_after)
+    except (TypeError, ValueError):
+        return None
+
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+def retry_delay(attempt: int, exc: Exception, settings: ClientSettings) -> float:
+    requested = retry_after_seconds(exc)
+    if requested is not None:
+        return min(requested, settings.backoff_max)
+
+    cap = min(settings.backoff_max, settings.backoff_base * 2 ** attempt)
+    return random.uniform(cap / 2, cap)
+
+
+def create_chat_completion(api_key: str, **request: Any):
+    """
+    client.chat.completions.create(**request) on the shared client for
+    `api_key`, retrying connection errors, timeouts, rate limits and server
+    errors as ClientSettings describes.
+    """
+    settings = CLIENT_SETTINGS
+    client = get_client(api_key)
+    attempt = 0
+
+    while True:
+        try:
+            return client.chat.completions.create(**request)
+        except RETRYABLE_ERRORS as exc:
+            if attempt >= settings.max_retries:
+                raise
+
+            add_count("llm retries")
+            time.sleep(retry_delay(attempt, exc, settings))
+            attempt += 1
@@ -1,14 +1,14 @@
 from typing import List, Tuple, Dict, Set, FrozenSet, Any
 from collections import defaultdict
-from copy import deepcopy
 from collections import deque, Counter
 
 from functools import reduce
 from operator import mul
 
-from Tree import Node, NodeType, compare_chance_probs, get_path_to_node, check_no_zero_prob_chance_branches
+from Tree import Node, NodeType, compare_chance_probs, get_path_to_node, check_no_zero_prob_chance_branches, clone_subtree, HistoryTrie
+from Tree import add_count, timed_stage
 
-from .action_match import update_current_nodes, match_all_actions_llm
+from .action_match import update_current_nodes, ChanceActionMatcher
 from .utils import extract_type2_tsm_paths_from_json_files
 
 from typing import Tuple, Any, Dict, List, Optional
@@ -17,7 +17,7 @@ from pathlib import Path
 from typing import Union, Optional
 
 
-def update_nodes_with_switching_order(node: Node, modified_actions_list: List[Tuple[List[str], int, int, int]], level: int = 0):
+def update_nodes_with_switching_order(node: Node, modified_actions_list: List[Tuple[List[str], int, int, int]], level: int = 0, game=None):
     """
     Updates the actions and children keys of each Node with modified actions from unique_actions_modified.
     Ensures consistency for all nodes at the same level.
@@ -25,36 +25,45 @@ def update_nodes_with_switching_order(node: Node, modified_actions_list: List[Tu
     Parameters:
     - node: The current Node being processed.
     - modified_actions_list: A list of tuples (modified_actions, player, level, information_set).
-    - level: The current depth level in the game tree.
+    - level: The depth level of `node` in the game tree.
+    - game: The GameTree owning `node`, whose indexes are kept up to date.
     """
-    if node.node_type == NodeType.PLAYER:
-        # Loop the modified_actions_list to find the node with the same level
-        for modified_actions, player, lvl, info_set in modified_actions_list:
-            if lvl == level:
-                # print(level)
-                node.actions = modified_actions
-                node.player = player
-                node.information_set = info_set
-                node.checked = True
-                new_children = {}
-                old_children = list(node.children.values())
-                
-                # The length of modified_actions and length of actions of old nodes may not be the same
-                if len(modified_actions) != len(old_children):
-                    temp_children = list(node.children.values())[0]
-                    for action in modified_actions:
-                        new_children[action] = deepcopy(temp_children)
-                else:
-                    for action, child in zip(modified_actions, old_children):
-                        new_children[action] = child
-                
-                node.children = new_children
-                break
+    stack = [(node, level)]
+
+    while stack:
+        node, level = stack.pop()
+
+        if node.node_type == NodeType.PLAYER:
+            # Loop the modified_actions_list to find the node with the same level
+            for modified_actions, player, lvl, info_set in modified_actions_list:
+                if lvl == level:
+                    # print(level)
+                    old_state = (node.player, node.information_set, node.actions, dict(node.children))
+                    node.actions = modified_actions
+                    node.player = player
+                    node.information_set = info_set
+                    node.checked = True
+                    new_children = {}
+                    old_children = list(node.children.values())
+                    
+                    # The length of modified_actions and length of actions of old nodes may not be the same
+                    if len(modified_actions) != len(old_children):
+                        temp_children = list(node.children.values())[0]
+                        for action in modified_actions:
+                            new_children[action] = clone_subtree(temp_children, parent=node)
+                    else:
+                        for action, child in zip(modified_actions, old_children):
+                            new_children[action] = child
+                    
+                    node.children = new_children
+                    if game is not None:
+                        game.refresh_node(node, *old_state)
+                    break
 
-    # Recursively update children at the next level
-    for child in node.children.values():
-        # print(level)
-        update_nodes_with_switching_order(child, modified_actions_list, level + 1)
+        # Update children at the next level
+        for child in node.children.values():
+            # print(level)
+            stack.append((child, level + 1))
 
 def node_player_id(node: Node):
     if node.node_type == NodeType.CHANCE:
@@ -65,8 +74,15 @@ def get_unique_actions_by_level_partial_tree(
     node: Node
 ) -> List[Tuple[List[str], Any, int, int]]:
     unique_actions = []
+    stack = [node]
+
+    # Prefix order over the checked part of the tree.
+    while stack:
+        node = stack.pop()
+
+        if not node.checked:
+            continue
 
-    if node.checked:
         unique_actions.append(
             (
                 node.actions,
@@ -76,8 +92,7 @@ def get_unique_actions_by_level_partial_tree(
             )
         )
 
-        for child in node.children.values():
-            unique_actions.extend(get_unique_actions_by_level_partial_tree(child))
+        stack.extend(reversed(node.children.values()))
 
     return unique_actions
 
@@ -251,12 +266,72 @@ def check_simultaneous_move_start_node(
 def profile_key(path):
     return tuple(sorted((player, action) for level, player, action in path))
 
-def filter_simultaneous_moves(ref_node: Node, gen_node: Node, model: str, mappings, game_description, player_names, tsm_path):
+def take_matching_ref_node(ref_nodes_by_action: Dict[Optional[str], deque], g_node: Node) -> Optional[Node]:
+    """Pop the first remaining reference node with g_node's parent action."""
+    candidates = ref_nodes_by_action.get(g_node.parent_action)
+    if not candidates:
+        return None
+    return candidates.popleft()
+
+def prefetch_chance_mappings(ref_node: Node, gen_node: Node, mappings, chance_matcher: ChanceActionMatcher):
+    """
+    Match, before the traversal, the chance action lists that
+    filter_simultaneous_moves will compare. Both trees are walked in
+    lockstep: player actions are followed through `mappings`, and chance
+    actions through the chance mappings found so far. The chance node pairs
+    reached without a mapping are matched together (see
+    ChanceActionMatcher.prefetch), and the walk then goes on below them. The
+    LLM is thus asked once per layer of chance nodes it has to resolve.
+    Branches where the trees disagree are not followed; the traversal
+    reports them, and matches any chance list missed here on its own.
+    """
+    frontier = [(ref_node, gen_node)]
+
+    while frontier:
+        waiting = []
+        stack = frontier
+
+        while stack:
+            r_node, g_node = stack.pop()
+
+            if r_node.node_type != g_node.node_type or len(r_node.children) != len(g_node.children):
+                continue
+
+            if g_node.node_type == NodeType.CHANCE:
+                key_map = chance_matcher.mapping_for(g_node.actions, r_node.actions)
+                if key_map is None:
+                    waiting.append((r_node, g_node))
+                    continue
+            elif g_node.node_type == NodeType.PLAYER:
+                key_map = mappings.get(g_node.player)
+                if key_map is None:
+                    continue
+            else:
+                continue
+
+            ref_children = r_node.children
+            for action, g_child in g_node.children.items():
+                r_child = ref_children.get(key_map.get(action))
+                if r_child is not None:
+                    stack.append((r_child, g_child))
+
+        chance_matcher.prefetch((tuple(g_node.actions), tuple(r_node.actions)) for r_node, g_node in waiting)
+
+        frontier = [
+            (r_node, g_node)
+            for r_node, g_node in waiting
+            if chance_matcher.mapping_for(g_node.actions, r_node.actions) is not None
+        ]
+
+
+def filter_simultaneous_moves(ref_node: Node, gen_node: Node, model: str, mappings, game_description, player_names, tsm_path, gen_game=None):
     """Filters simultaneous moves between a reference game node and a generated game node within a game tree.
     This function traverses the game tree, comparing nodes from the reference game with those from the generated game. It identifies simultaneous moves and ensures that the generated nodes conform to the structure and rules defined by the reference nodes. If discrepancies are found, appropriate errors are raised.
     Args:
         ref_node (Node): The reference game node to compare against.
         gen_node (Node): The generated game node to be filtered.
+        gen_game (GameTree): Optional tree owning gen_node. Its indexes are kept up to date and
+            used to skip the path check for nodes whose history matches no TSM path.
     
     Raises:
         ValueError: If a matching reference node cannot be found for a generated node, or if the reference node does not meet the simultaneous move condition.
@@ -271,20 +346,35 @@ def filter_simultaneous_moves(ref_node: Node, gen_node: Node, model: str, mappin
     queue_ref = deque([ref_node])  # Queue for reference game nodes
     queue_gen = deque([gen_node])  # Queue for generated game nodes
 
-    
+    # Chance nodes with the same labels share one mapping, and the label
+    # pairs they will need are matched in batches before the traversal.
+    chance_matcher = ChanceActionMatcher(model, game_description)
+    prefetch_chance_mappings(ref_node, gen_node, mappings, chance_matcher)
+
+    indexed = gen_game is not None and gen_game.indexed
+    tsm_actions = [tuple(action for _, action in path) for path in tsm_path] if indexed else []
+
     while queue_gen:
         
         level_size_ref = len(queue_ref)  # Number of nodes at this level in ref game
         level_size_gen = len(queue_gen)  # Number of nodes at this level in gen game
+        add_count("nodes visited", level_size_ref + level_size_gen)
 
-        ref_nodes_list = []  # Store all reference nodes for this level
-        
-
-        # Pop all nodes from the reference queue
+        # Reference nodes of this level grouped by parent action, in queue order,
+        # so matching a generated node is a dict lookup instead of a scan.
+        ref_nodes_by_action = defaultdict(deque)
         for _ in range(level_size_ref):
-            ref_nodes_list.append(queue_ref.popleft())
+            r_node = queue_ref.popleft()
+            ref_nodes_by_action[r_node.parent_action].append(r_node)
+        ref_nodes_left = level_size_ref
+
+        # Histories of the TSM paths as ids; relabelling keeps ids stable and
+        # nodes of this level keep their histories during stage 1.
+        if indexed:
+            tsm_histories = {gen_game.histories.lookup(actions) for actions in tsm_actions}
+            tsm_histories.discard(None)
         
-        # We need a temp list to store the reference nodes after each node is removed in ref_nodes_list
+        # We need a temp list to store the reference nodes in the order they are matched
         # This temp list will be used in action matching stage with gen_nodes_list in stage 2
         ref_nodes_list_temp = []
         
@@ -293,7 +383,7 @@ def filter_simultaneous_moves(ref_node: Node, gen_node: Node, model: str, mappin
         ###################### Stage 1: Swtiching the order of nodes for simultaneous moves ######################
         # Process each node in the generated game queue
         for _ in range(level_size_gen):
-            if not ref_nodes_list:
+            if not ref_nodes_left:
                 break  # No more reference nodes to match
 
             g_node = queue_gen.popleft()
@@ -302,15 +392,12 @@ def filter_simultaneous_moves(ref_node: Node, gen_node: Node, model: str, mappin
             if g_node.checked:
                 print("Already checked")
                 gen_nodes_list.append(g_node)
-                match = False
-                for r_node in ref_nodes_list:
-                    if r_node.parent_action == g_node.parent_action:
-                        print("Matched")
-                        ref_nodes_list_temp.append(r_node)
-                        ref_nodes_list.remove(r_node)
-                        match = True
-                        break
-                if not match:
+                r_node = take_matching_ref_node(ref_nodes_by_action, g_node)
+                if r_node is not None:
+                    print("Matched")
+                    ref_nodes_list_temp.append(r_node)
+                    ref_nodes_left -= 1
+                else:
                     raise ValueError(f"Wrong Generated Tree Structure. No matching reference node found for g_node: {g_node} with parent action {g_node.parent_action}")
                 continue
 
@@ -321,7 +408,9 @@ def filter_simultaneous_moves(ref_node: Node, gen_node: Node, model: str, mappin
             # - If there are no Type-2 TSM paths, then no node should be treated as a TSM start.
             # - If Type-2 TSM paths exist, compare the current node's history path against them.
 
-            if tsm_path:
+            if indexed and g_node.history_id not in tsm_histories:
+                gen_is_start_node = False
+            elif tsm_path:
                 path_to_check = get_path_to_node(g_node, player_names)
 
                 gen_is_start_node = check_simultaneous_move_start_node(
@@ -336,16 +425,11 @@ def filter_simultaneous_moves(ref_node: Node, gen_node: Node, model: str, mappin
 
             if not gen_is_start_node:
                 gen_nodes_list.append(g_node)
-                match = False
-                rmn = None # rmn stands for reference matched node
-                for r_node in ref_nodes_list:
-                    if r_node.parent_action == g_node.parent_action:
-                        ref_nodes_list_temp.append(r_node)
-                        ref_nodes_list.remove(r_node)
-                        match = True
-                        rmn = r_node
-                        break
-                if not match:
+                r_node = take_matching_ref_node(ref_nodes_by_action, g_node)
+                if r_node is not None:
+                    ref_nodes_list_temp.append(r_node)
+                    ref_nodes_left -= 1
+                else:
                     raise ValueError(f"Wrong Generated Tree Structure. No matching reference node found for g_node with parent action")
 
                 continue  # Skip the g_node if it doesn't satisfy the condition
@@ -353,14 +437,10 @@ def filter_simultaneous_moves(ref_node: Node, gen_node: Node, model: str, mappin
             print("TSM detected for g_node")
             
             # Step 3: Switch the order of simultaneous moves nodes
-            matched_ref_node = None
-
-            for r_node in ref_nodes_list:
-                if r_node.parent_action == g_node.parent_action:
-                    matched_ref_node = r_node
-                    ref_nodes_list.remove(r_node)
-                    ref_nodes_list_temp.append(r_node)
-                    break  # Stop searching after the first match
+            matched_ref_node = take_matching_ref_node(ref_nodes_by_action, g_node)
+            if matched_ref_node is not None:
+                ref_nodes_list_temp.append(matched_ref_node)
+                ref_nodes_left -= 1
 
             # Raise an error if no matching r_node is found
             if not matched_ref_node:
@@ -373,72 +453,90 @@ def filter_simultaneous_moves(ref_node: Node, gen_node: Node, model: str, mappin
             mark_simultaneous_move_children(g_node)
             
             children_paths = {}
+            # Paths inside the block are history ids; only the profile keys
+            # of the block's exits are materialized.
+            histories = HistoryTrie()
 
-            def collect_paths(node, path):
-                if not node.checked:
-                    return
+            def block_step(node, action):
+                if node.node_type == NodeType.PLAYER:
+                    return (node.level, node.player, action)
+                return (node.level, -1, action)  # CHANCE
 
-                if not node.children:
-                    children_paths[profile_key(path)] = node
-                    return
+            def collect_paths(node, history):
+                stack = [(node, history)]
 
-                for action, child in node.children.items():
-                    if node.node_type == NodeType.PLAYER:
-                        step = (node.level, node.player, action)
-                    else:  # CHANCE
-                        step = (node.level, -1, action)
+                while stack:
+                    node, history = stack.pop()
 
-                    if child.checked:
-                        collect_paths(child, path + [step])
-                    else:
-                        children_paths[profile_key(path + [step])] = child
+                    if not node.checked:
+                        continue
+
+                    if not node.children:
+                        children_paths[profile_key(histories.to_tuple(history))] = node
+                        continue
+
+                    for action, child in reversed(node.children.items()):
+                        child_history = histories.extend(history, block_step(node, action))
+
+                        if child.checked:
+                            stack.append((child, child_history))
+                        else:
+                            children_paths[profile_key(histories.to_tuple(child_history))] = child
 
             
             # Start collecting paths from each action of the start node
             for action in g_node.actions:
                 child = g_node.children[action]
-                if g_node.node_type == NodeType.PLAYER:
-                    collect_paths(child, [(g_node.level ,g_node.player, action)])
-                elif g_node.node_type == NodeType.CHANCE:
-                    collect_paths(child, [(g_node.level, -1, action)])
+                if g_node.node_type in (NodeType.PLAYER, NodeType.CHANCE):
+                    collect_paths(child, histories.extend(HistoryTrie.ROOT, block_step(g_node, action)))
             
             new_gen = reorder_generated_game(matched_ref_node, g_node) # Get a list of reordered nodes like [(['A', 'B'], 1, 0, 1), (['C', 'D', 'E'], 2, 1, 1), (['C', 'D', 'E'], 2, 1, 1)]
             # Update the actions in the generated game to the reordered actions for this simultaneous move part
-            update_nodes_with_switching_order(g_node, new_gen, level=g_node.level) 
+            update_nodes_with_switching_order(g_node, new_gen, level=g_node.level, game=gen_game)
 
             # To restore the original subtree from children_paths after reordering actions in g_node.
             # After reordering actions using update_nodes_with_switching_order, the structure of g_node is changed. 
             # We need to track the path first and then restore the correct children on the path.
 
-            def collect_paths_new(node, path):
-                if not node.checked:
-                    return
+            replaced = []  # (parent, action, previous child) for the indexes
 
-                for action, child in node.children.items():
-                    if node.node_type == NodeType.PLAYER:
-                        step = (node.level, node.player, action)
-                    else:  # CHANCE
-                        step = (node.level, -1, action)
+            def collect_paths_new(node, history):
+                stack = [(node, history)]
 
-                    if child.checked:
-                        collect_paths_new(child, path + [step])
-                    else:
-                        final_key = profile_key(path + [step])
-                        original_node = children_paths.get(final_key)
-                        print("final_key", final_key, "original_node", original_node)
+                while stack:
+                    node, history = stack.pop()
+
+                    if not node.checked:
+                        continue
+
+                    checked_children = []
+
+                    for action, child in node.children.items():
+                        child_history = histories.extend(history, block_step(node, action))
 
-                        if original_node is not None:
-                            node.children[action] = original_node
+                        if child.checked:
+                            checked_children.append((child, child_history))
                         else:
-                            raise ValueError(
-                                f"Failed to restore subtree for simultaneous action profile: {final_key}"
-                            )
+                            final_key = profile_key(histories.to_tuple(child_history))
+                            original_node = children_paths.get(final_key)
+                            print("final_key", final_key, "original_node", original_node)
+
+                            if original_node is not None:
+                                replaced.append((node, action, child))
+                                node.children[action] = original_node
+                            else:
+                                raise ValueError(
+                                    f"Failed to restore subtree for simultaneous action profile: {final_key}"
+                                )
+
+                    stack.extend(reversed(checked_children))
 
             for action, child in g_node.children.items():
-                if g_node.node_type == NodeType.PLAYER:
-                    collect_paths_new(child, [(g_node.level, g_node.player, action)])
-                elif g_node.node_type == NodeType.CHANCE:
-                    collect_paths_new(child, [(g_node.level, -1, action)])
+                if g_node.node_type in (NodeType.PLAYER, NodeType.CHANCE):
+                    collect_paths_new(child, histories.extend(HistoryTrie.ROOT, block_step(g_node, action)))
+
+            if gen_game is not None:
+                gen_game.replace_children(replaced)
             
             gen_nodes_list.append(g_node)
               
@@ -460,7 +558,7 @@ def filter_simultaneous_moves(ref_node: Node, gen_node: Node, model: str, mappin
                 if g_node.node_type == NodeType.CHANCE:
                     # If it is a chance node, we need to match the action labels during traversal.
                     ref_actions = r_node.actions
-                    key_map = match_all_actions_llm(g_node.actions, ref_actions, model, game_description)
+                    key_map = chance_matcher.match(g_node.actions, ref_actions)
                     modified_actions = [key_map[a] for a in g_node.actions]
                 else:
                     key = g_node.player  # player-by-player mapping
@@ -486,7 +584,7 @@ def filter_simultaneous_moves(ref_node: Node, gen_node: Node, model: str, mappin
                     if Counter(modified_actions) != Counter(ref_actions):
                         raise ValueError("The actions in the generated game do not match the actions in the reference game.")
                 
-                update_current_nodes(g_node, modified_actions, ref_actions)
+                update_current_nodes(g_node, modified_actions, ref_actions, game=gen_game)
 
             for action, child in r_node.children.items():
                 child.parent_action = action
@@ -504,21 +602,26 @@ def build_infoset_partition(
     *,
     include_chance: bool = True,
     require_parent_action: bool = True,
+    histories: Optional[HistoryTrie] = None,
 ) -> Dict[Tuple[int, int], Set[Tuple[Tuple[int, str], ...]]]:
     """
     Returns a mapping:
         (player, information_set_id) -> set of node-paths
+
+    With `histories`, node-paths are history ids in that trie instead of
+    tuples, so partitions built with the same trie compare directly.
     """
     partition: Dict[Tuple[int, int], Set[Tuple[Tuple[int, str], ...]]] = defaultdict(set)
 
-    stack: List[Tuple[Node, Tuple[Tuple[int, str], ...]]] = [(root, tuple())]
+    trie = histories if histories is not None else HistoryTrie()
+    stack: List[Tuple[Node, int]] = [(root, HistoryTrie.ROOT)]
 
     while stack:
-        node, path = stack.pop()
+        node, history = stack.pop()
 
         if node.node_type == NodeType.PLAYER and node.information_set is not None:
             key = (node.player, node.information_set)
-            partition[key].add(path)
+            partition[key].add(history if histories is not None else trie.to_tuple(history))
 
         for action, child in node.children.items():
             edge_action = getattr(child, "parent_action", None)
@@ -529,16 +632,13 @@ def build_infoset_partition(
                 raise ValueError("Child has no parent_action and action key is None/unavailable.")
 
             if node.node_type == NodeType.PLAYER:
-                next_path = path + ((node.player, edge_action),)
-            elif node.node_type == NodeType.CHANCE:
-                if include_chance:
-                    next_path = path + ((-1, edge_action),)
-                else:
-                    next_path = path
+                next_history = trie.extend(history, (node.player, edge_action))
+            elif node.node_type == NodeType.CHANCE and include_chance:
+                next_history = trie.extend(history, (-1, edge_action))
             else:
-                next_path = path
+                next_history = history
 
-            stack.append((child, next_path))
+            stack.append((child, next_history))
 
     return partition
 
@@ -560,8 +660,10 @@ def infoset_partitions_equal(ref_root: Node, gen_root: Node) -> Tuple[bool, Any]
     Returns (equal, debug_info). Comparison is ID-independent.
     debug_info contains canonical forms if not equal.
     """
-    ref_part = build_infoset_partition(ref_root)
-    gen_part = build_infoset_partition(gen_root)
+    # One trie for both trees, so equal paths share a history id.
+    histories = HistoryTrie()
+    ref_part = build_infoset_partition(ref_root, histories=histories)
+    gen_part = build_infoset_partition(gen_root, histories=histories)
 
     ref_can = canonicalize_partition(ref_part)
     gen_can = canonicalize_partition(gen_part)
@@ -569,11 +671,14 @@ def infoset_partitions_equal(ref_root: Node, gen_root: Node) -> Tuple[bool, Any]
     ok = (ref_can == gen_can)
     debug = None
     if not ok:
+        def materialize(groups):
+            return [frozenset(map(histories.to_tuple, group)) for group in groups]
+
         debug = {
             "ref_num_infosets": len(ref_part),
             "gen_num_infosets": len(gen_part),
-            "ref_groups": ref_can,
-            "gen_groups": gen_can,
+            "ref_groups": materialize(ref_can),
+            "gen_groups": materialize(gen_can),
         }
     return ok, debug
 
@@ -605,7 +710,8 @@ def switch_order(
 
     print("Path to TSM: ", path_to_tsm)
 
-    filter_simultaneous_moves(ref_node, gen_node, model, mappings, game_description, gen_game.players, path_to_tsm)
+    with timed_stage("tsm reorder"):
+        filter_simultaneous_moves(ref_node, gen_node, model, mappings, game_description, gen_game.players, path_to_tsm, gen_game=gen_game)
     
     # Check the information set partitions are correct.
     # ok, debug = infoset_partitions_equal(ref_node, gen_node)
@@ -616,7 +722,8 @@ def switch_order(
     #     )
     
     # Check chance nodes and their probabilities by path.
-    chance_ok = compare_chance_probs(ref_game, gen_game)
+    with timed_stage("chance check"):
+        chance_ok = compare_chance_probs(ref_game, gen_game)
 
     if not chance_ok:
         raise ValueError(
@@ -22,23 +22,28 @@ def reorder_players(gen_game, ref_players: List[str]):
     # Update the game players order
     gen_game.players = ref_players
     
-    def update_player_numbers(node: Node):
-        if node.node_type == NodeType.PLAYER and node.player in player_mapping:
-            node.player = player_mapping[node.player]
-        
-        for child in node.children.values():
-            update_player_numbers(child)
-        # Reorder payoffs for terminal nodes
-        if node.node_type == NodeType.TERMINAL and node.payoffs:
-            reordered = [0] * len(node.payoffs)
-            for old_idx, payoff in enumerate(node.payoffs):
-                new_idx = payoff_mapping[old_idx]
-                reordered[new_idx] = payoff
-            node.payoffs = reordered
+    def update_player_numbers(root: Node):
+        stack = [root]
+
+        while stack:
+            node = stack.pop()
+
+            if node.node_type == NodeType.PLAYER and node.player in player_mapping:
+                node.player = player_mapping[node.player]
+
+            stack.extend(node.children.values())
+            # Reorder payoffs for terminal nodes
+            if node.node_type == NodeType.TERMINAL and node.payoffs:
+                reordered = [0] * len(node.payoffs)
+                for old_idx, payoff in enumerate(node.payoffs):
+                    new_idx = payoff_mapping[old_idx]
+                    reordered[new_idx] = payoff
+                node.payoffs = reordered
     
     # Apply updates to the tree
     if gen_game.root:
         update_player_numbers(gen_game.root)
+        gen_game.remap_players(player_mapping)
 
 def match_palyer_name_llm(gen_game, ref_game, model):
     gen_players = gen_game.players
@@ -3,3 +3,7 @@ from .tree import NodeType
 from .tree import EFGParser
 from .tree import GameTree
 from .tree import compare_chance_probs, compare_information_sets, get_path_to_node, check_no_zero_prob_chance_branches
+from .tree import iter_paths, clone_subtree, HistoryTrie, iter_histories
+from .compact_tree import CompactGameTree, NodeView
+from .parse_cache import ParseCache, share_clone, file_digest
+from .instrumentation import StageRecorder, QuantileSketch, recording, timed_stage, add_count
@@ -0,0 +1,492 @@
+from typing import List, Dict, Optional, Union, Iterator
+import sys
+
+import numpy as np
+
+from .tree import Node, NodeType, GameTree, EFGParser, EFGSource
+
+
+# Node types are stored as small integer codes; the position in this tuple is the code.
+NODE_TYPES = (NodeType.PLAYER, NodeType.CHANCE, NodeType.TERMINAL)
+NODE_TYPE_CODES = {node_type: code for code, node_type in enumerate(NODE_TYPES)}
+
+PLAYER_CODE = NODE_TYPE_CODES[NodeType.PLAYER]
+CHANCE_CODE = NODE_TYPE_CODES[NodeType.CHANCE]
+TERMINAL_CODE = NODE_TYPE_CODES[NodeType.TERMINAL]
+
+# Sentinel for fields that are None on a Node (no player, no information set, ...).
+MISSING = -1
+
+
+class StringTable:
+    """
+    Interns strings to dense integer ids while a tree is being packed. Once
+    frozen, the distinct strings are kept as one concatenated string plus an
+    offsets array, so each costs its characters and four bytes rather than a
+    Python object and a dict entry.
+    """
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.pool = ''
+        self.offsets = np.zeros(1, dtype=np.int32)
+
+    def intern(self, value: Optional[str]) -> int:
+        if value is None:
+            return MISSING
+
+        string_id = self.ids.get(value)
+        if string_id is None:
+            string_id = len(self.ids)
+            self.ids[value] = string_id
+        return string_id
+
+    def freeze(self):
+        strings = list(self.ids)
+        self.pool = ''.join(strings)
+        self.offsets = np.zeros(len(strings) + 1, dtype=np.int32)
+        np.cumsum([len(value) for value in strings], out=self.offsets[1:])
+        self.ids = {}
+
+    def lookup(self, string_id: int) -> Optional[str]:
+        if string_id == MISSING:
+            return None
+        return self.pool[self.offsets[string_id]:self.offsets[string_id + 1]]
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    @property
+    def nbytes(self) -> int:
+        return sys.getsizeof(self.pool) + self.offsets.nbytes
+
+
+class CompactGameTree:
+    """
+    Struct-of-arrays game tree.
+
+    Nodes are numbered in breadth-first order, so the children of node `i` are
+    the contiguous range `first_child[i]:first_child[i + 1]` and the root is
+    node 0. Per-node fields live in NumPy arrays, action labels and all other
+    strings are interned, and terminal payoffs form one matrix with a row per
+    terminal node.
+
+    `root` returns a read-mostly `NodeView`, so the code written against `Node`
+    (the compare functions, the reference side of `Match`) runs on either
+    representation. Use `to_game_tree()` where the tree has to be restructured.
+    """
+    def __init__(self, title: str, players: List[str]):
+        self.title = title
+        self.players = players
+
+        self.action_labels = StringTable()
+        self.labels = StringTable()
+
+        # Per node, indexed by node id.
+        self.node_type = np.zeros(0, dtype=np.int8)
+        self.parent = np.zeros(0, dtype=np.int32)
+        self.first_child = np.zeros(1, dtype=np.int32)
+        self.edge_action = np.zeros(0, dtype=np.int32)
+        self.player = np.zeros(0, dtype=np.int16)
+        self.information_set = np.zeros(0, dtype=np.int32)
+        self.information_set_label = np.zeros(0, dtype=np.int32)
+        self.label = np.zeros(0, dtype=np.int32)
+        self.depth = np.zeros(0, dtype=np.int32)
+        self.checked = np.zeros(0, dtype=bool)
+        self.terminal = np.zeros(0, dtype=np.int32)
+
+        # Actions of node `i` are action_ids[first_action[i]:first_action[i + 1]];
+        # chance probabilities are interned labels aligned with action_ids.
+        self.first_action = np.zeros(1, dtype=np.int32)
+        self.action_ids = np.zeros(0, dtype=np.int32)
+        self.prob_ids = np.zeros(0, dtype=np.int32)
+
+        # Per terminal node, indexed by terminal[i]. Payoff rows are padded with
+        # NaN up to the longest payoff vector; payoff_is_int keeps int payoffs
+        # distinct from floats.
+        self.payoffs = np.zeros((0, len(players)), dtype=np.float64)
+        self.payoff_is_int = np.zeros((0, len(players)), dtype=bool)
+        self.payoff_length = np.zeros(0, dtype=np.int16)
+        self.outcome_number = np.zeros(0, dtype=np.int32)
+        self.outcome_name = np.zeros(0, dtype=np.int32)
+
+    @classmethod
+    def from_game_tree(cls, game: GameTree) -> 'CompactGameTree':
+        """
+        Pack a Node-based GameTree into arrays.
+        """
+        tree = cls(game.title, list(game.players))
+        if game.root is None:
+            return tree
+
+        # Breadth-first numbering keeps every node's children contiguous.
+        order = [game.root]
+        parents = [MISSING]
+        edges = [MISSING]
+        first_child = []
+
+        for index, node in enumerate(order):
+            first_child.append(len(order))
+            for action, child in node.children.items():
+                order.append(child)
+                parents.append(index)
+                edges.append(tree.action_labels.intern(action))
+        first_child.append(len(order))
+
+        count = len(order)
+        node_type = np.empty(count, dtype=np.int8)
+        player = np.full(count, MISSING, dtype=np.int16)
+        information_set = np.full(count, MISSING, dtype=np.int32)
+        information_set_label = np.full(count, MISSING, dtype=np.int32)
+        label = np.empty(count, dtype=np.int32)
+        depth = np.empty(count, dtype=np.int32)
+        checked = np.empty(count, dtype=bool)
+        terminal = np.full(count, MISSING, dtype=np.int32)
+
+        first_action = [0]
+        action_ids = []
+        prob_ids = []
+        payoff_rows = []
+        outcome_number = []
+        outcome_name = []
+
+        intern_action = tree.action_labels.intern
+        intern_label = tree.labels.intern
+
+        for index, node in enumerate(order):
+            node_type[index] = NODE_TYPE_CODES[node.node_type]
+            label[index] = intern_label(node.label)
+            depth[index] = node.level
+            checked[index] = node.checked
+
+            if node.player is not None:
+                player[index] = node.player
+            if node.information_set is not None:
+                information_set[index] = node.information_set
+            information_set_label[index] = intern_label(node.information_set_label)
+
+            if node.node_type == NodeType.TERMINAL:
+                terminal[index] = len(payoff_rows)
+                payoff_rows.append(node.payoffs or [])
+                outcome_number.append(MISSING if node.outcome_number is None else node.outcome_number)
+                outcome_name.append(intern_label(node.outcome_name))
+
+            for action in node.actions or ():
+                action_ids.append(intern_action(action))
+                if node.probs is not None and action in node.probs:
+                    prob_ids.append(intern_label(str(node.probs[action])))
+                else:
+                    prob_ids.append(MISSING)
+            first_action.append(len(action_ids))
+
+        width = max((len(row) for row in payoff_rows), default=len(game.players))
+        payoffs = np.full((len(payoff_rows), width), np.nan, dtype=np.float64)
+        payoff_is_int = np.zeros((len(payoff_rows), width), dtype=bool)
+        payoff_length = np.empty(len(payoff_rows), dtype=np.int16)
+
+        for row, values in enumerate(payoff_rows):
+            payoff_length[row] = len(values)
+            for column, value in enumerate(values):
+                payoffs[row, column] = value
+                payoff_is_int[row, column] = isinstance(value, int)
+
+        tree.node_type = node_type
+        tree.parent = np.array(parents, dtype=np.int32)
+        tree.first_child = np.array(first_child, dtype=np.int32)
+        tree.edge_action = np.array(edges, dtype=np.int32)
+        tree.player = player
+        tree.information_set = information_set
+        tree.information_set_label = information_set_label
+        tree.label = label
+        tree.depth = depth
+        tree.checked = checked
+        tree.terminal = terminal
+        tree.first_action = np.array(first_action, dtype=np.int32)
+        tree.action_ids = np.array(action_ids, dtype=np.int32)
+        tree.prob_ids = np.array(prob_ids, dtype=np.int32)
+        tree.payoffs = payoffs
+        tree.payoff_is_int = payoff_is_int
+        tree.payoff_length = payoff_length
+        tree.outcome_number = np.array(outcome_number, dtype=np.int32)
+        tree.outcome_name = np.array(outcome_name, dtype=np.int32)
+
+        tree.action_labels.freeze()
+        tree.labels.freeze()
+
+        return tree
+
+    @classmethod
+    def from_efg(cls, source: EFGSource) -> 'CompactGameTree':
+        """
+        Parse an EFG path, string or stream and pack the result. The Node tree
+        built by the parser is dropped once the arrays are filled.
+        """
+        return cls.from_game_tree(EFGParser().parse(source))
+
+    def __len__(self) -> int:
+        return len(self.node_type)
+
+    @property
+    def root(self) -> Optional['NodeView']:
+        if not len(self):
+            return None
+        return NodeView(self, 0)
+
+    def node(self, index: int) -> 'NodeView':
+        return NodeView(self, index)
+
+    def children_of(self, index: int) -> range:
+        return range(self.first_child[index], self.first_child[index + 1])
+
+    def actions_of(self, index: int) -> List[str]:
+        lookup = self.action_labels.lookup
+        start, end = self.first_action[index], self.first_action[index + 1]
+        return [lookup(action_id) for action_id in self.action_ids[start:end].tolist()]
+
+    def payoffs_of(self, index: int) -> Optional[List[Union[int, float]]]:
+        row = self.terminal[index]
+        if row == MISSING:
+            return None
+
+        length = self.payoff_length[row]
+        values = self.payoffs[row, :length].tolist()
+        is_int = self.payoff_is_int[row, :length].tolist()
+        return [int(value) if integral else value for value, integral in zip(values, is_int)]
+
+    def terminal_nodes(self) -> np.ndarray:
+        """
+        Node ids of all terminal nodes, in payoff-row order.
+        """
+        return np.flatnonzero(self.node_type == TERMINAL_CODE)
+
+    def iter_nodes(self) -> Iterator['NodeView']:
+        """
+        Yield a view of every node in breadth-first order.
+        """
+        for index in range(len(self)):
+            yield NodeView(self, index)
+
+    def get_total_unique_actions(self) -> Dict[Union[int, str], List[str]]:
+        """
+        Same result as GameTree.get_total_unique_actions, computed on the arrays.
+        """
+        if not len(self):
+            return {}
+
+        counts = np.diff(self.first_action)
+        owners = np.repeat(self.player, counts)
+        is_player = np.repeat(self.node_type == PLAYER_CODE, counts) & (owners != MISSING)
+
+        pairs = np.unique(np.stack([owners[is_player], self.action_ids[is_player]], axis=1), axis=0)
+
+        actions_map = {}
+        for player, action_id in pairs.tolist():
+            actions_map.setdefault(player, []).append(self.action_labels.lookup(action_id))
+
+        return {player: sorted(actions) for player, actions in actions_map.items()}
+
+    def to_game_tree(self) -> GameTree:
+        """
+        Materialize the equivalent Node-based GameTree, e.g. for the in-place
+        restructuring done on the generated game during matching.
+        """
+        game = GameTree(self.title, list(self.players))
+        if not len(self):
+            return game
+
+        nodes = [NodeView(self, index).to_node() for index in range(len(self))]
+        game.root = nodes[0]
+        game.level_to_nodes[nodes[0].level].append(nodes[0])
+
+        edge_label = self.action_labels.lookup
+        for index, (parent, edge) in enumerate(zip(self.parent.tolist(), self.edge_action.tolist())):
+            if parent == MISSING:
+                continue
+            nodes[parent].add_child(edge_label(edge), nodes[index])
+            game.level_to_nodes[nodes[index].level].append(nodes[index])
+
+        game.build_indexes()
+        return game
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Memory held by the arrays and the interned strings.
+        """
+        arrays = (
+            self.node_type, self.parent, self.first_child, self.edge_action, self.player,
+            self.information_set, self.information_set_label, self.label, self.depth,
+            self.checked, self.terminal, self.first_action, self.action_ids, self.prob_ids,
+            self.payoffs, self.payoff_is_int, self.payoff_length,
+            self.outcome_number, self.outcome_name,
+        )
+        return sum(array.nbytes for array in arrays) + self.action_labels.nbytes + self.labels.nbytes
+
+
+class NodeView:
+    """
+    A `Node`-compatible handle on one node of a CompactGameTree.
+
+    Reads go straight to the arrays. `player`, `payoffs`, `checked` and
+    `parent_action` can be assigned, as matching does on reference nodes;
+    the tree structure itself is read-only. Views are created on demand, so
+    compare them with == rather than `is`.
+    """
+    __slots__ = ('tree', 'index')
+
+    def __init__(self, tree: CompactGameTree, index: int):
+        self.tree = tree
+        self.index = index
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, NodeView) and self.tree is other.tree and self.index == other.index
+
+    def __hash__(self) -> int:
+        return hash((id(self.tree), self.index))
+
+    def __repr__(self) -> str:
+        return f"NodeView(index={self.index}, node_type={self.node_type}, label={self.label!r})"
+
+    @property
+    def node_type(self) -> NodeType:
+        return NODE_TYPES[self.tree.node_type[self.index]]
+
+    @property
+    def label(self) -> str:
+        return self.tree.labels.lookup(self.tree.label[self.index])
+
+    @property
+    def player(self) -> Optional[int]:
+        player = int(self.tree.player[self.index])
+        return None if player == MISSING else player
+
+    @player.setter
+    def player(self, value: Optional[int]):
+        self.tree.player[self.index] = MISSING if value is None else value
+
+    @property
+    def information_set(self) -> Optional[int]:
+        information_set = int(self.tree.information_set[self.index])
+        return None if information_set == MISSING else information_set
+
+    @property
+    def information_set_label(self) -> Optional[str]:
+        return self.tree.labels.lookup(self.tree.information_set_label[self.index])
+
+    @property
+    def actions(self) -> Optional[List[str]]:
+        if self.tree.node_type[self.index] == TERMINAL_CODE:
+            return None
+        return self.tree.actions_of(self.index)
+
+    @property
+    def raw_actions(self) -> Optional[List[str]]:
+        if self.tree.node_type[self.index] != CHANCE_CODE:
+            return None
+        return self.tree.actions_of(self.index)
+
+    @property
+    def probs(self) -> Optional[Dict[str, str]]:
+        tree = self.tree
+        if tree.node_type[self.index] != CHANCE_CODE:
+            return None
+
+        start, end = tree.first_action[self.index], tree.first_action[self.index + 1]
+        return {
+            tree.action_labels.lookup(action_id): tree.labels.lookup(prob_id)
+            for action_id, prob_id in zip(tree.action_ids[start:end].tolist(), tree.prob_ids[start:end].tolist())
+        }
+
+    @property
+    def children(self) -> Dict[str, 'NodeView']:
+        tree = self.tree
+        return {
+            tree.action_labels.lookup(tree.edge_action[child]): NodeView(tree, child)
+            for child in tree.children_of(self.index)
+        }
+
+    @property
+    def parent(self) -> 'NodeView':
+        parent = int(self.tree.parent[self.index])
+        if parent == MISSING:
+            # Mirrors Node, where the root has no `parent` attribute at all.
+            raise AttributeError("The root node has no parent.")
+        return NodeView(self.tree, parent)
+
+    @property
+    def parent_action(self) -> Optional[str]:
+        return self.tree.action_labels.lookup(self.tree.edge_action[self.index])
+
+    @parent_action.setter
+    def parent_action(self, value: Optional[str]):
+        if value != self.parent_action:
+            raise ValueError(
+                f"Cannot relabel the edge into node {self.index} from "
+                f"{self.parent_action!r} to {value!r} on a compact tree."
+            )
+
+    @property
+    def payoffs(self) -> Optional[List[Union[int, float]]]:
+        return self.tree.payoffs_of(self.index)
+
+    @payoffs.setter
+    def payoffs(self, values: List[Union[int, float]]):
+        tree = self.tree
+        row = tree.terminal[self.index]
+        if row == MISSING:
+            raise ValueError(f"Node {self.index} is not a terminal node and has no payoffs.")
+        if len(values) > tree.payoffs.shape[1]:
+            raise ValueError(
+                f"Got {len(values)} payoffs; the compact tree stores at most {tree.payoffs.shape[1]}."
+            )
+
+        tree.payoffs[row] = np.nan
+        tree.payoffs[row, :len(values)] = values
+        tree.payoff_is_int[row] = False
+        tree.payoff_is_int[row, :len(values)] = [isinstance(value, int) for value in values]
+        tree.payoff_length[row] = len(values)
+
+    @property
+    def outcome_number(self) -> Optional[int]:
+        row = self.tree.terminal[self.index]
+        if row == MISSING or self.tree.outcome_number[row] == MISSING:
+            return None
+        return int(self.tree.outcome_number[row])
+
+    @property
+    def outcome_name(self) -> str:
+        row = self.tree.terminal[self.index]
+        if row == MISSING:
+            return ""
+        return self.tree.labels.lookup(self.tree.outcome_name[row]) or ""
+
+    @property
+    def level(self) -> int:
+        return int(self.tree.depth[self.index])
+
+    @property
+    def checked(self) -> bool:
+        return bool(self.tree.checked[self.index])
+
+    @checked.setter
+    def checked(self, value: bool):
+        self.tree.checked[self.index] = value
+
+    def to_node(self) -> Node:
+        """
+        Copy this node's fields into a standalone Node without children.
+        """
+        return Node(
+            node_type=self.node_type,
+            label=self.label,
+            player=self.player,
+            information_set=self.information_set,
+            information_set_label=self.information_set_label,
+            actions=self.actions,
+            payoffs=self.payoffs,
+            outcome_number=self.outcome_number,
+            outcome_name=self.outcome_name,
+            probs=self.probs,
+            level=self.level,
+            checked=self.checked,
+            raw_actions=self.raw_actions,
+        )
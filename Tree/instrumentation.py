@@ -0,0 +1,159 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Optional, Union
+import math
+import time
+
+
+class StageRecorder:
+    """
+    Wall time and call count per named stage, plus named counters, for one
+    unit of work such as an evaluated sample.
+
+    Stages may nest; the time of a nested stage is also part of the stage
+    around it.
+    """
+    def __init__(self):
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self.counters: Dict[str, int] = {}
+
+    def add_time(self, name: str, seconds: float, calls: int = 1):
+        entry = self.stages.setdefault(name, {"seconds": 0.0, "calls": 0})
+        entry["seconds"] += seconds
+        entry["calls"] += calls
+
+    def count(self, name: str, amount: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def merge(self, recorded: Optional[Dict[str, Any]]):
+        """Add the stages and counters of another recorder's `as_dict()`."""
+        if not recorded:
+            return
+
+        for name, entry in recorded.get("stages", {}).items():
+            self.add_time(name, entry["seconds"], entry["calls"])
+
+        for name, amount in recorded.get("counters", {}).items():
+            self.count(name, amount)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "stages": {name: dict(entry) for name, entry in self.stages.items()},
+            "counters": dict(self.counters),
+        }
+
+
+class QuantileSketch:
+    """
+    Approximate quantiles of a stream of non-negative values in fixed
+    memory: values fall into logarithmic bins GROWTH apart, so a reported
+    quantile is within about 1% of a value in the stream. Values at or below
+    MIN_VALUE share one bin, and values above MAX_VALUE are clamped into the
+    last one, so a sketch never has more than a few thousand bins however
+    many values are added. The count, total, minimum and maximum are exact.
+
+    Quantiles of whole numbers are rounded back to whole numbers.
+    """
+    GROWTH = 1.02
+    MIN_VALUE = 1e-6
+    MAX_VALUE = 1e9
+
+    def __init__(self):
+        self.bins: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0
+        self.minimum: Optional[float] = None
+        self.maximum: Optional[float] = None
+        self.integral = True
+
+    @classmethod
+    def bin_of(cls, value: float) -> int:
+        if value <= cls.MIN_VALUE:
+            return 0
+        value = min(value, cls.MAX_VALUE)
+        return 1 + math.ceil(math.log(value / cls.MIN_VALUE, cls.GROWTH))
+
+    @classmethod
+    def bin_value(cls, index: int) -> float:
+        """The middle of bin `index`, whose values are within GROWTH of each other."""
+        if index == 0:
+            return 0.0
+        upper = cls.MIN_VALUE * cls.GROWTH ** (index - 1)
+        return 2 * upper / (1 + cls.GROWTH)
+
+    def add(self, value: Union[int, float]):
+        if value < 0:
+            raise ValueError("QuantileSketch only holds non-negative values")
+
+        index = self.bin_of(value)
+        self.bins[index] = self.bins.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        self.minimum = value if self.minimum is None else min(self.minimum, value)
+        self.maximum = value if self.maximum is None else max(self.maximum, value)
+        self.integral = self.integral and isinstance(value, int)
+
+    def merge(self, other: 'QuantileSketch'):
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+        if other.count:
+            self.minimum = other.minimum if self.minimum is None else min(self.minimum, other.minimum)
+            self.maximum = other.maximum if self.maximum is None else max(self.maximum, other.maximum)
+        self.count += other.count
+        self.total += other.total
+        self.integral = self.integral and other.integral
+
+    def quantile(self, fraction: float) -> Union[int, float]:
+        """Nearest-rank quantile, as for a sorted list of the values added."""
+        if not self.count:
+            raise ValueError("No values in the sketch")
+
+        rank = max(1, math.ceil(fraction * self.count))
+        seen = 0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen >= rank:
+                value = min(max(self.bin_value(index), self.minimum), self.maximum)
+                return round(value) if self.integral else value
+
+        return self.maximum
+
+
+# The recorder of the work running in this thread (or task), if any.
+CURRENT_RECORDER: ContextVar[Optional[StageRecorder]] = ContextVar("current_recorder", default=None)
+
+
+@contextmanager
+def recording(recorder: Optional[StageRecorder] = None):
+    """
+    Make `recorder` (a new one by default) the target of timed_stage and
+    add_count until the block ends.
+    """
+    recorder = recorder if recorder is not None else StageRecorder()
+    token = CURRENT_RECORDER.set(recorder)
+    try:
+        yield recorder
+    finally:
+        CURRENT_RECORDER.reset(token)
+
+
+@contextmanager
+def timed_stage(name: str):
+    """Time the block as one call of stage `name`. Does nothing outside recording()."""
+    recorder = CURRENT_RECORDER.get()
+    if recorder is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        recorder.add_time(name, time.perf_counter() - start)
+
+
+def add_count(name: str, amount: int = 1):
+    """Add to counter `name`. Does nothing outside recording()."""
+    recorder = CURRENT_RECORDER.get()
+    if recorder is not None:
+        recorder.count(name, amount)
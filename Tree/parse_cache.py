@@ -0,0 +1,220 @@
+from typing import Dict, Optional, Tuple, Union
+from collections import OrderedDict
+import hashlib
+import os
+import pickle
+
+from .tree import Node, GameTree, EFGParser
+from .compact_tree import CompactGameTree
+from .instrumentation import add_count
+
+# Bump when the parser or the pickled layout changes, so stale disk entries
+# are ignored instead of loaded.
+PARSE_CACHE_VERSION = 1
+
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def file_digest(filename: Union[str, os.PathLike], digests: Dict[str, Tuple[int, int, str]]) -> str:
+    """
+    SHA-256 of a file's content. `digests` remembers each file's digest with
+    its mtime and size, so an unchanged file is hashed only once.
+    """
+    path = os.path.abspath(filename)
+    stat = os.stat(path)
+
+    known = digests.get(path)
+    if known is not None and known[:2] == (stat.st_mtime_ns, stat.st_size):
+        return known[2]
+
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            sha.update(chunk)
+
+    digest = sha.hexdigest()
+    digests[path] = (stat.st_mtime_ns, stat.st_size, digest)
+    return digest
+
+
+def share_clone(game: GameTree) -> GameTree:
+    """
+    Copy-on-write clone of a parsed game.
+
+    Every node and `children` dict is copied, so the clone can be restructured
+    freely, but the leaf containers (`actions`, `payoffs`, `probs`,
+    `raw_actions`) and strings are shared with the original. Matching only ever
+    replaces these containers (`node.payoffs = reordered`), which leaves the
+    original untouched; callers must not edit them in place. The clone gets
+    its own indexes.
+    """
+    clone = GameTree(game.title, list(game.players))
+    if game.root is None:
+        return clone
+
+    def copy_node(node: Node) -> Node:
+        copied = Node.__new__(Node)
+        copied.__dict__.update(node.__dict__)
+        return copied
+
+    root = copy_node(game.root)
+    root.__dict__.pop('parent', None)
+    clone.root = root
+    level_to_nodes = clone.level_to_nodes
+    level_to_nodes[root.level].append(root)
+
+    stack = [(game.root, root)]
+
+    while stack:
+        original, copied = stack.pop()
+        children = {}
+        for action, child in original.children.items():
+            child_copy = copy_node(child)
+            child_copy.parent = copied
+            children[action] = child_copy
+        copied.children = children
+
+        for action, child in reversed(original.children.items()):
+            stack.append((child, children[action]))
+        for child_copy in children.values():
+            level_to_nodes[child_copy.level].append(child_copy)
+
+    clone.build_indexes()
+    add_count("tree clones")
+    add_count("nodes cloned", len(clone.nodes_by_history))
+    return clone
+
+
+class ParseCache:
+    """
+    Cache of parsed EFG files keyed by the SHA-256 of their content.
+
+    Parsed trees are kept in an in-process LRU and, when `cache_dir` is given,
+    pickled to disk as CompactGameTree so other runs can skip parsing too.
+    `parse_file` hands out copy-on-write clones (see `share_clone`), so callers
+    may mutate the tree they get without affecting the cached one.
+
+    A file's digest is remembered together with its size and mtime; when
+    either changes the file is hashed again and looked up under its new
+    content. `invalidate` drops entries explicitly, e.g. after an edit that
+    kept the mtime.
+    """
+    def __init__(self, max_entries: int = 128, cache_dir: Optional[str] = None):
+        if max_entries <= 0:
+            raise ValueError("max_entries must be greater than 0")
+
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.entries: 'OrderedDict[str, GameTree]' = OrderedDict()
+        self.digests: Dict[str, Tuple[int, int, str]] = {}
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def digest(self, filename: Union[str, os.PathLike]) -> str:
+        return file_digest(filename, self.digests)
+
+    def disk_path(self, digest: str) -> Optional[str]:
+        if self.cache_dir is None:
+            return None
+        return os.path.join(self.cache_dir, f"{digest}.v{PARSE_CACHE_VERSION}.pkl")
+
+    def load(self, filename: Union[str, os.PathLike]) -> GameTree:
+        """
+        Return the cached tree for `filename`, parsing it on a miss. The result
+        is shared; use `parse_file` unless it is only read.
+        """
+        digest = self.digest(filename)
+
+        game = self.entries.get(digest)
+        if game is not None:
+            self.hits += 1
+            self.entries.move_to_end(digest)
+            return game
+
+        game = self.load_from_disk(digest)
+        if game is not None:
+            self.disk_hits += 1
+        else:
+            self.misses += 1
+            game = EFGParser().parse_file(filename)
+            self.store_to_disk(digest, game)
+
+        self.entries[digest] = game
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+        return game
+
+    def parse_file(self, filename: Union[str, os.PathLike]) -> GameTree:
+        """
+        Drop-in for EFGParser().parse_file that returns a private,
+        copy-on-write clone of the cached tree.
+        """
+        return share_clone(self.load(filename))
+
+    def load_from_disk(self, digest: str) -> Optional[GameTree]:
+        path = self.disk_path(digest)
+        if path is None or not os.path.exists(path):
+            return None
+
+        try:
+            with open(path, 'rb') as f:
+                compact = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            # A truncated or outdated entry is treated as a miss and rewritten.
+            return None
+
+        return compact.to_game_tree()
+
+    def store_to_disk(self, digest: str, game: GameTree):
+        path = self.disk_path(digest)
+        if path is None:
+            return
+
+        # The flat CompactGameTree pickles without recursing into deep trees.
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            pickle.dump(CompactGameTree.from_game_tree(game), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+
+    def invalidate(self, filename: Optional[Union[str, os.PathLike]] = None):
+        """
+        Forget `filename` (its digest, in-memory tree and disk entry), or
+        everything when no file is given.
+        """
+        if filename is None:
+            self.entries.clear()
+            self.digests.clear()
+            if self.cache_dir is not None:
+                for name in os.listdir(self.cache_dir):
+                    if name.endswith('.pkl'):
+                        os.remove(os.path.join(self.cache_dir, name))
+            return
+
+        path = os.path.abspath(filename)
+        known = self.digests.pop(path, None)
+        digests = {known[2]} if known is not None else set()
+
+        # The file may have been edited without touching its mtime.
+        if os.path.exists(path):
+            digests.add(self.digest(path))
+            del self.digests[path]
+
+        for digest in digests:
+            self.entries.pop(digest, None)
+            path = self.disk_path(digest)
+            if path is not None and os.path.exists(path):
+                os.remove(path)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "entries": len(self.entries),
+        }
@@ -1,8 +1,16 @@
-from typing import List, Tuple, Dict, Optional, Union
+from typing import Any, Callable, List, Tuple, Dict, Optional, Union, Iterator, TextIO
 from collections import defaultdict, deque 
+from itertools import chain
+import io
+import os
 import re
 from dataclasses import dataclass
 from enum import Enum
+from functools import lru_cache
+from copy import copy
+import hashlib
+
+from .instrumentation import add_count
 
 from fractions import Fraction
 
@@ -27,6 +35,15 @@ def check_duplicate_actions(actions: List[str], node_desc: str):
             f"{sorted(duplicates)}"
         )
 
+def parse_payoff(token: str) -> Union[int, float]:
+    if '/' in token:
+        return float(Fraction(token))
+    elif '.' in token:
+        return float(token)
+    else:
+        return int(token)
+
+
 @dataclass
 class Node:
     node_type: NodeType
@@ -47,6 +64,10 @@ class Node:
     # Below used for merging dummy chance nodes
     raw_actions: Optional[List[str]] = None
 
+    # Id of the action history leading here in GameTree.histories, or None
+    # when the node is not indexed.
+    history_id: Optional[int] = None
+
 
     def __post_init__(self):
         if self.children is None:
@@ -64,7 +85,208 @@ class GameTree:
         self.root: Optional[Node] = None
 
         self.level_to_nodes = defaultdict(list)
-    
+
+        # Indexes filled by the parser (or build_indexes) and kept up to date
+        # by the Match passes through refresh_node, replace_children and
+        # remap_players.
+        self.indexed = False
+        self.histories = HistoryTrie()
+        self.nodes_by_history: Dict[int, Node] = {}
+        self.infoset_members: Dict[Tuple[int, int], Dict[int, Node]] = defaultdict(dict)
+        self.player_action_counts: Dict[int, Dict[str, int]] = defaultdict(dict)
+        self.terminals: Dict[int, Node] = {}
+
+    def reset_indexes(self):
+        self.indexed = False
+        self.histories = HistoryTrie()
+        self.nodes_by_history = {}
+        self.infoset_members = defaultdict(dict)
+        self.player_action_counts = defaultdict(dict)
+        self.terminals = {}
+
+    def build_indexes(self):
+        """
+        (Re)build the indexes from scratch: history id -> node, (player,
+        information set) -> member nodes, player -> action counts and the
+        terminal nodes. Histories are sequences of action labels from the root.
+        """
+        self.reset_indexes()
+        if self.root is not None:
+            self.index_subtree(self.root, HistoryTrie.ROOT)
+        self.indexed = True
+
+    def add_node_entries(self, node: Node):
+        if node.node_type == NodeType.TERMINAL:
+            self.terminals[id(node)] = node
+        elif node.node_type == NodeType.PLAYER:
+            self.infoset_members[(node.player, node.information_set)][id(node)] = node
+            if node.actions:
+                counts = self.player_action_counts[node.player]
+                for action in node.actions:
+                    counts[action] = counts.get(action, 0) + 1
+
+    def remove_node_entries(self, node: Node, player: Optional[int], information_set: Optional[int], actions: Optional[List[str]]):
+        """
+        Drop `node` from the per-node indexes, given the player, information
+        set and actions it was indexed with.
+        """
+        if node.node_type == NodeType.TERMINAL:
+            self.terminals.pop(id(node), None)
+        elif node.node_type == NodeType.PLAYER:
+            key = (player, information_set)
+            members = self.infoset_members.get(key)
+            if members is not None:
+                members.pop(id(node), None)
+                if not members:
+                    del self.infoset_members[key]
+
+            counts = self.player_action_counts.get(player)
+            if counts is not None:
+                for action in actions or ():
+                    count = counts.get(action, 0) - 1
+                    if count > 0:
+                        counts[action] = count
+                    else:
+                        counts.pop(action, None)
+                if not counts:
+                    del self.player_action_counts[player]
+
+    def unindex_node(self, node: Node):
+        # A node is indexed only if its history maps back to it; clones and
+        # the nodes of a rebuilt tree may carry stale ids.
+        if node.history_id is not None and self.nodes_by_history.get(node.history_id) is node:
+            del self.nodes_by_history[node.history_id]
+            self.remove_node_entries(node, node.player, node.information_set, node.actions)
+        node.history_id = None
+
+    def unindex_subtree(self, node: Node):
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            self.unindex_node(node)
+            stack.extend(node.children.values())
+
+    def index_subtree(self, node: Node, history: int):
+        """
+        Index the subtree under `node` with `node` at `history`. Nodes that
+        were indexed elsewhere (a moved subtree) are dropped from their old
+        entries first.
+        """
+        histories = self.histories
+        stack = [(node, history)]
+
+        while stack:
+            node, history = stack.pop()
+            self.unindex_node(node)
+
+            node.history_id = history
+            self.nodes_by_history[history] = node
+            self.add_node_entries(node)
+
+            children = [(child, histories.extend(history, action)) for action, child in node.children.items()]
+            stack.extend(reversed(children))
+
+    def refresh_node(
+        self,
+        node: Node,
+        old_player: Optional[int],
+        old_information_set: Optional[int],
+        old_actions: Optional[List[str]],
+        old_children: Dict[str, Node],
+    ):
+        """
+        Bring the indexes in line after `node` was changed in place. The old_*
+        arguments are its player, information set, actions and children before
+        the change.
+
+        Children that were only relabelled keep their history ids (the trie
+        edge is renamed), so their subtrees need no work; removed children are
+        unindexed and new ones indexed.
+        """
+        if not self.indexed or node.history_id is None:
+            return
+
+        if node.node_type == NodeType.PLAYER:
+            self.remove_node_entries(node, old_player, old_information_set, old_actions)
+            self.add_node_entries(node)
+
+        current = {id(child) for child in node.children.values()}
+        previous = {id(child) for child in old_children.values()}
+
+        for child in old_children.values():
+            if id(child) not in current:
+                self.unindex_subtree(child)
+
+        # Rename the kept edges before extending, so a new child never picks up
+        # the id a kept sibling is about to leave behind.
+        added = []
+        for action, child in node.children.items():
+            if id(child) in previous and child.history_id is not None:
+                self.histories.relabel(child.history_id, action)
+            else:
+                added.append((action, child))
+
+        for action, child in added:
+            self.index_subtree(child, self.histories.extend(node.history_id, action))
+
+    def replace_children(self, replacements: List[Tuple[Node, str, Node]]):
+        """
+        Index a batch of (parent, action, previous child) replacements that
+        were already applied to the tree. Subtrees may move between positions
+        within the batch, so every affected subtree is dropped before the new
+        positions are indexed.
+        """
+        if not self.indexed:
+            return
+
+        for parent, action, previous in replacements:
+            self.unindex_subtree(previous)
+        for parent, action, previous in replacements:
+            self.index_subtree(parent.children[action], self.histories.extend(parent.history_id, action))
+
+    def remap_players(self, mapping: Dict[int, int]):
+        """
+        Re-key the player indexes after node players were renumbered with
+        `mapping`. Players missing from `mapping` keep their number.
+        """
+        if not self.indexed:
+            return
+
+        infoset_members = defaultdict(dict)
+        for (player, information_set), members in self.infoset_members.items():
+            infoset_members[(mapping.get(player, player), information_set)] = members
+        self.infoset_members = infoset_members
+
+        player_action_counts = defaultdict(dict)
+        for player, counts in self.player_action_counts.items():
+            player_action_counts[mapping.get(player, player)] = counts
+        self.player_action_counts = player_action_counts
+
+    def node_at(self, actions) -> Optional[Node]:
+        """Node reached from the root by the action labels in `actions`."""
+        if not self.indexed:
+            self.build_indexes()
+        history = self.histories.lookup(actions)
+        return None if history is None else self.nodes_by_history.get(history)
+
+    def history_of(self, node: Node) -> Optional[Tuple[str, ...]]:
+        """Action labels from the root to `node`, or None if it is not indexed."""
+        if not self.indexed:
+            self.build_indexes()
+        if node.history_id is None or self.nodes_by_history.get(node.history_id) is not node:
+            return None
+        return self.histories.to_tuple(node.history_id)
+
+    def information_set_members(self, player: int, information_set: int) -> List[Node]:
+        if not self.indexed:
+            self.build_indexes()
+        return list(self.infoset_members.get((player, information_set), {}).values())
+
+    def terminal_nodes(self) -> List[Node]:
+        if not self.indexed:
+            self.build_indexes()
+        return list(self.terminals.values())
+
 
     def print_tree(self, node: Optional[Node] = None, depth: int = 0):
         if node is None:
@@ -72,25 +294,33 @@ class GameTree:
             print(f"Game: {self.title}")
             print(f"Players: {', '.join(self.players)}\n")
 
-        indent = "  " * depth
-        print(f"{indent}[Level {node.level}] \n", end="")
-        if node.node_type == NodeType.TERMINAL:
-            print(f"{indent}Terminal {node.outcome_number}: {node.label} (Payoffs: {node.payoffs})")
-        elif node.node_type == NodeType.CHANCE:
-            print(f"{indent}Chance: {node.label}")
-            print(f"{indent}Info set: {node.information_set} {node.information_set_label}")
-            print(f"{indent}Actions and Probabilities:")
-            for action, prob in node.probs.items():
-                print(f"{indent}  {action}: {prob}")
-        else:
-            print(f"{indent}Player {node.player}: {node.label}")
-            print(f"{indent}Info set: {node.information_set} {node.information_set_label}")
-            print(f"{indent}Actions: {node.actions}")
-
-        if node.children:
-            for action, child in node.children.items():
-                print(f"{indent}Action: {action} →")
-                self.print_tree(child, depth + 1)
+        # Each entry is (node, depth, action leading to it); the action line is
+        # printed by the parent's indentation just before the child itself.
+        stack = [(node, depth, None)]
+
+        while stack:
+            node, depth, action = stack.pop()
+
+            if action is not None:
+                print(f"{'  ' * (depth - 1)}Action: {action} →")
+
+            indent = "  " * depth
+            print(f"{indent}[Level {node.level}] \n", end="")
+            if node.node_type == NodeType.TERMINAL:
+                print(f"{indent}Terminal {node.outcome_number}: {node.label} (Payoffs: {node.payoffs})")
+            elif node.node_type == NodeType.CHANCE:
+                print(f"{indent}Chance: {node.label}")
+                print(f"{indent}Info set: {node.information_set} {node.information_set_label}")
+                print(f"{indent}Actions and Probabilities:")
+                for action, prob in node.probs.items():
+                    print(f"{indent}  {action}: {prob}")
+            else:
+                print(f"{indent}Player {node.player}: {node.label}")
+                print(f"{indent}Info set: {node.information_set} {node.information_set_label}")
+                print(f"{indent}Actions: {node.actions}")
+
+            for action, child in reversed(node.children.items()):
+                stack.append((child, depth + 1, action))
     
     def get_total_unique_actions(self) -> Dict[Union[int, str], List[str]]:
         """
@@ -109,6 +339,22 @@ class GameTree:
         if self.root is None:
             return {}
 
+        if self.indexed:
+            # Keep the breadth-first order in which players are first met:
+            # history ids are handed out in prefix order, which matches
+            # left-to-right order within a level.
+            first_seen = {}
+            for (player, _), members in self.infoset_members.items():
+                for node in members.values():
+                    if not node.actions:
+                        continue
+                    key = (node.level, node.history_id)
+                    if player not in first_seen or key < first_seen[player]:
+                        first_seen[player] = key
+
+            players = sorted(self.player_action_counts, key=lambda player: first_seen[player])
+            return {player: sorted(self.player_action_counts[player]) for player in players}
+
         actions_map = defaultdict(set)
         queue = deque([self.root])
 
@@ -126,14 +372,137 @@ class GameTree:
         # Convert sets to sorted lists for stable output
         return {k: sorted(list(v)) for k, v in actions_map.items()}
 
+    def structure_hashes(self, kind: str = "chance") -> Optional['StructureHash']:
+        """
+        Bottom-up structural hashes of the whole tree, see
+        chance_structure_hashes and information_set_structure_hashes.
+        `kind` is "chance" or "information_sets".
+        """
+        if kind not in STRUCTURE_HASH_KINDS:
+            raise ValueError(f"Unknown structure hash kind: {kind!r}")
+        if self.root is None:
+            return None
+        return STRUCTURE_HASH_KINDS[kind](self.root)
+
+
+EFG_HEADER_PATTERN = re.compile(r'\s*EFG\s+\d+\s+R\s+"([^"]*)"\s*\{([^}]*)\}')
+
+# One match per node record. As in the line-based parser every record sits on
+# its own line, so whitespace inside a record never spans a newline. Groups
+# 1-5 hold a player node, 6-9 a chance node and 10-14 a terminal node. Group 15
+# catches the prologue comment string or any line that is not a valid record.
+#
+# The information set label and actions of a player or chance node, and the
+# outcome name and payoffs of a terminal node, may be left out when they were
+# given earlier in the file (see EFGParser.allow_references). Such a reference
+# leaves groups 4-5, 8-9 or 12-14 empty; group 13 is the opening brace, which
+# tells an omitted payoff list from an empty one.
+EFG_NODE_PATTERN = re.compile(r"""
+    \s*(?:
+        p[^\S\n]+"([^"\n]*)"[^\S\n]+(\d+)[^\S\n]+(\d+)
+            (?:[^\S\n]+"([^"\n]*)"[^\S\n]*\{((?:[^\S\n]*"[^"\n]+")+)[^\S\n]*\}[^\S\n]*|[^\S\n]+)\d+[^\n]*
+      | c[^\S\n]+"([^"\n]*)"[^\S\n]+(\d+)
+            (?:[^\S\n]+"([^"\n]*)"[^\S\n]*
+               \{((?:[^\S\n]*"[^"\n]+"[^\S\n]+(?:\d+/\d+|\d*\.\d+|\d+))+)[^\S\n]*\}[^\S\n]*|[^\S\n]+)\d+[^\n]*
+      | t[^\S\n]+"([^"\n]*)"[^\S\n]+(\d+)
+            (?:[^\S\n]+"([^"\n]*)"[^\S\n]*(\{)([^}\n]*)\})?[^\S\n]*(?=\n|\Z)
+      | ("[^"]*"|\S[^\n]*)
+    )""", re.VERBOSE)
+
+STREAM_CHUNK_SIZE = 1 << 16
+
+# Number of node records EFGParser.write_efg joins per write call.
+WRITE_BATCH_SIZE = 1024
+
+EFGSource = Union[str, os.PathLike, TextIO]
+
+
+def iter_efg_segments(stream: TextIO, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[str]:
+    """
+    Read an EFG text stream in chunks, yielding segments that end at a newline
+    outside any quoted string, so a one-line node record is never split.
+    """
+    carry = ''
+
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+
+        buffer = carry + chunk
+        cut = buffer.rfind('\n') + 1
+
+        # An odd number of quotes means the cut falls inside a (multi-line) string.
+        while cut and buffer.count('"', 0, cut) % 2:
+            cut = buffer.rfind('\n', 0, cut - 1) + 1
+
+        if cut:
+            yield buffer[:cut]
+        carry = buffer[cut:]
+
+    if carry:
+        yield carry
+
+
+@lru_cache(maxsize=1024)
+def normalize_prob(token: str) -> str:
+    """
+    Normalize a chance probability the way the regex parser does, e.g.
+    '0.5' -> '1/2'. Only a few distinct values occur per file, so the
+    Fraction round trip is cached.
+    """
+    return str(Fraction(token))
+
+
+@lru_cache(maxsize=4096)
+def parse_payoff_list(values: str) -> Tuple[Union[int, float], ...]:
+    """
+    Parse the comma-separated payoffs of a terminal record. Games reuse a small
+    set of outcomes, so results are cached; callers copy them into a list.
+    """
+    return tuple(parse_payoff(token.strip()) for token in values.split(',') if token.strip())
+
+
+def invalid_record_error(line: str) -> ValueError:
+    """
+    Build the error the line-based parser raises for an invalid node line.
+    """
+    line = line.strip()
+    kind = line[:1]
+
+    if kind == 't':
+        return ValueError(f"Invalid EFG. The line should match terminal. Got: {line}")
+    if kind == 'c':
+        return ValueError(f"Invalid EFG. The line should match chance. Got: {line}")
+    if kind == 'p':
+        return ValueError("Invalid EFG. The line should match player.")
+    return ValueError(f"{kind!r} is not a valid NodeType")
+
+
+def resolve_reference(references: Optional[Dict[Tuple, Tuple]], key: Tuple, record: str) -> Tuple:
+    """
+    Look up the information set or outcome a short node record refers to.
+    Without reference support such a record is invalid, as in the line-based parser.
+    """
+    if references is None:
+        raise invalid_record_error(record)
+    if key not in references:
+        raise ValueError(f"Invalid EFG. {record} refers to an information set or outcome that was not defined earlier.")
+    return references[key]
+
 
 class EFGParser:
-    def __init__(self):
+    def __init__(self, allow_references: bool = False):
         self.current_line = 0
         self.current_level = 0
         self.lines = []
         self.game = None
 
+        # Accept player/chance records that omit a known information set's
+        # label and actions, and terminal records that omit a known outcome's
+        # name and payoffs, as Gambit does and as save_to_efg(compact=True) writes.
+        self.allow_references = allow_references
+
     def parse_header(self, line: str) -> Tuple[str, List[str]]:
         match = re.match(r'EFG \d+ R "(.*?)" { (.*?) }', line)
         if not match:
@@ -160,14 +529,6 @@ class EFGParser:
 
             payoff_tokens = [token.strip() for token in values.split(',') if token.strip()]
 
-            def parse_payoff(token: str):
-                if '/' in token:
-                    return float(Fraction(token))
-                elif '.' in token:
-                    return float(token)
-                else:
-                    return int(token)
-
             payoffs = [parse_payoff(token) for token in payoff_tokens]
 
             return Node(
@@ -265,7 +626,8 @@ class EFGParser:
 
     def build_tree(self, node: Node, level: int = 0):
         """
-        Recursively build the game tree by reading lines from self.lines
+        Build the game tree by reading lines from self.lines, keeping an explicit
+        stack of (node, remaining actions) instead of recursing per child.
         """
         node.level = level
 
@@ -274,23 +636,252 @@ class EFGParser:
             self.current_level -= 1
             return
 
-        actions = node.raw_actions if node.raw_actions is not None else node.actions
+        def child_actions(node: Node):
+            return iter(node.raw_actions if node.raw_actions is not None else node.actions)
+
+        stack = [(node, child_actions(node))]
 
-        for action in actions:
-            if self.current_line < len(self.lines):
-                child = self.parse_node(self.lines[self.current_line])
-                self.current_line += 1
+        while stack:
+            node, actions = stack[-1]
+
+            # Actions left over once the lines run out get no child.
+            action = next(actions, None)
+            if action is None or self.current_line >= len(self.lines):
+                stack.pop()
+                self.current_level -= 1
+                continue
+
+            child = self.parse_node(self.lines[self.current_line])
+            self.current_line += 1
+
+            node.add_child(action, child)  # 重复 action 会覆盖，保留最后一个
+
+            self.game.level_to_nodes[self.current_level].append(child)
+            self.current_level += 1
 
-                node.add_child(action, child)  # 重复 action 会覆盖，保留最后一个
+            child.level = node.level + 1
 
+            if child.node_type == NodeType.TERMINAL:
                 self.game.level_to_nodes[self.current_level].append(child)
-                self.current_level += 1
+                self.current_level -= 1
+            else:
+                stack.append((child, child_actions(child)))
+
+    def parse(self, source: EFGSource) -> GameTree:
+        """
+        Parse an EFG from a path, an in-memory EFG string or a text stream.
+
+        A string is read as EFG text when it starts with the EFG header
+        keyword and as a path otherwise.
+        """
+        if hasattr(source, 'read'):
+            return self.parse_stream(source)
+        if isinstance(source, str) and re.match(r'\s*EFG\s', source):
+            return self.parse_string(source)
+        return self.parse_file(source)
+
+    def parse_string(self, text: str) -> GameTree:
+        return self.parse_segments(iter((text,)))
+
+    def parse_stream(self, stream: TextIO) -> GameTree:
+        return self.parse_segments(iter_efg_segments(stream))
+
+    def parse_file(self, filename: Union[str, os.PathLike]) -> GameTree:
+        with open(filename, 'r') as f:
+            return self.parse_stream(f)
+
+    def parse_segments(self, segments: Iterator[str]) -> GameTree:
+        """
+        Build the game tree in a single pass over the node records.
+
+        Nodes arrive in prefix order, so the parser only tracks the current
+        parent, its actions and the index of the next action, with a stack of
+        the same triples for the ancestors. As with the line-based parser,
+        anything after the last node of the tree is ignored and a file that ends
+        early leaves the remaining children out.
+        """
+        buffer = ''
+        header = None
+        for segment in segments:
+            buffer += segment
+            header = EFG_HEADER_PATTERN.match(buffer)
+            if header:
+                break
+
+        if header is None:
+            raise ValueError("Invalid EFG file header")
+
+        title = header.group(1)
+        players = re.findall(r'"([^"]*)"', header.group(2))
+        self.game = GameTree(title, players)
+        level_to_nodes = self.game.level_to_nodes
+
+        # The indexes are filled in the same pass. Every edge is new while
+        # parsing, so trie ids are appended directly instead of looked up.
+        histories = self.game.histories
+        history_parents, history_elements, history_ids = histories.parents, histories.elements, histories.ids
+        nodes_by_history = self.game.nodes_by_history
+        infoset_members = self.game.infoset_members
+        player_action_counts = self.game.player_action_counts
+        terminals = self.game.terminals
+        self.game.indexed = True
+
+        player_type, chance_type, terminal_type = NodeType.PLAYER, NodeType.CHANCE, NodeType.TERMINAL
+        references = {} if self.allow_references else None
+        stack = []
+        parent = None
+        actions = None
+        index = 0
+        level = 0
+
+        pos = header.end()
+        for segment in chain((buffer,), segments):
+            for (p_label, p_player, p_infoset, p_infoset_label, p_actions,
+                 c_label, c_infoset, c_infoset_label, c_outcomes,
+                 t_label, t_outcome, t_outcome_name, t_brace, t_payoffs, other) in EFG_NODE_PATTERN.findall(segment, pos):
+
+                if p_player:
+                    player = int(p_player)
+                    information_set = int(p_infoset)
+
+                    if p_actions:
+                        node_actions = p_actions.split('"')[1::2]
+
+                        if len(set(node_actions)) != len(node_actions):
+                            check_duplicate_actions(
+                                node_actions,
+                                node_desc=f'player node "{p_label}", player {player}, information set {information_set}'
+                            )
+
+                        if references is not None:
+                            references.setdefault(('p', player, information_set), (p_infoset_label, node_actions))
+                    else:
+                        p_infoset_label, node_actions = resolve_reference(
+                            references, ('p', player, information_set), f'p "{p_label}" {p_player} {p_infoset}'
+                        )
+                        node_actions = list(node_actions)
+
+                    node = Node(player_type, p_label, player, information_set, p_infoset_label, node_actions)
+
+                    infoset_members[(player, information_set)][id(node)] = node
+                    if node_actions:
+                        counts = player_action_counts[player]
+                        for action in node_actions:
+                            counts[action] = counts.get(action, 0) + 1
+
+                elif c_infoset:
+                    information_set = int(c_infoset)
+
+                    if c_outcomes:
+                        parts = c_outcomes.split('"')
+                        raw_actions = parts[1::2]
+
+                        if len(set(raw_actions)) != len(raw_actions):
+                            check_duplicate_actions(
+                                raw_actions,
+                                node_desc=f'chance node "{c_label}", information set {information_set}'
+                            )
+
+                        probs = {
+                            action: normalize_prob(prob.strip())
+                            for action, prob in zip(raw_actions, parts[2::2])
+                        }
+
+                        if references is not None:
+                            references.setdefault(('c', information_set), (c_infoset_label, raw_actions, probs))
+                    else:
+                        c_infoset_label, raw_actions, probs = resolve_reference(
+                            references, ('c', information_set), f'c "{c_label}" {c_infoset}'
+                        )
+                        raw_actions, probs = list(raw_actions), dict(probs)
+
+                    node = Node(
+                        chance_type, c_label,
+                        information_set=information_set,
+                        information_set_label=c_infoset_label,
+                        actions=list(probs),
+                        raw_actions=raw_actions,
+                        probs=probs
+                    )
+
+                elif t_outcome:
+                    outcome_number = int(t_outcome)
+
+                    if t_brace:
+                        try:
+                            payoffs = parse_payoff_list(t_payoffs)
+                        except ValueError:
+                            raise invalid_record_error(
+                                f't "{t_label}" {t_outcome} "{t_outcome_name}" {{{t_payoffs}}}'
+                            ) from None
+
+                        if references is not None:
+                            references.setdefault(('t', outcome_number), (t_outcome_name, payoffs))
+                    else:
+                        t_outcome_name, payoffs = resolve_reference(
+                            references, ('t', outcome_number), f't "{t_label}" {t_outcome}'
+                        )
+
+                    node = Node(
+                        terminal_type, t_label,
+                        payoffs=list(payoffs),
+                        outcome_number=outcome_number,
+                        outcome_name=t_outcome_name
+                    )
+                    terminals[id(node)] = node
+
+                elif other[0] == '"' and self.game.root is None:
+                    # The optional comment string of the prologue.
+                    continue
+
+                else:
+                    raise invalid_record_error(other)
 
-                self.build_tree(child, level + 1)
+                if parent is None:
+                    self.game.root = node
+                    history = HistoryTrie.ROOT
+                else:
+                    action = actions[index]
+                    node.level = level
+                    node.parent = parent
+                    parent.children[action] = node
+                    index += 1
+
+                    history = len(history_parents)
+                    history_ids[(parent.history_id, action)] = history
+                    history_parents.append(parent.history_id)
+                    history_elements.append(action)
+
+                node.history_id = history
+                nodes_by_history[history] = node
+                level_to_nodes[level].append(node)
+
+                if node.node_type is not terminal_type:
+                    if parent is not None:
+                        stack.append((parent, actions, index))
+                    parent, actions, index = node, node.actions, 0
+                    level += 1
+                    continue
+
+                if parent is None:
+                    return self.game
+
+                # Climb back to the nearest ancestor that still has children to read.
+                while index == len(actions):
+                    if not stack:
+                        return self.game
+                    parent, actions, index = stack.pop()
+                    level -= 1
+
+            pos = 0
 
-        self.current_level -= 1
+        return self.game
 
-    def parse_file(self, filename: str) -> GameTree:
+    def parse_file_regex(self, filename: str) -> GameTree:
+        """
+        Line-based parser: one regex per node line. Kept as the reference
+        implementation for benchmark_efg_parser.py.
+        """
         with open(filename, 'r') as f:
             self.lines = [line.strip() for line in f if line.strip()]
 
@@ -312,31 +903,86 @@ class EFGParser:
             self.current_line += 1
             self.build_tree(self.game.root, level=0)
 
+        self.game.build_indexes()
         return self.game
     
-    def to_efg(self, node: Optional[Node] = None):
+    def write_efg(self, stream: TextIO, node: Optional[Node] = None, compact: bool = False):
+        """
+        Stream the node records under `node` (the root by default) to `stream`
+        in prefix order, one record per line and without a trailing newline.
+
+        With `compact`, a player or chance node whose information set was
+        already written with the same label and actions, and a terminal whose
+        outcome was already written with the same name and payoffs, is written
+        as a short reference, e.g. `p "" 1 3 0` or `t "" 2`. Read such files
+        with EFGParser(allow_references=True).
+        """
         if node is None:
             node = self.game.root
 
-        if node.node_type == NodeType.TERMINAL:
-            payoffs_str = ', '.join(map(str, node.payoffs))
-            return f't "{node.label}" {node.outcome_number} "{node.outcome_name}" {{ {payoffs_str} }}'
+        written = {} if compact else None
 
-        elif node.node_type == NodeType.CHANCE:
-            actions_probs = ' '.join([f'"{a}" {p}' for a, p in node.probs.items()])
-            node_str = f'c "{node.label}" {node.information_set} "{node.information_set_label}" {{ {actions_probs} }} 0'
-        else:
-            actions_str = ' '.join([f'"{a}"' for a in node.actions])
-            node_str = f'p "{node.label}" {node.player} {node.information_set} "{node.information_set_label}" {{ {actions_str} }} 0'
+        def is_repeat(key, definition) -> bool:
+            previous = written.setdefault(key, definition)
+            return previous is not definition and previous == definition
+
+        # Records are flushed in batches: bounded memory, few write calls.
+        lines = []
+        separator = ''
+        terminal_type, chance_type = NodeType.TERMINAL, NodeType.CHANCE
+        stack = [node]
 
-        children_str = '\n'.join(self.to_efg(child) for child in node.children.values())
+        while stack:
+            node = stack.pop()
+            node_type = node.node_type
 
-        return f'{node_str}\n{children_str}'
+            if len(lines) >= WRITE_BATCH_SIZE:
+                stream.write(separator + '\n'.join(lines))
+                separator = '\n'
+                lines.clear()
 
-    def save_to_efg(self, output_file: str):
+            if node_type is terminal_type:
+                payoffs_str = ', '.join(map(str, node.payoffs))
+                if written is not None and node.outcome_number and is_repeat(
+                        ('t', node.outcome_number), (node.outcome_name, payoffs_str)):
+                    lines.append(f't "{node.label}" {node.outcome_number}')
+                else:
+                    lines.append(f't "{node.label}" {node.outcome_number} "{node.outcome_name}" {{ {payoffs_str} }}')
+                continue
+
+            elif node_type is chance_type:
+                actions_probs = ' '.join([f'"{a}" {p}' for a, p in node.probs.items()])
+                if written is not None and is_repeat(
+                        ('c', node.information_set), (node.information_set_label, actions_probs)):
+                    lines.append(f'c "{node.label}" {node.information_set} 0')
+                else:
+                    lines.append(f'c "{node.label}" {node.information_set} "{node.information_set_label}" {{ {actions_probs} }} 0')
+            else:
+                actions_str = ' '.join([f'"{a}"' for a in node.actions])
+                if written is not None and is_repeat(
+                        ('p', node.player, node.information_set), (node.information_set_label, actions_str)):
+                    lines.append(f'p "{node.label}" {node.player} {node.information_set} 0')
+                else:
+                    lines.append(f'p "{node.label}" {node.player} {node.information_set} "{node.information_set_label}" {{ {actions_str} }} 0')
+
+            if not node.children:
+                # A childless decision node is still followed by a newline.
+                lines.append('')
+
+            stack.extend(reversed(node.children.values()))
+
+        if lines:
+            stream.write(separator + '\n'.join(lines))
+
+    def to_efg(self, node: Optional[Node] = None, compact: bool = False) -> str:
+        buffer = io.StringIO()
+        self.write_efg(buffer, node, compact)
+        return buffer.getvalue()
+
+    def save_to_efg(self, output_file: str, compact: bool = False):
         with open(output_file, 'w') as f:
             f.write(f'EFG 2 R "{self.game.title}" {{ ' + ' '.join(f'"{p}"' for p in self.game.players) + ' }\n')
-            f.write(self.to_efg())
+            self.write_efg(f, compact=compact)
     
     def collect_paths_to_terminal(self, node: Optional[Node] = None, path=None, paths=None):
         if node is None:
@@ -346,19 +992,179 @@ class EFGParser:
         if paths is None:
             paths = []
 
-        if node.node_type == NodeType.TERMINAL:
-            paths.append((list(path), node.payoffs))
-        else:
-            for action, child in node.children.items():
-                self.collect_paths_to_terminal(child, path + [action], paths)
+        for node, node_path in iter_paths(node, lambda node, action: action, path):
+            if node.node_type == NodeType.TERMINAL:
+                paths.append((list(node_path), node.payoffs))
 
         return paths
 
 
+def iter_paths(node: Node, step, path: Optional[List] = None) -> Iterator[Tuple[Node, List]]:
+    """
+    Walk the subtree under `node` in prefix order without recursion, yielding
+    (node, path) pairs. `step(parent, action)` gives the path element for an
+    edge, or None to leave the edge out of the path.
+
+    The yielded path is one list shared by the whole walk and is only valid
+    until the next step; copy it to keep it.
+    """
+    path = list(path) if path else []
+    # Each entry is (node, length of the parent's path, element for the edge).
+    stack = [(node, len(path), None)]
+
+    while stack:
+        node, depth, element = stack.pop()
+        del path[depth:]
+        if element is not None:
+            path.append(element)
+
+        yield node, path
+
+        depth = len(path)
+        for action, child in reversed(node.children.items()):
+            stack.append((child, depth, step(node, action)))
+
+
+class HistoryTrie:
+    """
+    Interns histories (sequences of path elements) as integer ids with parent
+    links, so extending a history by one step is a dict lookup instead of a
+    tuple copy.
+
+    Equal histories always get the same id, including across trees walked with
+    the same trie, so ids can be hashed and compared directly. `to_tuple`
+    materializes a history, e.g. for an error message.
+    """
+    ROOT = 0
+
+    def __init__(self):
+        self.parents: List[int] = [-1]
+        self.elements: List = [None]
+        self.ids: Dict[Tuple[int, object], int] = {}
+
+    def __len__(self) -> int:
+        return len(self.parents)
+
+    def extend(self, history: int, element) -> int:
+        key = (history, element)
+        history_id = self.ids.get(key)
+        if history_id is None:
+            history_id = len(self.parents)
+            self.ids[key] = history_id
+            self.parents.append(history)
+            self.elements.append(element)
+        return history_id
+
+    def intern(self, elements) -> int:
+        history = self.ROOT
+        for element in elements:
+            history = self.extend(history, element)
+        return history
+
+    def lookup(self, elements) -> Optional[int]:
+        """Id of the history `elements`, or None if it was never interned."""
+        history = self.ROOT
+        for element in elements:
+            history = self.ids.get((history, element))
+            if history is None:
+                return None
+        return history
+
+    def relabel(self, history: int, element):
+        """
+        Replace the last element of `history` in place. Extensions of it keep
+        their ids, so a renamed edge does not invalidate the subtree below.
+        """
+        parent = self.parents[history]
+        key = (parent, self.elements[history])
+        if self.ids.get(key) == history:
+            del self.ids[key]
+        self.elements[history] = element
+        self.ids[(parent, element)] = history
+
+    def parent(self, history: int) -> int:
+        return self.parents[history]
+
+    def to_tuple(self, history: int) -> Tuple:
+        elements = []
+        while history != self.ROOT:
+            elements.append(self.elements[history])
+            history = self.parents[history]
+        elements.reverse()
+        return tuple(elements)
+
+
+def iter_histories(node: Node, step, histories: HistoryTrie, history: int = HistoryTrie.ROOT) -> Iterator[Tuple[Node, int]]:
+    """
+    Walk the subtree under `node` in prefix order without recursion, yielding
+    (node, history id). `step(parent, action)` gives the history element for
+    an edge, or None to leave the edge out of the history.
+    """
+    stack = [(node, history)]
+
+    while stack:
+        node, history = stack.pop()
+
+        yield node, history
+
+        for action, child in reversed(node.children.items()):
+            element = step(node, action)
+            stack.append((child, history if element is None else histories.extend(history, element)))
+
+
+def clone_subtree(node: Node, parent: Optional[Node] = None) -> Node:
+    """
+    Copy `node` and all of its descendants without recursion.
+
+    Mutable fields are copied so the clone can be edited independently. The
+    clone's root is attached to `parent` when one is given.
+    """
+    def clone(node: Node) -> Node:
+        copied = copy(node)
+        copied.children = {}
+        for name in ('actions', 'payoffs', 'raw_actions'):
+            value = getattr(node, name)
+            if value is not None:
+                setattr(copied, name, list(value))
+        if node.probs is not None:
+            copied.probs = dict(node.probs)
+        return copied
+
+    root = clone(node)
+    if parent is not None:
+        root.parent = parent
+
+    stack = [(node, root)]
+    cloned = 1
+
+    while stack:
+        original, copied = stack.pop()
+        for action, child in original.children.items():
+            child_copy = clone(child)
+            copied.add_child(action, child_copy)
+            stack.append((child, child_copy))
+            cloned += 1
+
+    add_count("subtree clones")
+    add_count("nodes cloned", cloned)
+    return root
+
+
 Actor = Union[int, str]
 PathKey = Tuple[Tuple[Actor, str], ...]
 
 
+def actor_step(node: Node, action: str) -> Optional[Tuple[Actor, str]]:
+    """
+    Path element for an edge: (player number or "chance", action).
+    """
+    if node.node_type == NodeType.PLAYER:
+        return (node.player, action)
+    if node.node_type == NodeType.CHANCE:
+        return ("chance", action)
+    return None
+
+
 def parse_prob(prob) -> Fraction:
     """
     Safely parse probability values stored as int, float, Fraction,
@@ -375,7 +1181,8 @@ def parse_prob(prob) -> Fraction:
 def collect_chance_nodes_by_path(
     node: Node,
     path: Optional[List[Tuple[Actor, str]]] = None,
-    chance_map: Optional[Dict[PathKey, Dict[str, Fraction]]] = None
+    chance_map: Optional[Dict[PathKey, Dict[str, Fraction]]] = None,
+    histories: Optional[HistoryTrie] = None
 ) -> Dict[PathKey, Dict[str, Fraction]]:
     """
     Collect all chance nodes in the tree.
@@ -394,32 +1201,167 @@ def collect_chance_nodes_by_path(
             "Heads": Fraction(1, 2),
             "Tails": Fraction(1, 2)
         }
-    """
 
-    if path is None:
-        path = []
+    With `histories`, keys are history ids in that trie instead of tuples, so
+    maps collected with the same trie compare without building any path.
+    """
 
     if chance_map is None:
         chance_map = {}
 
-    if node.node_type == NodeType.CHANCE:
-        chance_map[tuple(path)] = {
-            action: parse_prob(prob)
-            for action, prob in node.probs.items()
-        }
+    trie = histories if histories is not None else HistoryTrie()
 
-    for action, child in node.children.items():
-        if node.node_type == NodeType.PLAYER:
-            actor = node.player
-        elif node.node_type == NodeType.CHANCE:
-            actor = "chance"
-        else:
+    for node, history in iter_histories(node, actor_step, trie, trie.intern(path or ())):
+        if node.node_type == NodeType.CHANCE:
+            key = history if histories is not None else trie.to_tuple(history)
+            chance_map[key] = {
+                action: parse_prob(prob)
+                for action, prob in node.probs.items()
+            }
+
+    return chance_map
+
+@dataclass
+class StructureHash:
+    """
+    Merkle hash of one subtree, restricted to what a comparison looks at.
+
+    `key` is what the node itself contributes (None if nothing) and
+    `children` holds the hashes of the child subtrees that contribute
+    anything, keyed by edge. Two subtrees are equal for the comparison exactly
+    when their digests are equal.
+    """
+    digest: bytes
+    key: Any
+    children: Dict[Any, 'StructureHash']
+
+
+def build_structure_hashes(
+    root: Node,
+    node_key: Callable[[Node], Any],
+    edge_key: Callable[[Node, str], Any],
+) -> Optional[StructureHash]:
+    """
+    Hash every subtree bottom-up in one iterative pass.
+
+    Children are visited in action order, so `node_key` sees the nodes in
+    lexicographic order of their action paths. Subtrees that contribute
+    nothing (key None and no contributing children) hash to None and are left
+    out, so the result only depends on the parts of the tree that are
+    compared, not on the order of dict items.
+    """
+    def ordered_children(node):
+        return iter(sorted(node.children.items(), key=lambda item: item[0]))
+
+    # Each frame is (edge from the parent, node, node key, remaining children, child hashes).
+    frames = [(None, root, node_key(root), ordered_children(root), {})]
+    result = None
+
+    while frames:
+        edge, node, key, children, child_hashes = frames[-1]
+
+        child_item = next(children, None)
+        if child_item is not None:
+            action, child = child_item
+            frames.append((edge_key(node, action), child, node_key(child), ordered_children(child), {}))
             continue
 
-        next_path = path + [(actor, action)]
-        collect_chance_nodes_by_path(child, next_path, chance_map)
+        frames.pop()
+
+        if key is None and not child_hashes:
+            continue
+
+        content = repr((key, [(child_edge, child.digest) for child_edge, child in child_hashes.items()]))
+        structure = StructureHash(hashlib.blake2b(content.encode(), digest_size=16).digest(), key, child_hashes)
+
+        if frames:
+            frames[-1][4][edge] = structure
+        else:
+            result = structure
+
+    return result
+
+
+def first_structure_difference(
+    hash1: Optional[StructureHash],
+    hash2: Optional[StructureHash],
+) -> Optional[Tuple[List[Any], Any, Any]]:
+    """
+    Find the first differing path between two hashed trees, descending only
+    into subtrees whose digests differ.
+
+    Returns None if the trees are equal, and otherwise (path, key1, key2)
+    with the node keys found at the end of the path on each side (None where
+    that side has nothing).
+    """
+    path = []
+
+    while True:
+        if hash1 is None or hash2 is None:
+            if hash1 is hash2:
+                return None
+            return path, hash1 and hash1.key, hash2 and hash2.key
+
+        if hash1.digest == hash2.digest:
+            return None
+
+        if hash1.key != hash2.key:
+            return path, hash1.key, hash2.key
+
+        edges = list(hash1.children)
+        edges.extend(edge for edge in hash2.children if edge not in hash1.children)
+
+        for edge in edges:
+            child1 = hash1.children.get(edge)
+            child2 = hash2.children.get(edge)
+            if child1 is None or child2 is None or child1.digest != child2.digest:
+                path.append(edge)
+                hash1, hash2 = child1, child2
+                break
+        else:
+            return path, hash1.key, hash2.key
+
+
+def chance_structure_hashes(root: Node) -> Optional[StructureHash]:
+    """
+    Structural hashes covering what collect_chance_nodes_by_path collects:
+    chance nodes with their probabilities, keyed by (player or "chance",
+    action) edges. Equal root digests mean equal chance maps.
+    """
+    def node_key(node):
+        if node.node_type != NodeType.CHANCE:
+            return None
+        return tuple(sorted((action, str(parse_prob(prob))) for action, prob in node.probs.items()))
+
+    return build_structure_hashes(root, node_key, actor_step)
+
+
+def information_set_structure_hashes(root: Node) -> Optional[StructureHash]:
+    """
+    Structural hashes covering what compare_information_sets compares: the
+    player nodes, keyed by action edges, and how they are grouped into
+    information sets.
+
+    Information set numbers are arbitrary, so each (player, information set)
+    is relabelled by the rank of its first member in lexicographic path
+    order. Equal root digests mean equal structural groupings.
+    """
+    labels = {}
+
+    def node_key(node):
+        if node.node_type != NodeType.PLAYER:
+            return None
+        label = labels.setdefault((node.player, node.information_set), len(labels))
+        return (node.player, label)
+
+    return build_structure_hashes(root, node_key, lambda node, action: action)
+
+
+STRUCTURE_HASH_KINDS = {
+    "chance": chance_structure_hashes,
+    "information_sets": information_set_structure_hashes,
+}
 
-    return chance_map
 
 def compare_chance_probs(tree1: GameTree, tree2: GameTree) -> bool:
     """
@@ -428,54 +1370,42 @@ def compare_chance_probs(tree1: GameTree, tree2: GameTree) -> bool:
     Checks both:
     1. whether chance nodes appear at the same paths;
     2. whether their action-probability distributions are the same.
-    """
 
-    chance1 = collect_chance_nodes_by_path(tree1.root)
-    chance2 = collect_chance_nodes_by_path(tree2.root)
+    Both trees are hashed bottom-up once; on a mismatch only the subtrees with
+    differing hashes are followed to report the first differing path.
+    """
+    difference = first_structure_difference(
+        chance_structure_hashes(tree1.root),
+        chance_structure_hashes(tree2.root),
+    )
 
-    if chance1 == chance2:
+    if difference is None:
         print("The trees have the same chance nodes and probabilities at the same paths.")
         return True
 
     print("The trees have different chance nodes, probabilities, or paths.")
 
-    only_in_1 = set(chance1.keys()) - set(chance2.keys())
-    only_in_2 = set(chance2.keys()) - set(chance1.keys())
-    common_paths = set(chance1.keys()) & set(chance2.keys())
-
-    if only_in_1:
-        print("\nChance paths only in tree 1:")
-        for path in sorted(only_in_1):
-            print(path, chance1[path])
-
-    if only_in_2:
-        print("\nChance paths only in tree 2:")
-        for path in sorted(only_in_2):
-            print(path, chance2[path])
-
-    for path in sorted(common_paths):
-        if chance1[path] != chance2[path]:
-            print(f"\nDifferent chance probabilities at path {path}:")
-            print("Tree 1:", chance1[path])
-            print("Tree 2:", chance2[path])
+    path, probs1, probs2 = difference
+    print(f"\nFirst differing chance path {tuple(path)}:")
+    print("Tree 1:", dict(probs1) if probs1 is not None else "no chance node")
+    print("Tree 2:", dict(probs2) if probs2 is not None else "no chance node")
 
     return False
 
-def get_information_sets(node: Node, path: Optional[List[str]] = None, info_sets: Optional[Dict[Tuple[int, int], Tuple[str, ...]]] = None):
+def get_information_sets(node: Node, path: Optional[List[str]] = None, info_sets: Optional[Dict[Tuple[int, int], Tuple[str, ...]]] = None, histories: Optional[HistoryTrie] = None):
     """
     Traverse the tree and collect a mapping from (player, information_set) to the path taken to reach that node.
+    With `histories`, paths are history ids in that trie instead of tuples.
     """
-    if path is None:
-        path = []
     if info_sets is None:
         info_sets = {}
 
-    if node.node_type == NodeType.PLAYER:
-        key = (node.player, node.information_set)
-        info_sets.setdefault(key, []).append(tuple(path))
+    trie = histories if histories is not None else HistoryTrie()
 
-    for action, child in node.children.items():
-        get_information_sets(child, path + [action], info_sets)
+    for node, history in iter_histories(node, lambda node, action: action, trie, trie.intern(path or ())):
+        if node.node_type == NodeType.PLAYER:
+            key = (node.player, node.information_set)
+            info_sets.setdefault(key, []).append(history if histories is not None else trie.to_tuple(history))
 
     return info_sets
 
@@ -484,33 +1414,33 @@ def compare_information_sets(tree1: GameTree, tree2: GameTree) -> bool:
     """
     Compare player information set structure (player, path), including frequency.
     This accounts for simultaneous or repeated info sets.
+
+    Both trees are hashed bottom-up once; on a mismatch only the subtrees with
+    differing hashes are followed to report the first differing path.
     """
-    info_sets1 = get_information_sets(tree1.root)
-    info_sets2 = get_information_sets(tree2.root)
+    difference = first_structure_difference(
+        information_set_structure_hashes(tree1.root),
+        information_set_structure_hashes(tree2.root),
+    )
 
-    print("Tree 1 information sets:", info_sets1)
-    print("Tree 2 information sets:", info_sets2)
+    if difference is None:
+        print("The trees have the same information set grouping structure.")
+        return True
 
-    def to_structural_groupings(info_sets):
-        groupings = []
-        for (player, _), paths in info_sets.items():
-            element = (player, sorted(paths))
-            groupings.append(element)
-        return sorted(groupings)
-    
-    groupings1 = to_structural_groupings(info_sets1)
-    groupings2 = to_structural_groupings(info_sets2)
+    print("The trees have different information set grouping structure.")
 
-    print("Tree 1 grouped structural info sets:", groupings1)
-    print("Tree 2 grouped structural info sets:", groupings2)
+    def describe(key):
+        if key is None:
+            return "no player node"
+        player, label = key
+        return f"player {player}, information set #{label} in path order"
 
-    if groupings1 == groupings2:
-        print("The trees have the same information set grouping structure.")
-        return True
-    else:
-        print("The trees have different information set grouping structure.")
-        # raise ValueError("The trees have different player information sets.")
-        return False
+    path, key1, key2 = difference
+    print(f"First differing path {tuple(path)}:")
+    print("Tree 1:", describe(key1))
+    print("Tree 2:", describe(key2))
+
+    return False
 
 def get_path_to_node(node: Node, players: List[str]) -> List[Tuple[str, str]]:
     """
@@ -586,10 +1516,11 @@ def check_no_zero_prob_chance_branches(tree: GameTree, raise_error: bool = True)
         return True
 
     illegal_branches = []
-    queue = deque([(tree.root, [])])
+    histories = HistoryTrie()
+    queue = deque([(tree.root, HistoryTrie.ROOT)])
 
     while queue:
-        node, path = queue.popleft()
+        node, history = queue.popleft()
 
         if node.node_type == NodeType.CHANCE:
             for action, prob in node.probs.items():
@@ -602,7 +1533,7 @@ def check_no_zero_prob_chance_branches(tree: GameTree, raise_error: bool = True)
                         "information_set_label": node.information_set_label,
                         "action": action,
                         "probability": prob,
-                        "path": tuple(path),
+                        "history": history,
                     })
 
         for action, child in node.children.items():
@@ -613,7 +1544,7 @@ def check_no_zero_prob_chance_branches(tree: GameTree, raise_error: bool = True)
             else:
                 continue
 
-            queue.append((child, path + [(actor, action)]))
+            queue.append((child, histories.extend(history, (actor, action))))
 
     if illegal_branches:
         message_lines = ["Illegal chance branches with probability 0 found:"]
@@ -624,7 +1555,7 @@ def check_no_zero_prob_chance_branches(tree: GameTree, raise_error: bool = True)
                 f'(info set {branch["information_set"]}, '
                 f'label "{branch["information_set_label"]}") '
                 f'has action "{branch["action"]}" with probability {branch["probability"]}. '
-                f'Path: {branch["path"]}'
+                f'Path: {histories.to_tuple(branch["history"])}'
             )
 
         message = "\n".join(message_lines)
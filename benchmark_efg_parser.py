@@ -0,0 +1,159 @@
+import argparse
+import os
+import time
+from typing import List, Optional
+
+from Tree import EFGParser
+from Tree.tree import EFG_HEADER_PATTERN, EFG_NODE_PATTERN
+
+
+def collect_efg_files(root: str) -> List[str]:
+    paths = []
+
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            if filename.endswith(".efg"):
+                paths.append(os.path.join(dirpath, filename))
+
+    paths.sort()
+    return paths
+
+
+def parse_with(method: str, path: str):
+    """
+    Parse one file with the given EFGParser method.
+
+    Returns (parser, game), or (None, error message) when the file is invalid.
+    """
+    parser = EFGParser()
+
+    try:
+        game = getattr(parser, method)(path)
+    except ValueError as exc:
+        return None, str(exc)
+
+    return parser, game
+
+
+def serialize(parser: Optional[EFGParser], game) -> str:
+    if parser is None:
+        return f"error: {game}"
+
+    if game.root is None:
+        return ""
+
+    return parser.to_efg()
+
+
+def check_agreement(paths: List[str]) -> int:
+    """
+    Check that both parsers accept the same files and build the same trees.
+    Returns the number of disagreeing files.
+    """
+    mismatches = 0
+
+    for path in paths:
+        regex_parser, regex_game = parse_with("parse_file_regex", path)
+        parser, game = parse_with("parse_file", path)
+
+        if (regex_parser is None) != (parser is None):
+            mismatches += 1
+            print(f"[Mismatch] {path}: regex={serialize(regex_parser, regex_game)[:80]!r} "
+                  f"single-pass={serialize(parser, game)[:80]!r}")
+            continue
+
+        if parser is not None and serialize(regex_parser, regex_game) != serialize(parser, game):
+            mismatches += 1
+            print(f"[Mismatch] {path}: trees differ")
+
+    return mismatches
+
+
+def time_parser(method: str, paths: List[str], repeat: int) -> float:
+    best = float("inf")
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for path in paths:
+            parse_with(method, path)
+        best = min(best, time.perf_counter() - start)
+
+    return best
+
+
+def time_record_matching(paths: List[str], repeat: int) -> float:
+    """
+    Time reading the files and matching their node records with
+    EFG_NODE_PATTERN alone, without building any node. This bounds how fast
+    the single-pass parser can get.
+    """
+    best = float("inf")
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for path in paths:
+            with open(path, "r") as f:
+                text = f.read()
+            header = EFG_HEADER_PATTERN.match(text)
+            if header:
+                EFG_NODE_PATTERN.findall(text, header.end())
+        best = min(best, time.perf_counter() - start)
+
+    return best
+
+
+def count_nodes(paths: List[str]) -> int:
+    total = 0
+
+    for path in paths:
+        parser, game = parse_with("parse_file", path)
+        if parser is not None:
+            total += sum(len(nodes) for nodes in game.level_to_nodes.values())
+
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the single-pass EFG parser against the line-based regex parser."
+    )
+
+    parser.add_argument(
+        "--root",
+        type=str,
+        default="Benchmark/Dataset_Generate",
+        help="Folder searched recursively for .efg files.",
+    )
+
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help="Number of timed passes per parser. The best pass is reported.",
+    )
+
+    args = parser.parse_args()
+
+    paths = collect_efg_files(args.root)
+
+    if not paths:
+        raise FileNotFoundError(f"No .efg files found under: {args.root}")
+
+    mismatches = check_agreement(paths)
+
+    regex_time = time_parser("parse_file_regex", paths, args.repeat)
+    single_pass_time = time_parser("parse_file", paths, args.repeat)
+    matching_time = time_record_matching(paths, args.repeat)
+
+    print(f"Files: {len(paths)}")
+    print(f"Nodes: {count_nodes(paths)}")
+    print(f"Disagreeing files: {mismatches}")
+    print(f"Regex parser:       {regex_time:.3f}s")
+    print(f"Single-pass parser: {single_pass_time:.3f}s")
+    print(f"Speedup: {regex_time / single_pass_time:.2f}x")
+    print(f"Reading and record matching alone: {matching_time:.3f}s "
+          f"(at most {regex_time / matching_time:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+import argparse
+import random
+import time
+from fractions import Fraction
+from typing import Dict, List, Tuple
+
+from Checkers.check_total_ordering import total_order_violation, pairwise_total_order_matching
+
+
+Payoffs = Dict[Tuple[str, ...], tuple]
+
+
+def synthetic_payoffs(n_terminals: int, n_players: int, n_values: int, rng: random.Random) -> Payoffs:
+    """
+    Terminal payoff table of a synthetic game: paths are the action labels of
+    a binary tree, payoffs are drawn from `n_values` levels so ties are common.
+    """
+    depth = max(1, (n_terminals - 1).bit_length())
+    payoffs = {}
+
+    for index in range(n_terminals):
+        path = tuple("L" if index >> bit & 1 else "R" for bit in reversed(range(depth)))
+        payoffs[path] = tuple(rng.randrange(n_values) for _ in range(n_players))
+
+    return payoffs
+
+
+def order_preserving_copy(payoffs: Payoffs) -> Payoffs:
+    """Same orderings with different values: every payoff x becomes 3x/2 + 1."""
+    return {path: tuple(Fraction(3 * value, 2) + 1 for value in values) for path, values in payoffs.items()}
+
+
+def with_swapped_pair(payoffs: Payoffs, rng: random.Random) -> Payoffs:
+    """Copy of `payoffs` where player 0 gets a strict order between two terminals flipped."""
+    paths = list(payoffs)
+    while True:
+        x, y = rng.sample(paths, 2)
+        if payoffs[x][0] != payoffs[y][0]:
+            break
+
+    swapped = dict(payoffs)
+    swapped[x] = (payoffs[y][0],) + payoffs[x][1:]
+    swapped[y] = (payoffs[x][0],) + payoffs[y][1:]
+    return swapped
+
+
+def check_agreement(cases: int, rng: random.Random) -> int:
+    """
+    Run both implementations on small random tables and return the number of
+    cases where their verdicts differ.
+    """
+    mismatches = 0
+
+    for _ in range(cases):
+        ref = synthetic_payoffs(rng.randrange(2, 64), rng.randrange(1, 4), rng.randrange(1, 6), rng)
+        candidates = [order_preserving_copy(ref), synthetic_payoffs(len(ref), len(next(iter(ref.values()))), 3, rng)]
+        if len({values[0] for values in ref.values()}) > 1:
+            candidates.append(with_swapped_pair(ref, rng))
+
+        for cand in candidates:
+            if (total_order_violation(ref, cand) is None) != pairwise_total_order_matching(ref, cand):
+                mismatches += 1
+
+    return mismatches
+
+
+def time_call(function, ref: Payoffs, cand: Payoffs, repeat: int) -> float:
+    best = float("inf")
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(ref, cand)
+        best = min(best, time.perf_counter() - start)
+
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the rank-based total-order checker against the pairwise one."
+    )
+
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[1000, 3000, 10000, 30000, 100000],
+        help="Numbers of terminals of the synthetic games.",
+    )
+
+    parser.add_argument(
+        "--players",
+        type=int,
+        default=2,
+        help="Number of players.",
+    )
+
+    parser.add_argument(
+        "--pairwise_limit",
+        type=int,
+        default=3000,
+        help=(
+            "Largest game timed with the pairwise checker. Larger games report "
+            "a quadratic extrapolation from the largest timed size."
+        ),
+    )
+
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Number of timed passes per checker. The best pass is reported.",
+    )
+
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=0,
+    )
+
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    print(f"Disagreeing cases: {check_agreement(200, rng)}")
+
+    measured: List[Tuple[int, float]] = []
+
+    for size in sorted(args.sizes):
+        ref = synthetic_payoffs(size, args.players, max(2, size // 4), rng)
+        cand = order_preserving_copy(ref)
+
+        rank_time = time_call(total_order_violation, ref, cand, args.repeat)
+
+        if size <= args.pairwise_limit:
+            pairwise_time = time_call(pairwise_total_order_matching, ref, cand, 1)
+            measured.append((size, pairwise_time))
+            label = f"{pairwise_time:.3f}s"
+        elif measured:
+            base_size, base_time = measured[-1]
+            pairwise_time = base_time * (size / base_size) ** 2
+            label = f"{pairwise_time:.3f}s (est.)"
+        else:
+            pairwise_time = None
+            label = "skipped"
+
+        speedup = f"{pairwise_time / rank_time:.1f}x" if pairwise_time is not None else "-"
+        print(f"Terminals: {size:>7}  Pairwise: {label:>18}  Rank-based: {rank_time:.4f}s  Speedup: {speedup}")
+
+
+if __name__ == "__main__":
+    main()
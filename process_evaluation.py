@@ -1,9 +1,18 @@
 import argparse
+import hashlib
 import json
+import multiprocessing
 import os
+import queue
 import re
+import shutil
+import tempfile
+import threading
+import time
 import traceback
-from typing import Any, Dict, List, Optional
+from contextlib import ExitStack
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 
 
 EXPLICIT_PAYOFF_CONSTRAINT_TYPE = "Explicit Payoff(s) for a Certain Outcome"
@@ -244,77 +253,92 @@ def ensure_parent_dir(path: str):
 
 
 def write_sample_report(report_path: str, result: Dict[str, Any]):
+    """
+    Write the report through a temporary file, so a report is either absent
+    or complete even when several workers write reports at once.
+    """
     ensure_parent_dir(report_path)
 
-    with open(report_path, "w", encoding="utf-8") as file:
-        file.write(f"Game: {result.get('game_name')}\n")
-        file.write(f"Generated file: {result.get('generated_filename')}\n")
-        file.write(f"Reference path: {result.get('ref_path')}\n")
-        file.write(f"Original generated path: {result.get('generated_path')}\n")
-        file.write(f"Matched path: {result.get('matched_path')}\n")
-        file.write(f"Status: {result.get('status')}\n")
-        file.write("\n")
-
-        if result.get("stage") == "match":
-            file.write("=== Match Error ===\n")
-            error = result.get("error", {})
-            file.write(f"Type: {error.get('type')}\n")
-            file.write(f"Message: {error.get('message')}\n")
-            file.write("\nTraceback:\n")
-            file.write(error.get("traceback", ""))
-            return
-
-        if result.get("stage") == "constraint_error":
-            file.write("=== Constraint Check Error ===\n")
-            error = result.get("error", {})
-            file.write(f"Type: {error.get('type')}\n")
-            file.write(f"Message: {error.get('message')}\n")
-            file.write("\nTraceback:\n")
-            file.write(error.get("traceback", ""))
-            return
-
-        file.write("=== Checker Results ===\n")
-        checker_results = result.get("checker_results", [])
+    temp_path = f"{report_path}.{os.getpid()}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as file:
+        write_sample_report_body(file, result)
+
+    os.replace(temp_path, report_path)
+
+
+def write_sample_report_body(file, result: Dict[str, Any]):
+    file.write(f"Game: {result.get('game_name')}\n")
+    file.write(f"Generated file: {result.get('generated_filename')}\n")
+    file.write(f"Reference path: {result.get('ref_path')}\n")
+    file.write(f"Original generated path: {result.get('generated_path')}\n")
+    file.write(f"Matched path: {result.get('matched_path')}\n")
+
+    if result.get("shared_from"):
+        file.write(f"Shared from: {result.get('shared_from')} (identical generated game, evaluated once)\n")
+
+    file.write(f"Status: {result.get('status')}\n")
+    file.write("\n")
+
+    if result.get("stage") == "match":
+        file.write("=== Match Error ===\n")
+        error = result.get("error", {})
+        file.write(f"Type: {error.get('type')}\n")
+        file.write(f"Message: {error.get('message')}\n")
+        file.write("\nTraceback:\n")
+        file.write(error.get("traceback", ""))
+        return
+
+    if result.get("stage") == "constraint_error":
+        file.write("=== Constraint Check Error ===\n")
+        error = result.get("error", {})
+        file.write(f"Type: {error.get('type')}\n")
+        file.write(f"Message: {error.get('message')}\n")
+        file.write("\nTraceback:\n")
+        file.write(error.get("traceback", ""))
+        return
+
+    file.write("=== Checker Results ===\n")
+    checker_results = result.get("checker_results", [])
+
+    if len(checker_results) == 0:
+        file.write("No checker results recorded.\n")
+    else:
+        for item in checker_results:
+            file.write(f"Check name: {item.get('check_name')}\n")
 
-        if len(checker_results) == 0:
-            file.write("No checker results recorded.\n")
-        else:
-            for item in checker_results:
-                file.write(f"Check name: {item.get('check_name')}\n")
+            if "additional_data" in item:
+                file.write(f"Additional data: {item.get('additional_data')}\n")
 
-                if "additional_data" in item:
-                    file.write(f"Additional data: {item.get('additional_data')}\n")
+            file.write(f"Passed: {item.get('passed')}\n")
+            file.write(f"Raw result: {repr(item.get('raw_result'))}\n")
+            file.write("\n")
 
-                file.write(f"Passed: {item.get('passed')}\n")
-                file.write(f"Raw result: {repr(item.get('raw_result'))}\n")
-                file.write("\n")
+    file.write("=== Constraint Checks ===\n")
+    constraint_results = result.get("constraint_results", [])
 
-        file.write("=== Constraint Checks ===\n")
-        constraint_results = result.get("constraint_results", [])
+    if len(constraint_results) == 0:
+        file.write("No constraint JSON files found.\n")
+    else:
+        for item in constraint_results:
+            file.write(f"Constraint file: {item.get('constraint_file')}\n")
+            file.write(f"Cst Type: {item.get('cst_type')}\n")
+            file.write(f"Skipped: {item.get('skipped')}\n")
+            file.write(f"Passed: {item.get('passed')}\n")
+            file.write(f"Raw result: {repr(item.get('raw_result'))}\n")
+            file.write("\n")
 
-        if len(constraint_results) == 0:
-            file.write("No constraint JSON files found.\n")
-        else:
-            for item in constraint_results:
-                file.write(f"Constraint file: {item.get('constraint_file')}\n")
-                file.write(f"Cst Type: {item.get('cst_type')}\n")
-                file.write(f"Skipped: {item.get('skipped')}\n")
-                file.write(f"Passed: {item.get('passed')}\n")
-                file.write(f"Raw result: {repr(item.get('raw_result'))}\n")
-                file.write("\n")
-
-        file.write("=== Errors ===\n")
-        errors = result.get("errors", [])
-        if errors:
-            for error in errors:
-                file.write(f"- {error}\n")
-        else:
-            file.write("None\n")
+    file.write("=== Errors ===\n")
+    errors = result.get("errors", [])
+    if errors:
+        for error in errors:
+            file.write(f"- {error}\n")
+    else:
+        file.write("None\n")
 
-        file.write("\n=== Final Result ===\n")
-        file.write(f"Checker results passed: {result.get('checkers_passed')}\n")
-        file.write(f"Constraint checks passed: {result.get('constraints_passed')}\n")
-        file.write(f"All checks passed: {result.get('all_passed')}\n")
+    file.write("\n=== Final Result ===\n")
+    file.write(f"Checker results passed: {result.get('checkers_passed')}\n")
+    file.write(f"Constraint checks passed: {result.get('constraints_passed')}\n")
+    file.write(f"All checks passed: {result.get('all_passed')}\n")
 
 
 def match_one_generated_efg(
@@ -324,9 +348,16 @@ def match_one_generated_efg(
     generated_game_path: str,
     output_game_path: str,
     model: str,
+    parse_cache=None,
 ) -> Dict[str, Any]:
+    """
+    Match one generated EFG against its reference game and save the result.
+
+    When a Tree.ParseCache is given, both games come from it as private
+    clones, so the reference is parsed once per run instead of per sample.
+    """
     from Match import build_global_action_mappings, match_player, switch_order
-    from Tree import EFGParser
+    from Tree import EFGParser, timed_stage
 
     ref_path = os.path.join(dataset_game_path, "game.efg")
     description_path = os.path.join(dataset_game_path, "description.txt")
@@ -353,33 +384,41 @@ def match_one_generated_efg(
     os.makedirs(output_game_path, exist_ok=True)
 
     parser_gen = EFGParser()
-    parser_ref = EFGParser()
 
-    gen_game = parser_gen.parse_file(gen_efg_path)
-    ref_game = parser_ref.parse_file(ref_path)
+    with timed_stage("parse"):
+        if parse_cache is not None:
+            gen_game = parser_gen.game = parse_cache.parse_file(gen_efg_path)
+            ref_game = parse_cache.parse_file(ref_path)
+        else:
+            gen_game = parser_gen.parse_file(gen_efg_path)
+            ref_game = EFGParser().parse_file(ref_path)
 
-    match_player(gen_game, ref_game, model)
+    with timed_stage("player match"):
+        match_player(gen_game, ref_game, model)
 
-    ref_total = ref_game.get_total_unique_actions()
-    gen_total = gen_game.get_total_unique_actions()
+    with timed_stage("action mapping"):
+        ref_total = ref_game.get_total_unique_actions()
+        gen_total = gen_game.get_total_unique_actions()
 
-    mappings = build_global_action_mappings(
-        ref_total,
-        gen_total,
-        model,
-        content,
-    )
+        mappings = build_global_action_mappings(
+            ref_total,
+            gen_total,
+            model,
+            content,
+        )
 
-    switch_order(
-        ref_game,
-        gen_game,
-        model,
-        mappings,
-        content,
-        constraints,
-    )
+    with timed_stage("switch order"):
+        switch_order(
+            ref_game,
+            gen_game,
+            model,
+            mappings,
+            content,
+            constraints,
+        )
 
-    parser_gen.save_to_efg(output_path)
+    with timed_stage("save"):
+        parser_gen.save_to_efg(output_path)
 
     return {
         "game_name": game_name,
@@ -395,6 +434,9 @@ def check_one_matched_efg(
     generated_filename: str,
     dataset_game_path: str,
     matched_path: str,
+    reference_games: Optional[Dict[str, Any]] = None,
+    constraint_sets: Optional[Dict[str, Any]] = None,
+    result_cache=None,
 ) -> Dict[str, Any]:
     """
     Check one matched EFG.
@@ -409,14 +451,28 @@ def check_one_matched_efg(
     3. Final constraint checker:
        - only JSON files with:
          "Cst Type": "Explicit Payoff(s) for a Certain Outcome"
-       - check_efg_json(matched_efg, json_file)
+       - ConstraintSet(json_files).evaluate(matched_efg), which gives the
+         same result as check_efg_json(matched_efg, json_file) per file
+
+    Both games are read once into a CheckContext shared by all stages.
+    `reference_games` (path -> LoadedGame) is reused across calls so each
+    reference game is read only once per run. Likewise `constraint_sets`
+    (constraints folder -> ConstraintSet) keeps each game's constraint files
+    read and compiled once; all explicit payoff constraints of a sample are
+    then checked in one traversal.
+
+    With a Checkers.CheckResultCache, the result is looked up by the content
+    of the matched EFG, game.efg, metadata.yml and the constraint JSONs
+    first; on a hit no game is loaded at all.
     """
     from Checkers import (
+        CheckContext,
+        ConstraintSet,
         same_reduced_strategies,
         check_payoffs,
-        check_total_order_matching,
-        check_efg_json,
+        find_total_order_violation,
     )
+    from Tree import add_count, timed_stage
 
     ref_path = os.path.join(dataset_game_path, "game.efg")
     metadata_path = os.path.join(dataset_game_path, "metadata.yml")
@@ -428,6 +484,26 @@ def check_one_matched_efg(
     if not os.path.exists(matched_path):
         raise FileNotFoundError(f"Matched EFG not found: {matched_path}")
 
+    cache_key = None
+    if result_cache is not None:
+        with timed_stage("check cache lookup"):
+            bundle_files = [ref_path, metadata_path] + get_constraint_json_files(constraints_dir)
+            cache_key = result_cache.key(matched_path, bundle_files)
+
+            cached = result_cache.get(cache_key)
+        if cached is not None:
+            # The same content may have been checked under another name.
+            cached.update(
+                game_name=game_name,
+                generated_filename=generated_filename,
+                matched_path=matched_path,
+                ref_path=ref_path,
+            )
+            return cached
+
+    with timed_stage("load games"):
+        context = CheckContext.from_paths(matched_path, ref_path, reference_games)
+
     checker_results = []
     constraint_results = []
     errors = []
@@ -435,7 +511,8 @@ def check_one_matched_efg(
     # ------------------------------------------------------------
     # Stage 1: reduced strategy set check
     # ------------------------------------------------------------
-    raw_reduced_result = same_reduced_strategies(matched_path, ref_path)
+    with timed_stage("checker: same_reduced_strategies"):
+        raw_reduced_result = same_reduced_strategies(context.candidate, context.reference)
     reduced_passed = normalize_result(raw_reduced_result)
 
     checker_results.append(
@@ -465,10 +542,12 @@ def check_one_matched_efg(
         errors.append("metadata.yml missing or additional_data not found.")
 
     elif additional_data == ADDITIONAL_DATA_TOTAL_ORDER:
-        raw_total_order_result = check_total_order_matching(
-            ref_path,
-            matched_path,
-        )
+        with timed_stage("checker: check_total_order_matching"):
+            violation = find_total_order_violation(
+                context.reference,
+                context.candidate,
+            )
+        raw_total_order_result = True if violation is None else {"passed": False, "violation": violation}
         total_order_passed = normalize_result(raw_total_order_result)
 
         checker_results.append(
@@ -484,10 +563,11 @@ def check_one_matched_efg(
             errors.append("Total order check failed.")
 
     elif additional_data == ADDITIONAL_DATA_IDENTICAL_PAYOFFS:
-        raw_payoff_result = check_payoffs(
-            ref_path,
-            matched_path,
-        )
+        with timed_stage("checker: check_payoffs"):
+            raw_payoff_result = check_payoffs(
+                context.reference,
+                context.candidate,
+            )
         payoff_passed = normalize_result(raw_payoff_result)
 
         checker_results.append(
@@ -517,9 +597,20 @@ def check_one_matched_efg(
     # Missing constraint folder is valid.
     # Only explicit payoff constraints are checked here.
     # ------------------------------------------------------------
-    json_files = get_constraint_json_files(constraints_dir)
+    constraint_set = None if constraint_sets is None else constraint_sets.get(constraints_dir)
+    if constraint_set is None:
+        constraint_set = ConstraintSet(get_constraint_json_files(constraints_dir))
+        if constraint_sets is not None:
+            constraint_sets[constraints_dir] = constraint_set
+
+    # All explicit payoff constraints are checked in one traversal, so they
+    # are timed together.
+    with timed_stage("constraints"):
+        explicit_results = constraint_set.evaluate(context.candidate)
 
-    if len(json_files) == 0:
+    add_count("constraints checked", len(explicit_results))
+
+    if len(constraint_set.constraints) == 0:
         constraint_results.append(
             {
                 "constraint_file": None,
@@ -530,8 +621,9 @@ def check_one_matched_efg(
             }
         )
 
-    for json_path in json_files:
-        cst_type = load_constraint_type(json_path)
+    for constraint in constraint_set.constraints:
+        json_path = constraint.json_path
+        cst_type = constraint.cst_type
 
         if cst_type != EXPLICIT_PAYOFF_CONSTRAINT_TYPE:
             constraint_results.append(
@@ -548,10 +640,7 @@ def check_one_matched_efg(
             )
             continue
 
-        raw_result = check_efg_json(
-            matched_path,
-            json_path,
-        )
+        raw_result = explicit_results[json_path]
         passed = normalize_result(raw_result)
 
         constraint_results.append(
@@ -592,6 +681,9 @@ def check_one_matched_efg(
     if not errors:
         result["errors"] = summarize_check_failure(result)
 
+    if result_cache is not None:
+        result_cache.put(cache_key, result)
+
     return result
 
 
@@ -620,21 +712,36 @@ def build_error_result(
     }
 
 
-def update_stats(per_game_stats: Dict[str, Dict[str, Any]], result: Dict[str, Any]):
-    game_name = result["game_name"]
+def summary_sample(result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The fields of a result that the summary shows. Checker details and
+    tracebacks are left out, so the stats stay small however many samples
+    are added.
+    """
+    sample = {
+        "generated_filename": result["generated_filename"],
+        "status": result.get("status"),
+        "all_passed": result.get("all_passed"),
+        "errors": list(result.get("errors") or []),
+    }
 
-    stats = per_game_stats.setdefault(
-        game_name,
-        {
-            "total": 0,
-            "passed": 0,
-            "failed": 0,
-            "samples": [],
-        },
-    )
+    error = result.get("error")
+    if error:
+        sample["error"] = {"type": error.get("type"), "message": error.get("message")}
+
+    return sample
+
+
+def update_stats(per_game_stats: Dict[str, Dict[str, Any]], result: Dict[str, Any]):
+    """
+    Add one result to the running per-game counts. Only the counts are kept,
+    so memory stays the same however many samples a run has; the sample
+    lists and timings of the summaries are read back from the manifest (see
+    load_manifest_stats).
+    """
+    stats = per_game_stats.setdefault(result["game_name"], {"total": 0, "passed": 0, "failed": 0})
 
     stats["total"] += 1
-    stats["samples"].append(result)
 
     if result.get("all_passed"):
         stats["passed"] += 1
@@ -642,11 +749,76 @@ def update_stats(per_game_stats: Dict[str, Dict[str, Any]], result: Dict[str, An
         stats["failed"] += 1
 
 
+def update_timing_stats(per_game_stats: Dict[str, Dict[str, Any]], result: Dict[str, Any]):
+    """
+    Add one result to the per-game stats that write_timing_summary reads:
+    the counts of update_stats plus, per stage and counter, a QuantileSketch
+    of the per-sample values, so the stats stay the same size however many
+    samples are added.
+    """
+    from Tree import QuantileSketch
+
+    update_stats(per_game_stats, result)
+
+    stats = per_game_stats[result["game_name"]]
+    stage_seconds = stats.setdefault("stage_seconds", {})
+    stage_calls = stats.setdefault("stage_calls", {})
+    counters = stats.setdefault("counters", {})
+
+    timings = result.get("timings") or {}
+
+    for stage, entry in timings.get("stages", {}).items():
+        stage_seconds.setdefault(stage, QuantileSketch()).add(entry["seconds"])
+        stage_calls[stage] = stage_calls.get(stage, 0) + entry["calls"]
+
+    for name, amount in timings.get("counters", {}).items():
+        counters.setdefault(name, QuantileSketch()).add(amount)
+
+
+def load_manifest_stats(manifest_path: str) -> Dict[str, Dict[str, Any]]:
+    """The update_timing_stats of every result in a manifest, read one entry at a time."""
+    per_game_stats: Dict[str, Dict[str, Any]] = {}
+    for entry in iter_manifest(manifest_path):
+        update_timing_stats(per_game_stats, entry["result"])
+    return per_game_stats
+
+
+def spill_summary_samples(manifest_path: str, spill_dir: str) -> Dict[str, str]:
+    """
+    Write summary_sample(result) of every manifest result to one file per
+    game under `spill_dir`, one JSON line each, so the summary can be
+    written one game at a time. Returns {game_name: file}.
+    """
+    paths: Dict[str, str] = {}
+
+    with ExitStack() as stack:
+        files = {}
+
+        for entry in iter_manifest(manifest_path):
+            result = entry["result"]
+            game_name = result["game_name"]
+
+            file = files.get(game_name)
+            if file is None:
+                paths[game_name] = os.path.join(spill_dir, f"{len(paths)}.jsonl")
+                file = files[game_name] = stack.enter_context(open(paths[game_name], "w", encoding="utf-8"))
+
+            file.write(json.dumps(summary_sample(result), default=repr) + "\n")
+
+    return paths
+
+
 def write_final_summary(
     summary_path: str,
     per_game_stats: Dict[str, Dict[str, Any]],
     num_generations: Optional[int],
+    manifest_path: str,
 ):
+    """
+    Write summary.txt from the counts of update_stats and the samples in the
+    manifest. Samples are listed one game at a time (see
+    spill_summary_samples), so only one game's sample lines are in memory.
+    """
     total_samples = sum(stats["total"] for stats in per_game_stats.values())
     total_passed = sum(stats["passed"] for stats in per_game_stats.values())
     total_failed = sum(stats["failed"] for stats in per_game_stats.values())
@@ -654,7 +826,8 @@ def write_final_summary(
 
     ensure_parent_dir(summary_path)
 
-    with open(summary_path, "w", encoding="utf-8") as file:
+    with ExitStack() as stack:
+        file = stack.enter_context(open(summary_path, "w", encoding="utf-8"))
         file.write("=== Final Combined Summary ===\n")
         file.write(f"Requested generations per game: {num_generations or 'all'}\n")
         file.write(f"Total games evaluated: {total_games}\n")
@@ -669,8 +842,16 @@ def write_final_summary(
 
         file.write("\n=== Per-Game Summary ===\n")
 
+        spill_dir = stack.enter_context(tempfile.TemporaryDirectory(prefix="summary_samples_"))
+        sample_files = spill_summary_samples(manifest_path, spill_dir)
+
         for game_name in sorted(per_game_stats.keys(), key=natural_sort_key):
             stats = per_game_stats[game_name]
+            samples = []
+            if game_name in sample_files:
+                with open(sample_files[game_name], "r", encoding="utf-8") as samples_file:
+                    samples = [json.loads(line) for line in samples_file]
+
             game_total = stats["total"]
             game_passed = stats["passed"]
             game_failed = stats["failed"]
@@ -689,7 +870,7 @@ def write_final_summary(
             file.write("  Samples:\n")
 
             for sample in sorted(
-                stats["samples"],
+                samples,
                 key=lambda item: natural_sort_key(item["generated_filename"]),
             ):
                 file.write(
@@ -715,6 +896,79 @@ def write_final_summary(
             file.write("\n")
 
 
+TIMING_SUMMARY_FILENAME = "timing_summary.txt"
+
+
+def timing_table_lines(game_stats: List[Dict[str, Any]]) -> List[str]:
+    """
+    Stage and counter tables over the samples of `game_stats`: per stage,
+    the samples that ran it, its calls, total seconds and the p50/p95 of
+    seconds per sample; per counter, the total and p50/p95 per sample.
+    Percentiles come from the QuantileSketches of update_timing_stats.
+    """
+    from Tree import QuantileSketch
+
+    stage_seconds: Dict[str, QuantileSketch] = {}
+    stage_calls: Dict[str, int] = {}
+    counters: Dict[str, QuantileSketch] = {}
+
+    for stats in game_stats:
+        for stage, sketch in stats["stage_seconds"].items():
+            stage_seconds.setdefault(stage, QuantileSketch()).merge(sketch)
+            stage_calls[stage] = stage_calls.get(stage, 0) + stats["stage_calls"][stage]
+
+        for name, sketch in stats["counters"].items():
+            counters.setdefault(name, QuantileSketch()).merge(sketch)
+
+    if not stage_seconds and not counters:
+        return ["No timings recorded."]
+
+    hits = counters["llm cache hits"].total if "llm cache hits" in counters else 0
+    misses = counters["llm cache misses"].total if "llm cache misses" in counters else 0
+
+    lines = [f"{'Stage':<36} {'Samples':>8} {'Calls':>8} {'Total s':>10} {'p50 s':>9} {'p95 s':>9}"]
+    for stage, sketch in stage_seconds.items():
+        lines.append(
+            f"{stage:<36} {sketch.count:>8} {stage_calls[stage]:>8} {sketch.total:>10.3f} "
+            f"{sketch.quantile(0.5):>9.3f} {sketch.quantile(0.95):>9.3f}"
+        )
+
+    lines.append("")
+    lines.append(f"{'Counter':<36} {'Samples':>8} {'Total':>12} {'p50':>10} {'p95':>10}")
+    for name, sketch in counters.items():
+        lines.append(
+            f"{name:<36} {sketch.count:>8} {sketch.total:>12} "
+            f"{sketch.quantile(0.5):>10} {sketch.quantile(0.95):>10}"
+        )
+
+    if hits + misses:
+        lines.append("")
+        lines.append(f"LLM response cache hit rate: {hits / (hits + misses):.4f} ({hits} of {hits + misses} prompts)")
+
+    return lines
+
+
+def write_timing_summary(timing_path: str, per_game_stats: Dict[str, Dict[str, Any]]):
+    """
+    Write the stage timing tables for all games and for each game. Timings
+    change from run to run, so they are kept out of summary.txt.
+    """
+    ensure_parent_dir(timing_path)
+
+    with open(timing_path, "w", encoding="utf-8") as file:
+        file.write("=== Stage Timings: All Games ===\n")
+        for line in timing_table_lines(list(per_game_stats.values())):
+            file.write(f"{line}\n")
+
+        file.write("\n=== Stage Timings Per Game ===\n")
+
+        for game_name in sorted(per_game_stats.keys(), key=natural_sort_key):
+            file.write(f"{game_name}\n")
+            for line in timing_table_lines([per_game_stats[game_name]]):
+                file.write(f"  {line}\n" if line else "\n")
+            file.write("\n")
+
+
 def print_final_summary(
     per_game_stats: Dict[str, Dict[str, Any]],
     num_generations: Optional[int],
@@ -748,6 +1002,605 @@ def print_final_summary(
     print(f"\nSummary saved to: {summary_path}")
 
 
+class EvaluationCaches:
+    """
+    Caches one process keeps across the samples it evaluates: parsed EFGs,
+    loaded reference games, compiled constraint sets and, when a folder is
+    given, the on-disk check result cache.
+    """
+    def __init__(self, parse_cache_dir: Optional[str] = None, check_cache_dir: Optional[str] = None):
+        from Checkers import CheckResultCache
+        from Tree import ParseCache
+
+        self.parse_cache = ParseCache(cache_dir=parse_cache_dir)
+        self.reference_games: Dict[str, Any] = {}
+        self.constraint_sets: Dict[str, Any] = {}
+        self.result_cache = CheckResultCache(check_cache_dir) if check_cache_dir is not None else None
+
+
+def collect_sample_tasks(
+    dataset_lookup: Dict[str, str],
+    dataset_root: str,
+    generated_root: str,
+    output_root: str,
+    report_root: str,
+    num_generations: Optional[int],
+) -> List[Dict[str, str]]:
+    """
+    One task per generated sample to evaluate, in the order a serial run
+    processes them.
+    """
+    tasks = []
+
+    for generated_game_name in sorted(
+        os.listdir(generated_root),
+        key=natural_sort_key,
+    ):
+        generated_game_path = os.path.join(generated_root, generated_game_name)
+
+        if not os.path.isdir(generated_game_path):
+            continue
+
+        normalized_generated_name = normalize_game_name(generated_game_name)
+        dataset_game_name = dataset_lookup.get(normalized_generated_name)
+
+        if dataset_game_name is None:
+            print(
+                f"[Skipping] No matching dataset folder found for: "
+                f"{generated_game_name}"
+            )
+            continue
+
+        dataset_game_path = os.path.join(dataset_root, dataset_game_name)
+        output_game_path = os.path.join(output_root, dataset_game_name)
+        report_game_path = os.path.join(report_root, dataset_game_name)
+
+        filenames = list_generation_files(
+            generated_game_path,
+            num_generations,
+        )
+
+        if len(filenames) == 0:
+            print(f"[Skipping] No generated .efg files found for: {generated_game_name}")
+            continue
+
+        for filename in filenames:
+            tasks.append(
+                {
+                    "generated_game_name": generated_game_name,
+                    "game_name": dataset_game_name,
+                    "filename": filename,
+                    "dataset_game_path": dataset_game_path,
+                    "generated_game_path": generated_game_path,
+                    "output_game_path": output_game_path,
+                    "report_path": os.path.join(
+                        report_game_path,
+                        os.path.splitext(filename)[0] + ".txt",
+                    ),
+                }
+            )
+
+    return tasks
+
+
+def match_sample(
+    task: Dict[str, str],
+    model: str,
+    parse_cache,
+) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """
+    Match one sample. Returns (match result, None), or (None, final result)
+    when matching failed; the failed sample's report is already written.
+    Either result carries the stage timings of matching under "timings".
+    """
+    from Tree import recording
+
+    dataset_game_name = task["game_name"]
+    filename = task["filename"]
+    generated_game_path = task["generated_game_path"]
+    dataset_game_path = task["dataset_game_path"]
+
+    print(f"Processing: {task['generated_game_name']}/{filename}")
+
+    try:
+        with recording() as recorder:
+            match_result = match_one_generated_efg(
+                game_name=dataset_game_name,
+                generated_filename=filename,
+                dataset_game_path=dataset_game_path,
+                generated_game_path=generated_game_path,
+                output_game_path=task["output_game_path"],
+                model=model,
+                parse_cache=parse_cache,
+            )
+    except Exception as exc:
+        result = build_error_result(
+            game_name=dataset_game_name,
+            generated_filename=filename,
+            stage="match",
+            exc=exc,
+            generated_path=os.path.join(generated_game_path, filename),
+            matched_path=os.path.join(task["output_game_path"], filename),
+            ref_path=os.path.join(dataset_game_path, "game.efg"),
+        )
+        result["timings"] = recorder.as_dict()
+
+        write_sample_report(task["report_path"], result)
+
+        print(
+            f"[MATCH ERROR] {dataset_game_name}/{filename}: "
+            f"{type(exc).__name__}: {exc}"
+        )
+        return None, result
+
+    match_result["timings"] = recorder.as_dict()
+    return match_result, None
+
+
+def check_sample(task: Dict[str, str], match_result: Dict[str, Any], caches: EvaluationCaches) -> Dict[str, Any]:
+    """
+    Check one matched sample, write its report and return its result. The
+    result's "timings" cover both matching and checking.
+    """
+    from Tree import StageRecorder, recording
+
+    dataset_game_name = task["game_name"]
+    filename = task["filename"]
+
+    recorder = StageRecorder()
+    recorder.merge(match_result.get("timings"))
+
+    try:
+        with recording(recorder):
+            result = check_one_matched_efg(
+                game_name=dataset_game_name,
+                generated_filename=filename,
+                dataset_game_path=task["dataset_game_path"],
+                matched_path=match_result["matched_path"],
+                reference_games=caches.reference_games,
+                constraint_sets=caches.constraint_sets,
+                result_cache=caches.result_cache,
+            )
+
+        result["generated_path"] = match_result["generated_path"]
+
+    except Exception as exc:
+        result = build_error_result(
+            game_name=dataset_game_name,
+            generated_filename=filename,
+            stage="constraint_error",
+            exc=exc,
+            generated_path=os.path.join(task["generated_game_path"], filename),
+            matched_path=os.path.join(task["output_game_path"], filename),
+            ref_path=os.path.join(task["dataset_game_path"], "game.efg"),
+        )
+
+        print(
+            f"[CONSTRAINT ERROR] {dataset_game_name}/{filename}: "
+            f"{type(exc).__name__}: {exc}"
+        )
+    else:
+        if result["all_passed"]:
+            print(f"[PASS] {dataset_game_name}/{filename}")
+        else:
+            print(f"[FAIL] {dataset_game_name}/{filename}")
+
+    result["timings"] = recorder.as_dict()
+
+    write_sample_report(task["report_path"], result)
+    return result
+
+
+def evaluate_sample(task: Dict[str, str], model: str, caches: EvaluationCaches) -> Dict[str, Any]:
+    """
+    Match and check one sample, write its report and return its result.
+    """
+    match_result, result = match_sample(task, model, caches.parse_cache)
+
+    if match_result is None:
+        return result
+
+    return check_sample(task, match_result, caches)
+
+
+# Caches of a --jobs worker process, set up once by init_worker.
+WORKER_CACHES: Optional[EvaluationCaches] = None
+
+
+def init_worker(
+    parse_cache_dir: Optional[str],
+    check_cache_dir: Optional[str],
+    llm_cache_options: Optional[Dict[str, Any]] = None,
+    llm_client_options: Optional[Dict[str, Any]] = None,
+    combined_action_prompt: bool = False,
+):
+    global WORKER_CACHES
+    WORKER_CACHES = EvaluationCaches(parse_cache_dir, check_cache_dir)
+    open_llm_cache(llm_cache_options)
+    configure_llm_client(llm_client_options)
+    configure_action_matching(combined_action_prompt)
+
+
+def configure_llm_client(llm_client_options: Optional[Dict[str, Any]]):
+    """Apply `llm_client_options` (fields of Match.ClientSettings) in this process."""
+    if not llm_client_options:
+        return
+
+    from Match import configure_client
+
+    configure_client(**llm_client_options)
+
+
+def configure_action_matching(combined_action_prompt: bool):
+    """Ask for action verdicts and mappings in one request in this process."""
+    from Match import set_combined_action_prompt
+
+    set_combined_action_prompt(combined_action_prompt)
+
+
+def open_llm_cache(llm_cache_options: Optional[Dict[str, Any]]):
+    """
+    Open the LLM response cache described by `llm_cache_options` (keyword
+    arguments of Match.LLMResponseCache) and make it the one infer_response
+    uses in this process. Returns None when no cache is configured.
+    """
+    if llm_cache_options is None:
+        return None
+
+    from Match import LLMResponseCache, set_response_cache
+
+    cache = LLMResponseCache(**llm_cache_options)
+    set_response_cache(cache)
+    return cache
+
+
+def evaluate_sample_in_worker(task: Dict[str, str], model: str) -> Dict[str, Any]:
+    return evaluate_sample(task, model, WORKER_CACHES)
+
+
+def check_sample_in_worker(task: Dict[str, str], match_result: Dict[str, Any]) -> Dict[str, Any]:
+    return check_sample(task, match_result, WORKER_CACHES)
+
+
+# How long the pipeline's threads wait on the queue before looking again.
+QUEUE_POLL_SECONDS = 0.1
+
+PROGRESS_INTERVAL_SECONDS = 10.0
+
+
+class PipelineProgress:
+    """
+    Counters of the pipelined evaluator. `report` prints them at most every
+    `interval` seconds: samples matched and finished with their rates,
+    matched samples waiting in the queue and checks running in the pool.
+    """
+    def __init__(self, total: int, interval: float = PROGRESS_INTERVAL_SECONDS):
+        self.total = total
+        self.interval = interval
+        self.start = time.perf_counter()
+        self.last_report = self.start
+        self.matched = 0
+        self.finished = 0
+        self.lock = threading.Lock()
+
+    def add_matched(self):
+        with self.lock:
+            self.matched += 1
+
+    def report(self, queue_depth: int, checks_running: int, force: bool = False):
+        now = time.perf_counter()
+        if not force and now - self.last_report < self.interval:
+            return
+
+        self.last_report = now
+        elapsed = max(now - self.start, 1e-9)
+
+        print(
+            f"[Pipeline] matched {self.matched}/{self.total} ({self.matched / elapsed:.2f}/s) | "
+            f"finished {self.finished}/{self.total} ({self.finished / elapsed:.2f}/s) | "
+            f"queue {queue_depth} | checking {checks_running}"
+        )
+
+
+def checker_process_context():
+    """
+    Start method of the --pipeline checker pool. The pool is started while
+    matcher threads may hold locks (the LLM response cache, the shared
+    OpenAI client, stdout), and a forked child would inherit them held, so
+    workers come from a fork server (or are spawned where there is none).
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def run_pipeline(pending: List[Tuple[int, Dict[str, str], str]], args, record):
+    """
+    Evaluate `pending` (index, task, inputs) in two overlapping stages.
+
+    Up to `args.match_concurrency` samples are matched at once in threads,
+    since matching mostly waits on the LLM. Matched samples go through a
+    queue of at most `args.queue_size` entries to a pool of `args.jobs`
+    checker processes; when the checkers fall behind, the full queue holds
+    back the matchers. `record(index, inputs, result)` is called from this
+    thread as each sample finishes.
+    """
+    from Tree import ParseCache
+
+    matched_queue: "queue.Queue[tuple]" = queue.Queue(maxsize=args.queue_size)
+    progress = PipelineProgress(len(pending))
+    stop = threading.Event()
+    thread_state = threading.local()
+
+    def match_in_thread(index: int, task: Dict[str, str], inputs: str):
+        # ParseCache is not thread-safe, so each matcher thread has its own.
+        parse_cache = getattr(thread_state, "parse_cache", None)
+        if parse_cache is None:
+            parse_cache = thread_state.parse_cache = ParseCache(cache_dir=args.parse_cache_dir)
+
+        try:
+            item = (index, task, inputs) + match_sample(task, args.model, parse_cache)
+        except Exception as exc:
+            # Raised again by the dispatcher below, instead of being lost here.
+            item = (index, task, inputs, None, exc)
+
+        progress.add_matched()
+
+        while not stop.is_set():
+            try:
+                matched_queue.put(item, timeout=QUEUE_POLL_SECONDS)
+                return
+            except queue.Full:
+                continue
+
+    max_checks = 2 * args.jobs
+    checks: Dict[Any, Tuple[int, str]] = {}
+    remaining = len(pending)
+
+    with ThreadPoolExecutor(max_workers=args.match_concurrency) as matchers, ProcessPoolExecutor(
+        max_workers=args.jobs,
+        mp_context=checker_process_context(),
+        initializer=init_worker,
+        initargs=(
+            args.parse_cache_dir,
+            args.check_cache_dir,
+            args.llm_cache_options,
+            args.llm_client_options,
+            args.combined_action_prompt,
+        ),
+    ) as checkers:
+        try:
+            for index, task, inputs in pending:
+                matchers.submit(match_in_thread, index, task, inputs)
+
+            while remaining:
+                # Only take matched samples while the pool has room, so the
+                # queue stays bounded.
+                if len(checks) < max_checks:
+                    try:
+                        index, task, inputs, match_result, result = matched_queue.get(timeout=QUEUE_POLL_SECONDS)
+                    except queue.Empty:
+                        pass
+                    else:
+                        if isinstance(result, Exception):
+                            raise result
+
+                        if match_result is None:
+                            record(index, inputs, result)
+                            progress.finished += 1
+                            remaining -= 1
+                        else:
+                            future = checkers.submit(check_sample_in_worker, task, match_result)
+                            checks[future] = (index, inputs)
+                else:
+                    wait(checks, timeout=QUEUE_POLL_SECONDS, return_when=FIRST_COMPLETED)
+
+                for future in [future for future in checks if future.done()]:
+                    index, inputs = checks.pop(future)
+                    record(index, inputs, future.result())
+                    progress.finished += 1
+                    remaining -= 1
+
+                progress.report(matched_queue.qsize(), len(checks))
+        finally:
+            stop.set()
+            matchers.shutdown(cancel_futures=True)
+
+    progress.report(matched_queue.qsize(), len(checks), force=True)
+
+
+MANIFEST_FILENAME = "manifest.jsonl"
+
+
+def sample_key(task: Dict[str, str]) -> str:
+    return f"{task['game_name']}/{task['filename']}"
+
+
+def sample_input_digest(task: Dict[str, str], digests: Dict[str, Any]) -> str:
+    """
+    Digest of every file a sample's result depends on: the generated EFG and
+    the reference game.efg, description.txt, metadata.yml and constraint
+    JSONs. Missing files are hashed as absent.
+    """
+    from Tree import file_digest
+
+    dataset_game_path = task["dataset_game_path"]
+    paths = [
+        os.path.join(task["generated_game_path"], task["filename"]),
+        os.path.join(dataset_game_path, "game.efg"),
+        os.path.join(dataset_game_path, "description.txt"),
+        os.path.join(dataset_game_path, "metadata.yml"),
+    ] + get_constraint_json_files(find_constraints_dir(dataset_game_path))
+
+    sha = hashlib.sha256()
+    for path in paths:
+        digest = file_digest(path, digests) if os.path.exists(path) else None
+        sha.update(repr((path, digest)).encode())
+
+    return sha.hexdigest()
+
+
+# A quoted label, kept as written when whitespace is normalized.
+QUOTED_LABEL_PATTERN = re.compile(r'("(?:[^"\\]|\\.)*")')
+
+
+def normalized_efg_digest(path: str) -> str:
+    """
+    SHA-256 of an EFG file up to whitespace: runs of whitespace outside
+    quoted labels become one space, lines are stripped and blank lines
+    dropped. Line order is kept, since it encodes the tree.
+    """
+    sha = hashlib.sha256()
+
+    with open(path, "r", encoding="utf-8", errors="replace") as file:
+        for line in file:
+            pieces = QUOTED_LABEL_PATTERN.split(line)
+            for position in range(0, len(pieces), 2):
+                pieces[position] = re.sub(r"\s+", " ", pieces[position])
+
+            normalized = "".join(pieces).strip()
+            if normalized:
+                sha.update(normalized.encode())
+                sha.update(b"\n")
+
+    return sha.hexdigest()
+
+
+def group_duplicate_samples(
+    pending: List[Tuple[int, Dict[str, str], str]],
+) -> Tuple[List[Tuple[int, Dict[str, str], str]], Dict[int, List[Tuple[int, str]]]]:
+    """
+    Group pending samples of the same game whose generated EFGs are equal up
+    to whitespace. Returns the first sample of every group, to be evaluated,
+    and {representative index: [(index, inputs) of the other members]}.
+    """
+    representatives = []
+    members: Dict[int, List[Tuple[int, str]]] = {}
+    first_by_content: Dict[Tuple[str, str], int] = {}
+
+    for index, task, inputs in pending:
+        generated_path = os.path.join(task["generated_game_path"], task["filename"])
+        key = (task["dataset_game_path"], normalized_efg_digest(generated_path))
+
+        representative = first_by_content.get(key)
+        if representative is None:
+            first_by_content[key] = index
+            representatives.append((index, task, inputs))
+        else:
+            members.setdefault(representative, []).append((index, inputs))
+
+    return representatives, members
+
+
+def share_result(result: Dict[str, Any], representative: Dict[str, str], task: Dict[str, str]) -> Dict[str, Any]:
+    """
+    The result of `representative` as the result of `task`, an identical
+    sample. The matched EFG is copied to the sample's own output path.
+    """
+    generated_path = os.path.join(task["generated_game_path"], task["filename"])
+    matched_path = os.path.join(task["output_game_path"], task["filename"])
+
+    representative_matched = result.get("matched_path")
+    if result.get("stage") != "match" and representative_matched and os.path.exists(representative_matched):
+        os.makedirs(task["output_game_path"], exist_ok=True)
+        shutil.copyfile(representative_matched, matched_path)
+
+    shared = dict(result)
+    shared.update(
+        generated_filename=task["filename"],
+        generated_path=generated_path,
+        matched_path=matched_path,
+        shared_from=os.path.join(representative["generated_game_path"], representative["filename"]),
+        # The work was done once, for the representative.
+        timings=None,
+    )
+    return shared
+
+
+def manifest_entry(task: Dict[str, str], inputs: str, model: str, result: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "sample": sample_key(task),
+        "inputs": inputs,
+        "model": model,
+        "result": result,
+    }
+
+
+def iter_manifest_lines(manifest_path: str):
+    """
+    Yield (line number, line, entry) for the entries of a manifest, one at a
+    time. A line cut off by a crash is skipped.
+    """
+    if not os.path.exists(manifest_path):
+        return
+
+    with open(manifest_path, "r", encoding="utf-8") as file:
+        for line_number, line in enumerate(file):
+            try:
+                yield line_number, line, json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def iter_manifest(manifest_path: str):
+    """Yield the entries of a manifest one at a time; see iter_manifest_lines."""
+    for _, _, entry in iter_manifest_lines(manifest_path):
+        yield entry
+
+
+def load_manifest_index(manifest_path: str) -> Dict[str, Tuple[int, str, str, Optional[str]]]:
+    """
+    Index a manifest written by an earlier run as {sample: (line number,
+    inputs, model, status)}; later lines win. Results are not kept, so the
+    index stays small however large the results are.
+    """
+    return {
+        entry["sample"]: (line_number, entry["inputs"], entry["model"], entry["result"].get("status"))
+        for line_number, _, entry in iter_manifest_lines(manifest_path)
+    }
+
+
+def copy_manifest_lines(manifest_path: str, line_numbers: Set[int], on_result: Callable[[Dict[str, Any]], None]):
+    """
+    Replace the manifest with just its lines `line_numbers`, copied one at a
+    time, and pass the result of each copied entry to `on_result`. An empty
+    set starts a new, empty manifest.
+    """
+    ensure_parent_dir(manifest_path)
+
+    temp_path = f"{manifest_path}.{os.getpid()}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as file:
+        if line_numbers:
+            for line_number, line, entry in iter_manifest_lines(manifest_path):
+                if line_number in line_numbers:
+                    file.write(line if line.endswith("\n") else line + "\n")
+                    on_result(entry["result"])
+
+    os.replace(temp_path, manifest_path)
+
+
+def can_reuse_manifest_entry(
+    indexed: Optional[Tuple[int, str, str, Optional[str]]],
+    inputs: str,
+    model: str,
+    task: Dict[str, str],
+) -> bool:
+    """Whether the load_manifest_index entry `indexed` of a sample still holds for `task`."""
+    if indexed is None:
+        return False
+
+    _, previous_inputs, previous_model, status = indexed
+
+    # Errors are often transient (quota, network), so they are retried.
+    if status == "ERROR":
+        return False
+
+    return (
+        previous_inputs == inputs
+        and previous_model == model
+        and os.path.exists(task["report_path"])
+    )
+
+
 def main():
     parser = argparse.ArgumentParser()
 
@@ -798,11 +1651,199 @@ def main():
         ),
     )
 
+    parser.add_argument(
+        "--parse_cache_dir",
+        type=str,
+        default=None,
+        help=(
+            "Optional folder for the on-disk parse cache. Parsed EFGs are "
+            "always cached in memory for the run; with this set they are "
+            "also reused across runs."
+        ),
+    )
+
+    parser.add_argument(
+        "--check_cache_dir",
+        type=str,
+        default=None,
+        help=(
+            "Optional folder for the checker result cache. Samples whose "
+            "matched EFG and reference files are unchanged since a previous "
+            "run reuse that run's check results."
+        ),
+    )
+
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help=(
+            "Number of worker processes. Samples are matched and checked in "
+            "parallel (with --pipeline the processes only run checks); "
+            "reports and summary.txt are the same as with 1."
+        ),
+    )
+
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help=(
+            "Reuse the results recorded in the report folder's manifest for "
+            "samples whose generated EFG, reference files and model are "
+            "unchanged and whose report exists. Samples that ended in an "
+            "error are evaluated again."
+        ),
+    )
+
+    parser.add_argument(
+        "--llm_base_url",
+        type=str,
+        default=None,
+        help=(
+            "Optional base URL of the LLM API, e.g. a local OpenAI-compatible "
+            "server for offline runs. The default is the OpenAI API."
+        ),
+    )
+
+    parser.add_argument(
+        "--llm_timeout",
+        type=float,
+        default=None,
+        help="Timeout of one LLM request in seconds. The default is 120.",
+    )
+
+    parser.add_argument(
+        "--llm_max_retries",
+        type=int,
+        default=None,
+        help=(
+            "Retries of a failed LLM request (connection errors, timeouts, rate "
+            "limits, server errors), with jittered exponential backoff that "
+            "honors Retry-After. The default is 5."
+        ),
+    )
+
+    parser.add_argument(
+        "--llm_cache",
+        type=str,
+        default=None,
+        help=(
+            "Optional SQLite file caching LLM responses by model, temperature "
+            "and prompt. Repeated prompts are answered from it instead of "
+            "sending a new request."
+        ),
+    )
+
+    parser.add_argument(
+        "--llm_cache_max_entries",
+        type=int,
+        default=None,
+        help="With --llm_cache, keep only this many most recently used responses.",
+    )
+
+    parser.add_argument(
+        "--llm_cache_max_age_days",
+        type=float,
+        default=None,
+        help="With --llm_cache, drop responses stored more than this many days ago.",
+    )
+
+    parser.add_argument(
+        "--llm_replay",
+        action="store_true",
+        help=(
+            "With --llm_cache, only replay cached responses: the cache is "
+            "opened read-only and a prompt it does not hold fails the sample "
+            "instead of calling the LLM."
+        ),
+    )
+
+    parser.add_argument(
+        "--combined_action_prompt",
+        action="store_true",
+        help=(
+            "Ask the LLM whether two action lists match and for their mapping "
+            "in one JSON request instead of two."
+        ),
+    )
+
+    parser.add_argument(
+        "--no_dedup",
+        action="store_true",
+        help=(
+            "Evaluate every sample on its own. By default, generated EFGs of "
+            "the same game that are equal up to whitespace are evaluated once "
+            "and share the result."
+        ),
+    )
+
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help=(
+            "Match several samples at once and check matched samples in a "
+            "pool of --jobs processes while matching continues. Progress is "
+            "reported with queue depths and stage throughput."
+        ),
+    )
+
+    parser.add_argument(
+        "--match_concurrency",
+        type=int,
+        default=8,
+        help="With --pipeline, the number of samples matched at once.",
+    )
+
+    parser.add_argument(
+        "--queue_size",
+        type=int,
+        default=16,
+        help="With --pipeline, the most matched samples waiting for a checker.",
+    )
+
     args = parser.parse_args()
 
     if args.num_generations is not None and args.num_generations <= 0:
         raise ValueError("--num_generations must be greater than 0")
 
+    if args.jobs <= 0:
+        raise ValueError("--jobs must be greater than 0")
+
+    if args.match_concurrency <= 0:
+        raise ValueError("--match_concurrency must be greater than 0")
+
+    if args.queue_size <= 0:
+        raise ValueError("--queue_size must be greater than 0")
+
+    if args.llm_replay and args.llm_cache is None:
+        raise ValueError("--llm_replay requires --llm_cache")
+
+    args.llm_cache_options = None
+    if args.llm_cache is not None:
+        args.llm_cache_options = {
+            "path": args.llm_cache,
+            "max_entries": args.llm_cache_max_entries,
+            "max_age_days": args.llm_cache_max_age_days,
+            "read_only": args.llm_replay,
+        }
+
+    args.llm_client_options = {
+        name: value
+        for name, value in [
+            ("base_url", args.llm_base_url),
+            ("timeout", args.llm_timeout),
+            ("max_retries", args.llm_max_retries),
+        ]
+        if value is not None
+    }
+
+    # Matching runs in this process except with --jobs > 1 and no pipeline;
+    # setting up here also checks the options before any work starts.
+    llm_cache = open_llm_cache(args.llm_cache_options)
+    configure_llm_client(args.llm_client_options)
+    configure_action_matching(args.combined_action_prompt)
+
     if not os.path.isdir(args.dataset_root):
         raise FileNotFoundError(f"Dataset root not found: {args.dataset_root}")
 
@@ -810,117 +1851,120 @@ def main():
         raise FileNotFoundError(f"Generated root not found: {args.generated_root}")
 
     dataset_lookup = build_dataset_lookup(args.dataset_root)
-    per_game_stats: Dict[str, Dict[str, Any]] = {}
-
-    for generated_game_name in sorted(
-        os.listdir(args.generated_root),
-        key=natural_sort_key,
-    ):
-        generated_game_path = os.path.join(args.generated_root, generated_game_name)
+    tasks = collect_sample_tasks(
+        dataset_lookup,
+        args.dataset_root,
+        args.generated_root,
+        args.output_root,
+        args.report_root,
+        args.num_generations,
+    )
 
-        if not os.path.isdir(generated_game_path):
-            continue
+    manifest_path = os.path.join(args.report_root, MANIFEST_FILENAME)
+    previous_index = load_manifest_index(manifest_path) if args.resume else {}
 
-        normalized_generated_name = normalize_game_name(generated_game_name)
-        dataset_game_name = dataset_lookup.get(normalized_generated_name)
-
-        if dataset_game_name is None:
-            print(
-                f"[Skipping] No matching dataset folder found for: "
-                f"{generated_game_name}"
-            )
-            continue
+    digests: Dict[str, Any] = {}
+    per_game_stats: Dict[str, Dict[str, Any]] = {}
+    kept_lines: Set[int] = set()
+    pending = []
 
-        dataset_game_path = os.path.join(args.dataset_root, dataset_game_name)
-        output_game_path = os.path.join(args.output_root, dataset_game_name)
-        report_game_path = os.path.join(args.report_root, dataset_game_name)
+    for index, task in enumerate(tasks):
+        inputs = sample_input_digest(task, digests)
+        indexed = previous_index.get(sample_key(task))
 
-        filenames = list_generation_files(
-            generated_game_path,
-            args.num_generations,
-        )
+        if can_reuse_manifest_entry(indexed, inputs, args.model, task):
+            kept_lines.add(indexed[0])
+        else:
+            pending.append((index, task, inputs))
 
-        if len(filenames) == 0:
-            print(f"[Skipping] No generated .efg files found for: {generated_game_name}")
-            continue
+    previous_index.clear()
 
-        for filename in filenames:
-            generated_path = os.path.join(generated_game_path, filename)
-            matched_path = os.path.join(output_game_path, filename)
-            report_path = os.path.join(
-                report_game_path,
-                os.path.splitext(filename)[0] + ".txt",
-            )
-            ref_path = os.path.join(dataset_game_path, "game.efg")
+    if args.resume:
+        print(f"[Resume] Reusing {len(kept_lines)} of {len(tasks)} samples; evaluating {len(pending)}")
 
-            print(f"Processing: {generated_game_name}/{filename}")
+    shared_members: Dict[int, List[Tuple[int, str]]] = {}
+    if not args.no_dedup:
+        pending, shared_members = group_duplicate_samples(pending)
+        shared_count = sum(len(members) for members in shared_members.values())
+        if shared_count:
+            print(f"[Dedup] {shared_count} samples are identical to another one; evaluating {len(pending)}")
 
-            try:
-                match_result = match_one_generated_efg(
-                    game_name=dataset_game_name,
-                    generated_filename=filename,
-                    dataset_game_path=dataset_game_path,
-                    generated_game_path=generated_game_path,
-                    output_game_path=output_game_path,
-                    model=args.model,
-                )
-            except Exception as exc:
-                result = build_error_result(
-                    game_name=dataset_game_name,
-                    generated_filename=filename,
-                    stage="match",
-                    exc=exc,
-                    generated_path=generated_path,
-                    matched_path=matched_path,
-                    ref_path=ref_path,
-                )
+    # The manifest is rewritten with the reused entries only, copied line by
+    # line and counted on the way; then every evaluated sample is appended as
+    # soon as it finishes, so a run that dies can be resumed from its last
+    # completed sample.
+    copy_manifest_lines(manifest_path, kept_lines, lambda result: update_stats(per_game_stats, result))
+    kept_lines.clear()
 
-                write_sample_report(report_path, result)
-                update_stats(per_game_stats, result)
+    with open(manifest_path, "a", encoding="utf-8") as manifest:
+        def record(index: int, inputs: str, result: Dict[str, Any]):
+            update_stats(per_game_stats, result)
+            entry = manifest_entry(tasks[index], inputs, args.model, result)
+            manifest.write(json.dumps(entry, default=repr) + "\n")
+            manifest.flush()
+
+            for member_index, member_inputs in shared_members.pop(index, []):
+                member = tasks[member_index]
+                shared = share_result(result, tasks[index], member)
+                write_sample_report(member["report_path"], shared)
+                print(f"[SHARED] {member['game_name']}/{member['filename']}: {shared.get('status')} (from {tasks[index]['filename']})")
+                record(member_index, member_inputs, shared)
+
+        if args.pipeline:
+            run_pipeline(pending, args, record)
+            caches = None
+        elif args.jobs == 1:
+            caches = EvaluationCaches(args.parse_cache_dir, args.check_cache_dir)
+            for index, task, inputs in pending:
+                record(index, inputs, evaluate_sample(task, args.model, caches))
+        else:
+            with ProcessPoolExecutor(
+                max_workers=args.jobs,
+                initializer=init_worker,
+                initargs=(
+                    args.parse_cache_dir,
+                    args.check_cache_dir,
+                    args.llm_cache_options,
+                    args.llm_client_options,
+                    args.combined_action_prompt,
+                ),
+            ) as pool:
+                futures = {
+                    pool.submit(evaluate_sample_in_worker, task, args.model): (index, inputs)
+                    for index, task, inputs in pending
+                }
+                # The summary sorts samples, so it does not depend on the
+                # order workers finish in.
+                for future in as_completed(futures):
+                    index, inputs = futures[future]
+                    record(index, inputs, future.result())
+            caches = None
+
+    # The manifest now holds every sample of this run; the per-sample lines
+    # and the timing percentiles are streamed from it.
+    summary_path = os.path.join(args.report_root, "summary.txt")
+    write_final_summary(summary_path, per_game_stats, args.num_generations, manifest_path)
+    print_final_summary(per_game_stats, args.num_generations, summary_path)
 
-                print(
-                    f"[MATCH ERROR] {dataset_game_name}/{filename}: "
-                    f"{type(exc).__name__}: {exc}"
-                )
-                continue
+    timing_stats = load_manifest_stats(manifest_path)
 
-            try:
-                result = check_one_matched_efg(
-                    game_name=dataset_game_name,
-                    generated_filename=filename,
-                    dataset_game_path=dataset_game_path,
-                    matched_path=match_result["matched_path"],
-                )
+    timing_path = os.path.join(args.report_root, TIMING_SUMMARY_FILENAME)
+    write_timing_summary(timing_path, timing_stats)
 
-                result["generated_path"] = match_result["generated_path"]
-
-            except Exception as exc:
-                result = build_error_result(
-                    game_name=dataset_game_name,
-                    generated_filename=filename,
-                    stage="constraint_error",
-                    exc=exc,
-                    generated_path=generated_path,
-                    matched_path=matched_path,
-                    ref_path=ref_path,
-                )
+    print("\n=== Stage Timings: All Games ===")
+    for line in timing_table_lines(list(timing_stats.values())):
+        print(line)
+    print(f"\nStage timings saved to: {timing_path}")
 
-                print(
-                    f"[CONSTRAINT ERROR] {dataset_game_name}/{filename}: "
-                    f"{type(exc).__name__}: {exc}"
-                )
-            else:
-                if result["all_passed"]:
-                    print(f"[PASS] {dataset_game_name}/{filename}")
-                else:
-                    print(f"[FAIL] {dataset_game_name}/{filename}")
+    if llm_cache is not None:
+        llm_cache.close()
 
-            write_sample_report(report_path, result)
-            update_stats(per_game_stats, result)
+    if caches is not None:
+        print(f"Parse cache: {caches.parse_cache.stats()}")
 
-    summary_path = os.path.join(args.report_root, "summary.txt")
-    write_final_summary(summary_path, per_game_stats, args.num_generations)
-    print_final_summary(per_game_stats, args.num_generations, summary_path)
+        if caches.result_cache is not None:
+            print(f"Check result cache: {caches.result_cache.stats()}")
+            caches.result_cache.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,171 @@
+import argparse
+import os
+from collections import Counter
+from typing import Any, Dict, List
+
+from process_evaluation import (
+    MANIFEST_FILENAME,
+    TIMING_SUMMARY_FILENAME,
+    iter_manifest,
+    load_manifest_stats,
+    natural_sort_key,
+    print_final_summary,
+    timing_table_lines,
+    update_stats,
+    write_final_summary,
+    write_timing_summary,
+)
+
+
+def failure_stages(result: Dict[str, Any]) -> List[str]:
+    """
+    Where a result failed: the stage that raised for an error, otherwise one
+    label per failed checker plus one if any constraint failed.
+    """
+    stage = result.get("stage")
+    error = result.get("error") or {}
+
+    if stage == "match":
+        return [f"match error: {error.get('type')}"]
+
+    if stage == "constraint_error":
+        return [f"check error: {error.get('type')}"]
+
+    stages = [
+        f"checker: {item.get('check_name')}"
+        for item in result.get("checker_results", [])
+        if not item.get("passed", False)
+    ]
+
+    if any(not item.get("passed", False) for item in result.get("constraint_results", [])):
+        stages.append("constraints")
+
+    return stages
+
+
+def regenerate_summary(args):
+    manifest_path = os.path.join(args.report_root, MANIFEST_FILENAME)
+    if not os.path.exists(manifest_path):
+        raise FileNotFoundError(f"Manifest not found: {manifest_path}")
+
+    per_game_stats: Dict[str, Dict[str, Any]] = {}
+    for entry in iter_manifest(manifest_path):
+        update_stats(per_game_stats, entry["result"])
+
+    summary_path = args.output or os.path.join(args.report_root, "summary.txt")
+    write_final_summary(summary_path, per_game_stats, args.num_generations, manifest_path)
+    print_final_summary(per_game_stats, args.num_generations, summary_path)
+
+
+def regenerate_timings(args):
+    manifest_path = os.path.join(args.report_root, MANIFEST_FILENAME)
+    if not os.path.exists(manifest_path):
+        raise FileNotFoundError(f"Manifest not found: {manifest_path}")
+
+    per_game_stats = load_manifest_stats(manifest_path)
+
+    timing_path = args.output or os.path.join(args.report_root, TIMING_SUMMARY_FILENAME)
+    write_timing_summary(timing_path, per_game_stats)
+
+    for line in timing_table_lines(list(per_game_stats.values())):
+        print(line)
+    print(f"\nStage timings saved to: {timing_path}")
+
+
+def failure_histogram(args):
+    manifest_path = os.path.join(args.report_root, MANIFEST_FILENAME)
+    if not os.path.exists(manifest_path):
+        raise FileNotFoundError(f"Manifest not found: {manifest_path}")
+
+    histograms: Dict[str, Counter] = {}
+    total = 0
+    failed = 0
+
+    for entry in iter_manifest(manifest_path):
+        result = entry["result"]
+        total += 1
+
+        if result.get("all_passed"):
+            continue
+
+        failed += 1
+        key = result.get("game_name") if args.by_game else "All games"
+        histograms.setdefault(key, Counter()).update(failure_stages(result))
+
+    print(f"Failed samples: {failed}/{total}")
+
+    for key in sorted(histograms, key=natural_sort_key):
+        print(f"\n{key}")
+        for stage, count in sorted(histograms[key].items(), key=lambda item: (-item[1], item[0])):
+            print(f"  {count:>6}  {stage}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=(
+            "Query the results recorded by process_evaluation.py in "
+            f"{{report_root}}/{MANIFEST_FILENAME} without re-running anything."
+        )
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    summary_parser = subparsers.add_parser("summary", help="Regenerate summary.txt.")
+    summary_parser.add_argument(
+        "--report_root",
+        type=str,
+        required=True,
+        help="Report folder of the run, containing its manifest.",
+    )
+    summary_parser.add_argument(
+        "-n",
+        "--num_generations",
+        type=int,
+        default=None,
+        help="Generations per game to state in the summary header, as passed to the run.",
+    )
+    summary_parser.add_argument(
+        "--output",
+        type=str,
+        default=None,
+        help="Where to write the summary. The default is summary.txt in --report_root.",
+    )
+    summary_parser.set_defaults(run=regenerate_summary)
+
+    timings_parser = subparsers.add_parser(
+        "timings",
+        help=f"Regenerate {TIMING_SUMMARY_FILENAME} (p50/p95 per stage, overall and per game).",
+    )
+    timings_parser.add_argument(
+        "--report_root",
+        type=str,
+        required=True,
+        help="Report folder of the run, containing its manifest.",
+    )
+    timings_parser.add_argument(
+        "--output",
+        type=str,
+        default=None,
+        help=f"Where to write the tables. The default is {TIMING_SUMMARY_FILENAME} in --report_root.",
+    )
+    timings_parser.set_defaults(run=regenerate_timings)
+
+    failures_parser = subparsers.add_parser("failures", help="Count failed samples by stage.")
+    failures_parser.add_argument(
+        "--report_root",
+        type=str,
+        required=True,
+        help="Report folder of the run, containing its manifest.",
+    )
+    failures_parser.add_argument(
+        "--by_game",
+        action="store_true",
+        help="One histogram per game instead of one overall.",
+    )
+    failures_parser.set_defaults(run=failure_histogram)
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -14,4 +14,5 @@ python process_evaluation.py \
   --output_root "Results/${METHOD}/Output" \
   --report_root "Results/${METHOD}/Check_Reports" \
   --num_generations "${NUM_GENERATIONS}" \
+  --check_cache_dir "Results/${METHOD}/Check_Cache" \
   -m "${MODEL}"
@@ -0,0 +1,31 @@
+from Match.action_match import label_numbers, match_actions_locally
+
+
+def test_label_numbers_keep_sign_and_decimals():
+    assert label_numbers("(1,-10)") == ["1", "-10"]
+    assert label_numbers("Bet 0.5") == ["0.5"]
+    assert label_numbers("Bet 5") == ["5"]
+
+
+def test_labels_differing_in_sign_are_left_to_the_llm():
+    mapping, gen_left, ref_left = match_actions_locally(["Raise -2", "Call"], ["Raise 2", "Call"])
+
+    assert mapping == {"Call": "Call"}
+    assert gen_left == ["Raise -2"]
+    assert ref_left == ["Raise 2"]
+
+
+def test_labels_differing_in_decimals_are_left_to_the_llm():
+    mapping, gen_left, ref_left = match_actions_locally(["Bet 0.5", "Fold"], ["Bet 5", "Fold"])
+
+    assert mapping == {"Fold": "Fold"}
+    assert gen_left == ["Bet 0.5"]
+    assert ref_left == ["Bet 5"]
+
+
+def test_labels_with_the_same_signed_numbers_match_locally():
+    mapping, gen_left, ref_left = match_actions_locally(["raise -2", "CALL"], ["Raise -2", "Call"])
+
+    assert mapping == {"raise -2": "Raise -2", "CALL": "Call"}
+    assert gen_left == []
+    assert ref_left == []
@@ -0,0 +1,53 @@
+import io
+import sys
+
+from Match.order_match import update_nodes_with_switching_order
+from Match.player_match import reorder_players
+from Tree import EFGParser, NodeType
+
+DEPTH = 10000
+
+
+def deep_chain_efg(depth: int) -> str:
+    """A chain of `depth` alternating player nodes: "Pass" goes on, "Take" ends the game."""
+    lines = ['EFG 2 R "chain" { "A" "B" }', '""']
+    lines += [f'p "" {i % 2 + 1} {i + 1} "" {{ "Pass" "Take" }} 0' for i in range(depth)]
+    lines.append('t "" 1 "end" { 1, 1 }')
+    lines += [f't "" {i + 2} "" {{ {i}, {-i} }}' for i in reversed(range(depth))]
+    return "\n".join(lines) + "\n"
+
+
+def chain_nodes(root):
+    node = root
+    while node.node_type == NodeType.PLAYER:
+        yield node
+        node = node.children[node.actions[0]]
+
+
+def test_deep_chain_parses_matches_and_writes_without_recursion():
+    recursion_limit = sys.getrecursionlimit()
+    assert DEPTH > recursion_limit
+
+    parser = EFGParser()
+    game = parser.parse_string(deep_chain_efg(DEPTH))
+    assert len(list(chain_nodes(game.root))) == DEPTH
+
+    deepest = DEPTH - 1
+    update_nodes_with_switching_order(
+        game.root,
+        [(["Go", "Stop"], deepest % 2 + 1, deepest, deepest + 1)],
+        game=game,
+    )
+    reorder_players(game, ["B", "A"])
+
+    stream = io.StringIO()
+    parser.write_efg(stream)
+    assert sys.getrecursionlimit() == recursion_limit
+
+    written = EFGParser().parse_string('EFG 2 R "chain" { "B" "A" }\n""\n' + stream.getvalue() + "\n")
+    nodes = list(chain_nodes(written.root))
+
+    assert len(nodes) == DEPTH
+    assert [node.player for node in nodes[:2]] == [2, 1]
+    assert nodes[-1].actions == ["Go", "Stop"]
+    assert nodes[-2].actions == ["Pass", "Take"]
@@ -0,0 +1,50 @@
+import math
+import random
+
+from Tree import QuantileSketch
+
+
+def nearest_rank(values, fraction):
+    ordered = sorted(values)
+    return ordered[max(1, math.ceil(fraction * len(ordered))) - 1]
+
+
+def test_quantiles_are_within_one_percent():
+    rng = random.Random(0)
+    values = [rng.lognormvariate(-3, 2) for _ in range(20000)]
+
+    sketch = QuantileSketch()
+    for value in values:
+        sketch.add(value)
+
+    for fraction in (0.5, 0.95):
+        exact = nearest_rank(values, fraction)
+        assert abs(sketch.quantile(fraction) - exact) <= 0.01 * exact
+
+    assert sketch.count == len(values)
+    assert len(sketch.bins) < 2000
+
+
+def test_small_whole_numbers_stay_exact():
+    sketch = QuantileSketch()
+    for value in range(21):
+        sketch.add(value)
+
+    assert sketch.quantile(0.5) == 10
+    assert sketch.quantile(0.95) == 19
+
+
+def test_merged_sketches_cover_both_streams():
+    first, second = QuantileSketch(), QuantileSketch()
+    for value in range(0, 50):
+        first.add(value)
+    for value in range(50, 100):
+        second.add(value)
+
+    first.merge(second)
+
+    assert first.count == 100
+    assert first.total == sum(range(100))
+    assert (first.minimum, first.maximum) == (0, 99)
+    assert abs(first.quantile(0.5) - 49) <= 1
+    assert abs(first.quantile(0.95) - 94) <= 2
@@ -0,0 +1,21 @@
+from Match.llm_cache import LLMResponseCache
+
+
+def test_response_format_is_part_of_the_key(tmp_path):
+    cache = LLMResponseCache(str(tmp_path / "responses.sqlite"))
+    json_mode = {"type": "json_object"}
+
+    cache.put("gpt-4o", 0.0, "Map these actions.", "['A', 'B']")
+    cache.put("gpt-4o", 0.0, "Map these actions.", '{"mapping": ["A", "B"]}', json_mode)
+
+    assert cache.get("gpt-4o", 0.0, "Map these actions.") == "['A', 'B']"
+    assert cache.get("gpt-4o", 0.0, "Map these actions.", json_mode) == '{"mapping": ["A", "B"]}'
+    assert cache.get("gpt-4o", 0.0, "Map these actions.", {"type": "text"}) is None
+
+
+def test_response_format_key_ignores_dict_order():
+    first = LLMResponseCache.key("gpt-4o", 0.0, "prompt", {"type": "json_schema", "strict": True})
+    second = LLMResponseCache.key("gpt-4o", 0.0, "prompt", {"strict": True, "type": "json_schema"})
+
+    assert first == second
+    assert first != LLMResponseCache.key("gpt-4o", 0.0, "prompt")
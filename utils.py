@@ -1,6 +1,9 @@
 import pygambit as gbt
 import numpy as np
 
+from Tree import EFGParser
+from Checkers.check_reduced_strategies import reduced_strategy_structures
+
 # Convert EFG to NFG to payoff matrix
 def get_payoff_matrix(efg_file_path):
     """Get the payoff matrix from a given extensive-form game (EFG) file.
@@ -68,3 +71,45 @@ def check_strategy_counts(reference_game, generated_game):
 
     return all_match
 
+
+def get_reduced_strategy_counts(efg_file_path):
+    """
+    Number of reduced strategies per player, computed from the game tree
+    without building the normal form (see
+    Checkers.check_reduced_strategies.reduced_strategy_structures).
+
+    Returns None if a player lacks perfect recall; use get_payoff_matrix then.
+    """
+    structures = reduced_strategy_structures(EFGParser(allow_references=True).parse_file(efg_file_path))
+    if structures is None:
+        return None
+    return [structure.count for structure in structures]
+
+def check_reduced_strategy_counts(reference_efg_path, generated_efg_path):
+    """
+    Like check_strategy_counts, but on reduced strategy counts from
+    get_reduced_strategy_counts, so the normal form is never built.
+
+    Returns:
+        bool, or None if either game lacks perfect recall.
+    """
+    ref_counts = get_reduced_strategy_counts(reference_efg_path)
+    gen_counts = get_reduced_strategy_counts(generated_efg_path)
+
+    if ref_counts is None or gen_counts is None:
+        return None
+
+    if len(ref_counts) != len(gen_counts):
+        print(f"Different number of players: reference ({len(ref_counts)}), generated ({len(gen_counts)})")
+        return False
+
+    all_match = True
+    for i, (ref_count, gen_count) in enumerate(zip(ref_counts, gen_counts)):
+        if ref_count != gen_count:
+            print(f"Player {i} strategy count mismatch: reference ({ref_count}), generated ({gen_count})")
+            all_match = False
+
+    if all_match:
+        print("Number of reduced strategies per player match between reference and generated games.")
+
+    return all_match